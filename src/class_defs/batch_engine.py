@@ -0,0 +1,293 @@
+from __future__ import annotations
+from typing import Optional, Tuple, Union
+import random
+from src.class_defs.cards import CARD_VALUES, N_CARDS_PER_DECK, VALUE_POINTS
+from src.class_defs.dealer_odds import N_RANKS
+from src.class_defs.dealer_policy import DealerPolicy
+from src.class_defs.hand_values import BLACKJACK, SOFT_ACE_BONUS
+from src.class_defs.online_stats import RunningStats
+from src.class_defs.rules import DEFAULT_RULES, TableConfig, TableRules, compile_rules
+from src.class_defs.simulation import RESULTS, SimulationResult
+from src.class_defs.strategies import BasicStrategy, DealerPolicyStrategy, TableStrategy
+from src.class_defs.strategy_solver import HIT, N_TOTALS, DecisionTable
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; only the batch engine needs it
+    np = None
+
+BatchStrategy = Union[DecisionTable, TableStrategy, DealerPolicyStrategy, DealerPolicy]
+BLACKJACK_CODE, BUST_CODE, WIN_CODE, LOSE_CODE, PUSH_CODE = [RESULTS.index(result) for result in
+                                                              ('blackjack', 'bust', 'win', 'lose', 'push')]
+# points of every card id, so shoes loaded from CardShoe ids can be converted with one take
+ID_POINTS: Tuple[int, ...] = tuple(VALUE_POINTS[card_id % len(CARD_VALUES)] for card_id in range(N_CARDS_PER_DECK))
+
+
+class BatchEngine:
+    """
+    Plays :param n_tables independent tables in lockstep, each with :param n_seats seats playing one hit/stand
+    strategy, holding every table as rows of NumPy arrays: the shoes (card points), cursors and cut cards, and per seat
+    hard totals, ace flags, bets and an acting mask. Each phase of a round (dealing, the hit/stand steps, dealer play
+    and settlement) is a handful of masked array operations over all tables at once.
+
+    The rules are BlackJackEngine's under :param config, for strategies that only hit and stand (so insurance is never
+    taken): cards are dealt in the same order, the dealer peeks for a natural, naturals pay the config's blackjack
+    payout, any other 21 stands, dealer play follows :param dealer_policy (or the config's dealer rule), the payout
+    rates are the same, and a shoe that runs dry mid-round recycles only its discards. Loading the same shoe order
+    into both engines plays out identical rounds.
+    :param strategy is a DecisionTable (or TableStrategy such as BasicStrategy), or a DealerPolicy to mimic the dealer.
+    Every seat bets :param bet each round, the table minimum of 1 unless given
+    """
+    # =========== Constructors ===========
+    def __init__(self, n_tables: int, n_seats: int = 1, strategy: Optional[BatchStrategy] = None, n_decks: int = 6,
+                 penetration: float = 0.75, dealer_policy: Optional[DealerPolicy] = None, bet: int = 1,
+                 seed: Optional[int] = None, config: Optional[TableConfig] = None) -> None:
+        if np is None:
+            raise ImportError('BatchEngine needs NumPy; install it with "pip install numpy"')
+        if not 0.0 < penetration <= 1.0:
+            raise ValueError('Penetration must be in (0, 1], not {}'.format(penetration))
+        if bet < 1:
+            raise ValueError('Every seat must bet at least 1, not {}'.format(bet))
+        if strategy is None:
+            strategy = BasicStrategy()
+        if config is None:
+            config = DEFAULT_RULES.config
+        if dealer_policy is not None:
+            config = config._replace(dealer_rule=dealer_policy.name)
+        self.rules: TableRules = compile_rules(config)
+        self.n_tables: int = n_tables
+        self.n_seats: int = n_seats
+        self.penetration: float = penetration
+        self.n_cards: int = N_CARDS_PER_DECK * n_decks
+        self.rng = np.random.default_rng(seed if seed is not None else random.getrandbits(64))
+        # the strategy as a flat lookup: actions indexed like DecisionTable.index, or the policy's stand table
+        self._hit_table, self._mimic = BatchEngine._compile_strategy(strategy)
+        self._dealer_stands = np.frombuffer(bytes(self.rules.dealer_policy.table), dtype=np.uint8).astype(bool)
+        self._id_points = np.array(ID_POINTS, dtype=np.int8)
+        # Setup the Shoes: one row per table, shuffled independently
+        one_shoe = np.tile(self._id_points, n_decks)
+        self.shoes = self.rng.permuted(np.tile(one_shoe, (n_tables, 1)), axis=1)
+        self.cursor = np.zeros(n_tables, dtype=np.int64)
+        self.cut_card = np.full(n_tables, self._cut_card_position(self.n_cards), dtype=np.int64)
+        self.round_start = np.zeros(n_tables, dtype=np.int64)  # first card of the current round in each shoe
+        # Setup the Seats
+        shape = (n_tables, n_seats)
+        self.bets = np.full(shape, bet, dtype=np.int64)
+        self.hard = np.zeros(shape, dtype=np.int16)
+        self.has_ace = np.zeros(shape, dtype=bool)
+        self.acting = np.zeros(shape, dtype=bool)
+        self.results = np.full(shape, -1, dtype=np.int8)
+        self.payout_rates = np.zeros(shape, dtype=np.float64)
+        self.dealer_hard = np.zeros(n_tables, dtype=np.int16)
+        self.dealer_ace = np.zeros(n_tables, dtype=bool)
+        self.dealer_natural = np.zeros(n_tables, dtype=bool)
+        self.upcards = np.zeros(n_tables, dtype=np.int8)
+
+    @staticmethod
+    def _compile_strategy(strategy: BatchStrategy) -> Tuple:
+        if isinstance(strategy, TableStrategy):
+            strategy = strategy.table
+        if isinstance(strategy, DealerPolicyStrategy):
+            strategy = strategy.policy
+        if isinstance(strategy, DecisionTable):
+            return np.array(strategy.actions, dtype=np.int8) == HIT, False
+        if isinstance(strategy, DealerPolicy):
+            return ~np.frombuffer(bytes(strategy.table), dtype=np.uint8).astype(bool), True
+        raise TypeError('BatchEngine cannot vectorize a {}'.format(type(strategy).__name__))
+
+    def load_shoes(self, card_ids) -> None:
+        """This replaces every shoe with :param card_ids (one row of CardShoe card ids per table), cursors at the top"""
+        card_ids = np.asarray(card_ids)
+        if card_ids.shape != self.shoes.shape:
+            raise ValueError('Expected shoes of shape {0}, not {1}'.format(self.shoes.shape, card_ids.shape))
+        self.shoes = self._id_points[card_ids % N_CARDS_PER_DECK]
+        self.cursor[:] = 0
+        self.round_start[:] = 0
+        self.cut_card[:] = self._cut_card_position(self.n_cards)
+
+    # =========== Helper Methods ===========
+    def _cut_card_position(self, n_items: int) -> int:
+        """The cut card's position in a freshly shuffled shoe of :param n_items, as CardShoe places it"""
+        return max(1, int(n_items * self.penetration))
+
+    @staticmethod
+    def best_values(hard, has_ace):
+        """This returns the best value of every hand, counting an ace as 11 where that doesn't bust"""
+        return np.where(has_ace & (hard + SOFT_ACE_BONUS <= BLACKJACK), hard + SOFT_ACE_BONUS, hard)
+
+    def _recycle_discards(self, tables) -> None:
+        """
+        This gives each of :param tables a fresh supply for the rest of the round, like CardShoe.reshuffle does when the
+        draw pile runs dry: the cards of earlier rounds are shuffled in under the cards still to come, while the cards
+        of this round stay out of it
+        """
+        for k in tables:
+            start = self.round_start[k]
+            if start == 0:
+                raise RuntimeError('Table {} ran out of cards within a single round'.format(k))
+            discards = self.rng.permutation(self.shoes[k, :start])
+            self.shoes[k] = np.concatenate([self.shoes[k, start:], discards])
+            self.cursor[k] -= start
+            self.cut_card[k] = self.n_cards - start + self._cut_card_position(start)
+            self.round_start[k] = 0
+
+    def _deal(self, mask):
+        """
+        This deals one card to every seat set in the 2D :param mask, taking each table's cards in seat order, and
+        returns the points dealt (0 where the mask is unset)
+        """
+        counts = mask.sum(axis=1)
+        short = np.nonzero(self.cursor + counts > self.n_cards)[0]
+        if len(short) > 0:
+            self._recycle_discards(short)
+        positions = np.minimum(self.cursor[:, None] + np.cumsum(mask, axis=1) - 1, self.n_cards - 1)
+        cards = np.where(mask, np.take_along_axis(self.shoes, positions, axis=1), 0)
+        self.cursor += counts
+        return cards
+
+    def _add_cards(self, cards) -> None:
+        self.hard += cards
+        self.has_ace |= cards == 1
+
+    def _settle_naturals(self) -> None:
+        """
+        This ends the round early at every table where the dealer peeks at a natural, and settles every seat dealt a
+        natural, as BlackJackEngine._init_hand does
+        """
+        natural = BatchEngine.best_values(self.hard, self.has_ace) == BLACKJACK
+        dealer_natural = self.dealer_natural[:, None]
+        if self.rules.config.dealer_peeks:
+            peeked = (dealer_natural & ((self.upcards == 1) | (self.upcards == 10))[:, None]) & ~natural
+            self.results[peeked], self.payout_rates[peeked] = LOSE_CODE, -1.0
+            self.acting &= ~peeked
+        self.results[natural & dealer_natural] = PUSH_CODE
+        paid = natural & ~dealer_natural
+        self.results[paid], self.payout_rates[paid] = BLACKJACK_CODE, self.rules.blackjack_payout
+        self.acting &= ~natural
+
+    def _settle_made_hands(self) -> None:
+        """This settles every acting seat that has just busted and stands every seat that has made 21"""
+        made = self.acting & (BatchEngine.best_values(self.hard, self.has_ace) == BLACKJACK)
+        bust = self.acting & (self.hard > BLACKJACK)
+        self.results[bust] = BUST_CODE
+        self.payout_rates[bust] = -1.0
+        self.acting &= ~(made | bust)
+
+    # =========== Control Flow Actions ===========
+    def play_round(self) -> Tuple:
+        """This plays one round at every table and returns the (result code, payout rate) arrays of every seat"""
+        self._init_round()
+        self._loop_round()
+        self._finish_round()
+        return self.results, self.payout_rates
+
+    def _init_round(self) -> None:
+        reshuffle = np.nonzero(self.cursor >= self.cut_card)[0]
+        if len(reshuffle) > 0:
+            self.shoes[reshuffle] = self.rng.permuted(self.shoes[reshuffle], axis=1)
+            self.cursor[reshuffle] = 0
+            self.cut_card[reshuffle] = self._cut_card_position(self.n_cards)
+        self.round_start[:] = self.cursor
+        self.hard[:] = 0
+        self.has_ace[:] = False
+        self.results[:] = -1
+        self.payout_rates[:] = 0.0
+        self.acting[:] = True
+        # two cards to each seat in turn, then the dealer's upcard and hole card
+        cards = self._deal(np.ones((self.n_tables, 2 * self.n_seats + 2), dtype=bool))
+        self._add_cards(cards[:, 0:2 * self.n_seats:2])
+        self._add_cards(cards[:, 1:2 * self.n_seats:2])
+        self.upcards = cards[:, -2].copy()
+        self.dealer_hard = (cards[:, -2] + cards[:, -1]).astype(np.int16)
+        self.dealer_ace = (cards[:, -2] == 1) | (cards[:, -1] == 1)
+        self.dealer_natural = BatchEngine.best_values(self.dealer_hard, self.dealer_ace) == BLACKJACK
+        self._settle_naturals()
+
+    def _loop_round(self) -> None:
+        """This runs hit/stand steps at every table until no seat anywhere is still acting"""
+        while self.acting.any():
+            if self._mimic:
+                hits = self._hit_table[2 * np.minimum(self.hard, len(self._hit_table) // 2 - 1) + self.has_ace]
+            else:
+                best = BatchEngine.best_values(self.hard, self.has_ace)
+                soft = best != self.hard
+                index = (soft * N_TOTALS + np.minimum(best, BLACKJACK)) * N_RANKS + self.upcards[:, None] - 1
+                hits = self._hit_table[index]
+            hits &= self.acting
+            self.acting &= hits  # standing seats are done
+            self._add_cards(self._deal(hits))
+            self._settle_made_hands()
+
+    def _finish_round(self) -> None:
+        """This plays every dealer by the compiled policy, then settles the standing seats against them"""
+        max_index = len(self._dealer_stands) // 2 - 1
+        while True:
+            hitting = ~self._dealer_stands[2 * np.minimum(self.dealer_hard, max_index) + self.dealer_ace]
+            if not hitting.any():
+                break
+            cards = self._deal(hitting[:, None])[:, 0]
+            self.dealer_hard += cards
+            self.dealer_ace |= cards == 1
+
+        dealer_value = BatchEngine.best_values(self.dealer_hard, self.dealer_ace)[:, None]
+        player_value = BatchEngine.best_values(self.hard, self.has_ace)
+        standing = self.results < 0
+        dealer_natural = self.dealer_natural[:, None]  # only left standing against when the dealer doesn't peek
+        win = standing & ~dealer_natural & ((dealer_value > BLACKJACK) | (player_value > dealer_value))
+        lose = standing & ~win & ((player_value < dealer_value) | dealer_natural)
+        push = standing & ~win & ~lose
+        self.results[win], self.payout_rates[win] = WIN_CODE, 1.0
+        self.results[lose], self.payout_rates[lose] = LOSE_CODE, -1.0
+        self.results[push] = PUSH_CODE
+
+    # =========== Aggregates ===========
+    def net_chip_changes(self):
+        """This returns each seat's net chips for the round, rounded like BlackJackEngine.settle_all"""
+        return np.where(self.payout_rates > 0, np.floor(self.payout_rates * self.bets),
+                        np.ceil(self.payout_rates * self.bets)).astype(np.int64)
+
+    def add_round_to(self, result: SimulationResult) -> None:
+        """This folds the last round at every table into :param result with array reductions"""
+        n_hands = self.results.size
+        result.n_rounds += self.n_tables
+        for code, count in enumerate(np.bincount(self.results.ravel(), minlength=len(RESULTS))):
+            result.result_counts[RESULTS[code]] += int(count)
+        mean = float(self.payout_rates.mean())
+        m2 = float(((self.payout_rates - mean) ** 2).sum())
+        result.payouts.merge(RunningStats.from_moments(n_hands, mean, m2))
+        situations = np.bincount((self.upcards[:, None].astype(np.int64) * len(RESULTS) + self.results).ravel(),
+                                 minlength=(N_RANKS + 1) * len(RESULTS))
+        for key in np.nonzero(situations)[0]:
+            result.situations.add((int(key) // len(RESULTS), RESULTS[key % len(RESULTS)]), int(situations[key]))
+        values, counts = np.unique(self.net_chip_changes(), return_counts=True)
+        for value, count in zip(values, counts):
+            result.chip_changes.add(int(value), int(count))
+
+    def run(self, n_rounds: int) -> SimulationResult:
+        """This plays :param n_rounds at every table and returns the aggregate over all of them"""
+        result = SimulationResult()
+        for _ in range(n_rounds):
+            self.play_round()
+            self.add_round_to(result)
+        return result
+
+
+if __name__ == '__main__':
+    import time
+    from src.class_defs.engine import BlackJackEngine
+
+    for n_seats in (1, 7):
+        engine = BatchEngine(n_tables=10000, n_seats=n_seats, seed=2019)
+        start = time.perf_counter()
+        batch_result = engine.run(20)
+        batch_rate = batch_result.n_hands / (time.perf_counter() - start)
+
+        names = ['seat{}'.format(i) for i in range(n_seats)]
+        strategy = BasicStrategy()
+        scalar = BlackJackEngine(names, decisions={name: strategy for name in names}, n_decks=6)
+        start = time.perf_counter()
+        for _ in range(2000 // n_seats):
+            scalar.play_hand()
+        scalar_rate = (2000 // n_seats) * n_seats / (time.perf_counter() - start)
+        print('{0} seats: batch {1:,.0f} hands/s, scalar {2:,.0f} hands/s ({3:.0f}x), batch EV {4:+.4f}'.format(
+            n_seats, batch_rate, scalar_rate, batch_rate / scalar_rate, batch_result.expected_value))
@@ -0,0 +1,203 @@
+from __future__ import annotations
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from src.class_defs.cards import Card, CardHand, CardPile, Suit
+from src.class_defs.chip_stack import DENOM_INDEX, ChipStack
+from src.class_defs.engine import BlackJackEngine
+from src.class_defs.players import Player
+from src.class_defs.strategies import BasicStrategy
+
+# Each benchmark takes an operation count and returns the seconds those operations took, leaving setup out of the
+# timing. Results are reported as operations per second, so a bigger number is always better
+Benchmark = Callable[[int], float]
+DEFAULT_SEATS: Sequence[int] = (1, 7)
+DEFAULT_THRESHOLD: float = 0.25  # fail when a benchmark runs this fraction slower than its baseline
+
+
+class Regression(NamedTuple):
+    name: str
+    baseline: float
+    current: float
+
+    @property
+    def slowdown(self) -> float:
+        return 1.0 - self.current / self.baseline
+
+
+# =========== Hot Paths ===========
+def bench_get_hand_value(n_ops: int) -> float:
+    player = Player('bench')
+    for name in ('A', '7', '3'):
+        player._player_hand.add_card(Card(name, Suit.SPADES))
+    get_hand_value = BlackJackEngine.get_hand_value
+    start = time.perf_counter()
+    for _ in range(n_ops):
+        get_hand_value(player)
+    return time.perf_counter() - start
+
+
+def bench_deal_cards(n_ops: int) -> float:
+    """Deals one card at a time, discarding every fifth card's hand so the shoe recycles as in play"""
+    engine = BlackJackEngine(['bench'], rng=random.Random(1), n_decks=6)
+    player = engine.players['bench']
+    start = time.perf_counter()
+    for i in range(n_ops):
+        engine.deal_cards([player], n_cards=1)
+        if i % 5 == 4:
+            player.discard_all(engine.discard_pile)
+    return time.perf_counter() - start
+
+
+def bench_shuffle(n_ops: int) -> float:
+    pile = CardPile.from_standard_deck()
+    rng = random.Random(2)
+    start = time.perf_counter()
+    for _ in range(n_ops):
+        pile.shuffle(rng)
+    return time.perf_counter() - start
+
+
+def bench_remove_card(n_ops: int) -> float:
+    """Removes a card by name and puts it back, so the hand keeps its size"""
+    cards = [Card(value, Suit.HEARTS) for value in ('2', '5', '9', 'Q', 'A')]
+    hand = CardHand(cards)
+    start = time.perf_counter()
+    for i in range(n_ops):
+        card = hand.remove_card(cards[i % len(cards)].name)
+        hand.add_card(card)
+    return time.perf_counter() - start
+
+
+def bench_transfer_amount(n_ops: int) -> float:
+    """Pays amounts that need change back and forth between two house stacks"""
+    source, destination = ChipStack.from_dealer_stack(), ChipStack.from_dealer_stack()
+    amounts = (1, 7, 15, 37, 100, 242)
+    start = time.perf_counter()
+    for i in range(n_ops):
+        amount = amounts[(i // 2) % len(amounts)]  # the same amount goes there and back
+        if i % 2 == 0:
+            source.transfer_amount_of_chips(destination, amount)
+        else:
+            destination.transfer_amount_of_chips(source, amount)
+    return time.perf_counter() - start
+
+
+def bench_exchange_chips(n_ops: int) -> float:
+    stack = ChipStack.from_dealer_stack()
+    start = time.perf_counter()
+    for i in range(n_ops):
+        if i % 2 == 0:
+            stack.exchange_chips('$100', '$20', 1)
+        else:
+            stack.exchange_chips('$20', '$100', 5)
+    return time.perf_counter() - start
+
+
+def bench_sort_stack(n_ops: int) -> float:
+    """Sorts high, then spills loose low chips back in so every sort has exchanges to do"""
+    stack = ChipStack.from_standard_stack()
+    loose = [0] * len(DENOM_INDEX)
+    loose[DENOM_INDEX['$1']], loose[DENOM_INDEX['$5']] = 12, 3
+    start = time.perf_counter()
+    for _ in range(n_ops):
+        stack.sort_stack('high')
+        stack.add_vector(loose)
+    return time.perf_counter() - start
+
+
+def bench_full_hands(n_seats: int) -> Benchmark:
+    """This returns a benchmark of whole rounds at a table of :param n_seats playing basic strategy"""
+    def bench(n_ops: int) -> float:
+        names = ['seat{}'.format(i) for i in range(n_seats)]
+        strategy = BasicStrategy()
+        engine = BlackJackEngine(names, decisions={name: strategy for name in names}, rng=random.Random(3),
+                                 n_decks=6)
+        start = time.perf_counter()
+        for _ in range(n_ops):
+            engine.play_hand()
+        return time.perf_counter() - start
+    return bench
+
+
+def benchmark_suite(seats: Sequence[int] = DEFAULT_SEATS) -> Dict[str, tuple]:
+    """This returns {name: (benchmark, operations per run)} for the hot paths and full hands at each seat count"""
+    suite: Dict[str, tuple] = {
+        'get_hand_value': (bench_get_hand_value, 200000),
+        'deal_cards': (bench_deal_cards, 50000),
+        'CardPile.shuffle': (bench_shuffle, 5000),
+        'CardHand.remove_card': (bench_remove_card, 100000),
+        'transfer_amount_of_chips': (bench_transfer_amount, 20000),
+        'exchange_chips': (bench_exchange_chips, 20000),
+        'sort_stack': (bench_sort_stack, 5000),
+    }
+    for n_seats in seats:
+        suite['hands_{}_seats'.format(n_seats)] = (bench_full_hands(n_seats), max(200, 4000 // n_seats))
+    return suite
+
+
+# =========== Running & Comparing ===========
+def run_benchmarks(seats: Sequence[int] = DEFAULT_SEATS, scale: float = 1.0, repeat: int = 3) -> Dict[str, float]:
+    """
+    This runs the suite and returns operations per second for each benchmark, keeping the best of :param repeat runs
+    to filter out scheduler noise. :param scale multiplies every operation count
+    """
+    results: Dict[str, float] = {}
+    for name, (bench, n_ops) in benchmark_suite(seats).items():
+        n_ops = max(1, int(n_ops * scale))
+        seconds = min([bench(n_ops) for _ in range(repeat)])
+        results[name] = n_ops / seconds if seconds > 0 else float('inf')
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Regression]:
+    """This returns every benchmark in both :param results and :param baseline that slowed down past the threshold"""
+    return [Regression(name, baseline[name], results[name]) for name in results
+            if name in baseline and results[name] < baseline[name] * (1.0 - threshold)]
+
+
+def save_results(path: str, results: Dict[str, float]) -> None:
+    data = {'python': platform.python_version(), 'machine': platform.machine(), 'ops_per_second': results}
+    with open(path, 'w') as file:
+        json.dump(data, file, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> Dict[str, float]:
+    with open(path, 'r') as file:
+        return json.load(file)['ops_per_second']
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the BlackJack engine hot paths')
+    parser.add_argument('--seats', type=int, nargs='+', default=list(DEFAULT_SEATS), help='seat counts for full hands')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplier on every operation count')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare against the results in this JSON file')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='allowed fractional slowdown')
+    parser.add_argument('--update-baseline', action='store_true', help='overwrite the baseline with these results')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.seats, args.scale)
+    for name, ops in results.items():
+        print('{0:<28}{1:>14,.0f} ops/s'.format(name, ops))
+    if args.output:
+        save_results(args.output, results)
+    if args.baseline and args.update_baseline:
+        save_results(args.baseline, results)
+    elif args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.threshold)
+        for regression in regressions:
+            print('REGRESSION {0}: {1:,.0f} -> {2:,.0f} ops/s ({3:.0%} slower)'.format(
+                regression.name, regression.baseline, regression.current, regression.slowdown), file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+from __future__ import annotations
+from array import array
+from bisect import bisect_right
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import json
+import math
+from src.class_defs.card_counting import COUNT_SYSTEMS, HI_LO, CountSystem, ShoeView
+
+
+class BettingState(NamedTuple):
+    """Everything a bet policy may look at when one seat places its bet, before the cards are dealt"""
+    seat: str
+    bankroll: int  # the value of the seat's chips
+    min_bet: int  # the table limits
+    max_bet: int
+    shoe: ShoeView  # the shoe after any reshuffle for this round
+
+
+class BetPolicy:
+    """
+    Sizes a seat's wager for the next round. A policy returns the amount it would like to bet; the engine keeps it
+    within the table limits and the seat's chips, and a bet of 0 sits the seat out for the round
+    """
+    def bet(self, state: BettingState) -> int:
+        raise NotImplementedError
+
+
+class FlatBet(BetPolicy):
+    """Always bets :param amount, or the table minimum if no amount is given"""
+    def __init__(self, amount: Optional[int] = None) -> None:
+        self.amount: Optional[int] = amount
+
+    def bet(self, state: BettingState) -> int:
+        return state.min_bet if self.amount is None else self.amount
+
+
+class CountRamp(BetPolicy):
+    """
+    Bets a number of table minimums chosen by the true count of :param system, e.g. CountRamp({1: 2, 2: 4, 3: 8})
+    bets 2 units from a true count of +1, 4 from +2 and 8 from +3 up, and 1 unit below the first step
+    """
+    def __init__(self, ramp: Dict[int, int], system: CountSystem = HI_LO) -> None:
+        steps = sorted(ramp.items())
+        self.thresholds: List[int] = [count for count, _ in steps]
+        self.units: List[int] = [1] + [units for _, units in steps]  # units below the first threshold, then per step
+        self.system: CountSystem = system
+
+    def bet(self, state: BettingState) -> int:
+        true_count = state.shoe.true_count(self.system)
+        return state.min_bet * self.units[bisect_right(self.thresholds, true_count)]
+
+
+class EVTable:
+    """
+    The player's expected value per hand (in units of the bet) and its variance for each floored true count from
+    :param min_count, measured once by simulation (see simulation.build_ev_table) and saved to JSON. Counts outside
+    the table use its end bins. The table is only read while betting, so one copy can be shared by every seat
+    """
+    # =========== Constructors ===========
+    def __init__(self, system_name: str, min_count: int, evs: Sequence[float], variances: Sequence[float],
+                 n_hands: Sequence[int]) -> None:
+        self.system_name: str = system_name
+        self.min_count: int = min_count
+        self.evs: array = array('d', evs)
+        self.variances: array = array('d', variances)
+        self.n_hands: array = array('q', n_hands)  # the hands measured in each bin
+
+    @classmethod
+    def load(cls, path: str) -> EVTable:
+        with open(path, 'r') as file:
+            data = json.load(file)
+        return cls(data['system'], data['min_count'], data['evs'], data['variances'], data['n_hands'])
+
+    # =========== Helper Methods ===========
+    @property
+    def system(self) -> CountSystem:
+        return COUNT_SYSTEMS[self.system_name]
+
+    @property
+    def max_count(self) -> int:
+        return self.min_count + len(self.evs) - 1
+
+    def index(self, true_count: float) -> int:
+        return min(max(math.floor(true_count), self.min_count), self.max_count) - self.min_count
+
+    def ev(self, true_count: float) -> float:
+        return self.evs[self.index(true_count)]
+
+    def variance(self, true_count: float) -> float:
+        return self.variances[self.index(true_count)]
+
+    def save(self, path: str) -> None:
+        data = {'system': self.system_name, 'min_count': self.min_count, 'evs': self.evs.tolist(),
+                'variances': self.variances.tolist(), 'n_hands': self.n_hands.tolist()}
+        with open(path, 'w') as file:
+            json.dump(data, file)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, EVTable):
+            return NotImplemented
+        return self.__dict__ == other.__dict__
+
+    def __repr__(self) -> str:
+        return 'EVTable({0}, {1})'.format(self.system_name, {count: round(ev, 4) for count, ev in zip(
+            range(self.min_count, self.max_count + 1), self.evs)})
+
+
+class KellyBet(BetPolicy):
+    """
+    Bets :param fraction of the Kelly stake, edge / variance of the bankroll, with the edge and variance read from
+    :param ev_table at the current true count. The stakes are worked out per bin when the policy is made, so a bet is
+    one lookup. Without an edge the seat still bets the table minimum to keep its seat
+    """
+    def __init__(self, ev_table: EVTable, fraction: float = 0.5) -> None:
+        self.ev_table: EVTable = ev_table
+        self.fraction: float = fraction
+        self.stakes: Tuple[float, ...] = tuple([fraction * ev / variance if ev > 0 and variance > 0 else 0.0
+                                                for ev, variance in zip(ev_table.evs, ev_table.variances)])
+        self._system: CountSystem = ev_table.system
+
+    def bet(self, state: BettingState) -> int:
+        stake = self.stakes[self.ev_table.index(state.shoe.true_count(self._system))]
+        return max(state.min_bet, int(stake * state.bankroll))
+
+
+DEFAULT_BET_POLICY: BetPolicy = FlatBet()
+
+
+if __name__ == '__main__':
+    from src.class_defs.cards import CardShoe
+    import random
+    shoe = CardShoe(n_decks=2)
+    shoe.shuffle(random.Random(8))
+    table = EVTable(HI_LO.name, -2, [-0.02, -0.01, 0.0, 0.005, 0.01, 0.02], [1.3] * 6, [0] * 6)
+    policies = {'flat': FlatBet(), 'ramp': CountRamp({1: 2, 2: 4, 3: 8}), 'kelly': KellyBet(table)}
+    for _ in range(4):
+        for _ in range(20):
+            shoe.draw_id()
+        state = BettingState('seat', 1000, 5, 500, ShoeView(shoe))
+        print('TC {0:+.2f}: '.format(state.shoe.true_count()),
+              {name: policy.bet(state) for name, policy in policies.items()})
@@ -0,0 +1,92 @@
+from __future__ import annotations
+from typing import Dict, NamedTuple, Optional, Tuple
+from src.class_defs.cards import N_CARDS_PER_DECK, CardHand, CardShoe
+
+
+class CountSystem(NamedTuple):
+    """
+    A card counting system: the tag added to the running count for each rank seen, indexed by points - 1 (aces
+    first, ten-valued cards last). An unbalanced system starts each shoe from an initial running count of
+    initial_count_per_deck * n_decks + initial_count_offset, so its key counts don't depend on the number of decks
+    """
+    name: str
+    tags: Tuple[float, ...]
+    initial_count_per_deck: float = 0.0
+    initial_count_offset: float = 0.0
+
+    @property
+    def balanced(self) -> bool:
+        """A balanced system counts a whole deck to zero"""
+        return sum(self.tags) + 3 * self.tags[-1] == 0  # a deck has 4 cards of each rank and 16 ten-valued cards
+
+    def initial_count(self, n_decks: int) -> float:
+        return self.initial_count_per_deck * n_decks + self.initial_count_offset
+
+
+HI_LO = CountSystem('Hi-Lo', (-1, 1, 1, 1, 1, 1, 0, 0, 0, -1))
+KO = CountSystem('KO', (-1, 1, 1, 1, 1, 1, 1, 0, 0, -1), initial_count_per_deck=-4, initial_count_offset=4)
+HI_OPT_I = CountSystem('Hi-Opt I', (0, 0, 1, 1, 1, 1, 0, 0, 0, -1))
+OMEGA_II = CountSystem('Omega II', (0, 1, 1, 2, 2, 2, 1, 0, -1, -2))
+COUNT_SYSTEMS: Dict[str, CountSystem] = {system.name: system for system in (HI_LO, KO, HI_OPT_I, OMEGA_II)}
+
+
+class ShoeView:
+    """
+    A read-only view of what a player at the table can know about :param shoe: the composition of the unseen cards
+    and the running and true counts of any CountSystem. Everything is read from the rank counts the shoe keeps up to
+    date as cards are drawn, recycled and reshuffled, so every query is constant time.
+    The face-down cards of :param hidden (the dealer's hole card) are counted as unseen until they are turned up
+    """
+    __slots__ = ('_shoe', '_hidden', 'system')
+
+    # =========== Constructors ===========
+    def __init__(self, shoe: CardShoe, hidden: Optional[CardHand] = None, system: CountSystem = HI_LO) -> None:
+        self._shoe: CardShoe = shoe
+        self._hidden: Optional[CardHand] = hidden
+        self.system: CountSystem = system  # the system counts are given in unless another one is asked for
+
+    # =========== Helper Methods ===========
+    @property
+    def composition(self) -> Tuple[int, ...]:
+        """This property gets the unseen cards by points - 1, as used by DealerOutcomeCalculator"""
+        composition = list(self._shoe.rank_counts)
+        if self._hidden is not None:
+            for card, visible in zip(self._hidden.hand, self._hidden.visible):
+                if not visible:
+                    composition[card.points - 1] += 1
+        return tuple(composition)
+
+    @property
+    def n_cards(self) -> int:
+        return sum(self.composition)
+
+    @property
+    def decks_remaining(self) -> float:
+        return self.n_cards / N_CARDS_PER_DECK
+
+    def running_count(self, system: Optional[CountSystem] = None) -> float:
+        """This returns the running count of every card seen since the shoe was last shuffled"""
+        if system is None:
+            system = self.system
+        seen = [shuffled - unseen for shuffled, unseen in zip(self._shoe.shuffled_counts, self.composition)]
+        return system.initial_count(self._shoe.n_decks) + sum([tag * n for tag, n in zip(system.tags, seen)])
+
+    def true_count(self, system: Optional[CountSystem] = None) -> float:
+        """This returns the running count per deck left unseen, or the running count itself in the last deck"""
+        return self.running_count(system) / max(1.0, self.decks_remaining)
+
+    def __repr__(self) -> str:
+        return 'ShoeView({0} cards, {1} RC {2:+g}, TC {3:+.2f})'.format(
+            self.n_cards, self.system.name, self.running_count(), self.true_count())
+
+
+if __name__ == '__main__':
+    import random
+    shoe = CardShoe(n_decks=6)
+    shoe.shuffle(random.Random(2019))
+    view = ShoeView(shoe)
+    for _ in range(3):
+        for _ in range(60):
+            shoe.draw_id()
+        print(view, {name: round(view.true_count(system), 2) for name, system in COUNT_SYSTEMS.items()})
+    print('unseen by rank (A, 2-9, tens):', view.composition)
@@ -1,11 +1,25 @@
 from __future__ import annotations
 from enum import Enum
-from typing import Dict, List, TypeVar, Generic, Optional
+from typing import Dict, List, NamedTuple, Tuple, TypeVar, Generic, Optional
+from array import array
 import random
+from src.class_defs.hand_values import CARD_POINTS, HandValue, get_hand_value
 T = TypeVar("T")
 
 # Establish Card Primitives
 CARD_VALUES = [str(i) for i in range(2, 11)] + ['J', 'Q', 'K', 'A']
+N_CARDS_PER_DECK: int = 52
+VALUE_POINTS: List[int] = [CARD_POINTS[v] for v in CARD_VALUES]  # blackjack points by value index, ace as 1
+N_RANKS: int = 10  # distinct point values, so a composition or rank-count vector is indexed by points - 1
+CARD_RANKS: List[int] = [VALUE_POINTS[card_id % len(CARD_VALUES)] - 1 for card_id in range(N_CARDS_PER_DECK)]
+
+
+def count_ranks(card_ids) -> List[int]:
+    """This counts integer card ids into a rank-count vector indexed by points - 1"""
+    rank_counts = [0] * N_RANKS
+    for card_id in card_ids:
+        rank_counts[CARD_RANKS[card_id]] += 1
+    return rank_counts
 
 
 class Suit(Enum):
@@ -15,49 +29,113 @@ class Suit(Enum):
     SPADES: Suit = '♠'
 
 
+SUITS: List[Suit] = list(Suit)  # fixed suit order used by the integer card encoding
+
 class Card:
+    """
+    An immutable flyweight: there is exactly one Card instance per value and suit, so Card('A', Suit.SPADES) always
+    returns the same object. Its points, integer id and render strings are computed once when it is interned.
+    Whether a card is face up is a property of the hand holding it, not of the card
+    """
+    __slots__ = ('value', 'suit', 'id', 'points', 'name', 'hidden_name')
+    _interned: Dict[tuple, Card] = {}
+
     # =========== Constructors ===========
-    def __init__(self, value: str, suit: Suit, visible: bool = False) -> None:
-        # TODO: refactor card.value to be card.rank
-        self.value: str = value
-        self.suit: Suit = suit
-        self.visible: bool = visible
+    def __new__(cls, value: str, suit: Suit) -> Card:
+        card = cls._interned.get((value, suit))
+        if card is None:
+            # TODO: refactor card.value to be card.rank
+            card = super(Card, cls).__new__(cls)
+            object.__setattr__(card, 'value', value)
+            object.__setattr__(card, 'suit', suit)
+            object.__setattr__(card, 'id', SUITS.index(suit) * len(CARD_VALUES) + CARD_VALUES.index(value))
+            object.__setattr__(card, 'points', CARD_POINTS[value])
+            card_str: str = '[' + value + suit.value + ']'
+            if suit == Suit.HEARTS or suit == Suit.DIAMONDS:
+                object.__setattr__(card, 'name', '\033[31m' + card_str + '\033[0m')
+            else:
+                object.__setattr__(card, 'name', '\033[47m\033[30m' + card_str + '\033[0m')
+            object.__setattr__(card, 'hidden_name', '[??]')
+            cls._interned[(value, suit)] = card
+        return card
 
-    # =========== Helper Methods ===========
-    @property
-    def name(self) -> str:
-        """This property wraps to_string but forces complete visibility"""
-        return self.to_string(visible=True)
+    @staticmethod
+    def from_id(card_id: int) -> Card:
+        """Returns the card for an integer id in 0-51, as stored by CompactPile and CompactHand"""
+        return CARDS[card_id]
+
+    def __setattr__(self, key, value) -> None:
+        raise AttributeError('Card instances are shared and cannot be modified')
 
+    def __reduce__(self):
+        # unpickling and copying go back through __new__ so they return the interned instance
+        return Card, (self.value, self.suit)
+
+    # =========== Helper Methods ===========
     def to_string(self, visible: bool = False) -> str:
-        if visible:
-            return self.__str__()
-        else:
-            return '[??]'
+        return self.name if visible else self.hidden_name
 
     def __str__(self) -> str:
-        card_str: str = '[' + self.value + self.suit.value + ']'
-        if self.suit == Suit.HEARTS or self.suit == Suit.DIAMONDS:
-            return '\033[31m' + card_str + '\033[0m'
-        else:
-            return '\033[47m\033[30m' + card_str + '\033[0m'
+        return self.name
+
+    def __repr__(self) -> str:
+        return 'Card({0!r}, {1})'.format(self.value, self.suit)
+
+
+# Every interned card, indexed by its integer id and by its rendered name
+CARDS: List[Card] = [Card(v, s) for s in SUITS for v in CARD_VALUES]
+CARDS_BY_NAME: Dict[str, Card] = {card.name: card for card in CARDS}
+
+
+class HandState(NamedTuple):
+    """An immutable copy of a CardHand for snapshots, a few cards long"""
+    cards: Tuple[Card, ...]
+    visible: Tuple[bool, ...]
+    hard_total: int
+    n_aces: int
+
+
+class PileState(NamedTuple):
+    """A CompactPile's buffer (shared copy-on-write with the pile, never copied), cursor and rank counts"""
+    buffer: array
+    cursor: int
+    rank_counts: Tuple[int, ...]
+    cut_card: int = 0  # a CardShoe's cut card and its rank counts when it was last shuffled
+    shuffled_counts: Tuple[int, ...] = ()
 
 
 class CardHand:
+    """
+    A hand of cards that keeps a running hard total (aces as 1) and ace count as cards are added and removed,
+    so its blackjack value is a table lookup. It also keeps an index from card id to the positions holding that card,
+    so finding and removing a card is constant time. Removing a card moves the last card into its place, so the order
+    of the remaining cards can change. Cards should go through the hand operations to keep all of this in sync
+    """
     # =========== Constructors ===========
-    def __init__(self, card_list: Optional[List[Card]] = None):
+    def __init__(self, card_list: Optional[List[Card]] = None, visible: bool = False):
         if card_list is None:
             card_list = []
-        self.hand: List[Card] = card_list
+        self.hand: List[Card] = []
+        self.visible: List[bool] = []  # face-up flag of each card in the hand
+        self.hard_total: int = 0
+        self.n_aces: int = 0
+        self._index: Dict[int, List[int]] = {}  # card id -> positions of that card in self.hand
+        self.add_cards(card_list, visible)
 
     # =========== Helper Methods ===========
+    @property
+    def value(self) -> HandValue:
+        """This property gets the blackjack value of the hand in constant time"""
+        return get_hand_value(self.hard_total, self.n_aces)
+
     def get_card_index(self, card_name: str) -> int:
-        """Performs a linear search for a card with matching card name or throws error if not found"""
-        for i, card in enumerate(self.hand):
-            if card.name == card_name:
-                return i
-        # if card_name not found, raise index error
-        raise IndexError('No card with name "{}" was found in the hand'.format(card_name))
+        """Looks up the position of a card with matching card name or throws error if not found"""
+        card = CARDS_BY_NAME.get(card_name)
+        positions = self._index.get(card.id) if card is not None else None
+        if not positions:
+            # if card_name not found, raise index error
+            raise IndexError('No card with name "{}" was found in the hand'.format(card_name))
+        return positions[-1]
 
     def to_string(self, all_visible: bool = False) -> str:
         """
@@ -66,20 +144,98 @@ class CardHand:
         """
         if len(self.hand) == 0:
             return '<empty hand>'
-        return ''.join([card.to_string(visible=(all_visible or card.visible)) for card in self.hand])
+        if all_visible:
+            return ''.join([card.name for card in self.hand])
+        return ''.join([card.name if visible else card.hidden_name for card, visible in zip(self.hand, self.visible)])
+
+    def snapshot(self) -> HandState:
+        return HandState(tuple(self.hand), tuple(self.visible), self.hard_total, self.n_aces)
+
+    def restore(self, state: HandState) -> None:
+        """This puts the hand back to :param state, rebuilding the card index in time proportional to the hand"""
+        self.hand, self.visible = list(state.cards), list(state.visible)
+        self.hard_total, self.n_aces = state.hard_total, state.n_aces
+        self._index = {}
+        for position, card in enumerate(self.hand):
+            self._index.setdefault(card.id, []).append(position)
+
+    def _clear(self) -> None:
+        self.hand = []
+        self.visible = []
+        self.hard_total, self.n_aces = 0, 0
+        self._index = {}
 
     # =========== Hand Operations ===========
-    def add_card(self, card: Card) -> None:
+    def add_card(self, card: Card, visible: bool = False) -> None:
+        self._index.setdefault(card.id, []).append(len(self.hand))
         self.hand.append(card)
+        self.visible.append(visible)
+        self.hard_total += card.points
+        if card.points == 1:
+            self.n_aces += 1
+
+    def add_cards(self, cards: List[Card], visible: bool = False) -> None:
+        for card in cards:
+            self.add_card(card, visible)
+
+    def remove(self, card: Card) -> Card:
+        """Removes one copy of :param card from the hand by swapping the last card into its position"""
+        positions = self._index.get(card.id)
+        if not positions:
+            raise IndexError('No card with name "{}" was found in the hand'.format(card.name))
+        index = positions.pop()
+        if not positions:
+            del self._index[card.id]
+        last = len(self.hand) - 1
+        if index != last:
+            # move the last card into the freed position and repoint its index entry
+            moved = self.hand[last]
+            moved_positions = self._index[moved.id]
+            moved_positions[moved_positions.index(last)] = index
+            self.hand[index] = moved
+            self.visible[index] = self.visible[last]
+        self.hand.pop()
+        self.visible.pop()
+        self.hard_total -= card.points
+        if card.points == 1:
+            self.n_aces -= 1
+        return card
 
     def remove_card(self, card_name: str) -> Card:
-        index = self.get_card_index(card_name)
-        return self.hand.pop(index)
+        return self.remove(self.hand[self.get_card_index(card_name)])
+
+    def reveal(self) -> None:
+        """Turns every card in the hand face up"""
+        self.visible = [True] * len(self.hand)
 
     def transfer_cards(self, card_names: List[str], other_hand: CardHand) -> None:
         for name in card_names:
             other_hand.add_card(self.remove_card(name))
 
+    def transfer_all(self, other_hand: CardHand) -> None:
+        """Moves every card to :param other_hand in one step, keeping their order and face-up flags"""
+        if len(other_hand.hand) == 0:
+            # hand the whole state over instead of rebuilding it
+            other_hand.hand, other_hand.visible, other_hand._index = self.hand, self.visible, self._index
+            other_hand.hard_total, other_hand.n_aces = self.hard_total, self.n_aces
+        else:
+            for card, visible in zip(self.hand, self.visible):
+                other_hand.add_card(card, visible)
+        self._clear()
+
+    def clear_into(self, pile) -> None:
+        """
+        Moves every card into :param pile in one bulk add: onto the top of a CardPile, or onto the bottom of a
+        CompactPile in one block copy like CompactHand.clear_into, since the order of discards doesn't matter and
+        the top would copy the whole pile
+        """
+        if isinstance(pile, CompactPile):
+            pile.extend_ids(array('b', [card.id for card in self.hand]))
+        else:
+            pile.add_cards(self.hand)
+        self._clear()
+
+
 class Stack(Generic[T]):
     # =========== Constructors ===========
     def __init__(self, item_list: Optional[List[T]] = None) -> None:
@@ -110,11 +266,7 @@ class CardPile(Stack[Card]):
 
     @classmethod
     def from_standard_deck(cls) -> CardPile:
-        deck: List[Card] = []
-        for s in Suit:
-            for v in CARD_VALUES:
-                deck.append(Card(v, s, visible=False))
-        return cls(deck)
+        return cls(CARDS.copy())
 
     # =========== Helper Methods ===========
     def __str__(self):
@@ -130,22 +282,273 @@ class CardPile(Stack[Card]):
         else:
             self.push(card)
 
-    def shuffle(self) -> None:
-        random.shuffle(self.stack)  # self.stack is a list of cards
+    def add_cards(self, cards: List[Card]) -> None:
+        """Puts :param cards on top of the pile in order, as if added one at a time"""
+        self.stack.extend(cards)
+
+    def shuffle(self, rng: Optional[random.Random] = None) -> None:
+        """Shuffles in place with :param rng, or the global random stream if no generator is given"""
+        if rng is None:
+            random.shuffle(self.stack)  # self.stack is a list of cards
+        else:
+            rng.shuffle(self.stack)
+
+
+class CompactPile:
+    """
+    A card pile stored as integer card ids (0-51) in a signed byte array, one byte per card.
+    The top of the pile sits at a cursor, so drawing is an index bump and shuffling is one in-place permutation.
+    Card objects are only built when a card is drawn through draw() or rendered.
+    Snapshots share the buffer instead of copying it; the pile copies it before its next in-place change.
+    The pile also keeps how many cards of each rank it holds, updated in constant time as cards come and go
+    """
+    # =========== Constructors ===========
+    def __init__(self, card_ids: Optional[List[int]] = None) -> None:
+        self.buffer: array = array('b', card_ids if card_ids is not None else [])
+        self.cursor: int = 0  # index of the top card; everything before it has already been drawn
+        self._shared: bool = False  # True while a snapshot holds this buffer, so it must be copied before a write
+        self.rank_counts: List[int] = count_ranks(self.buffer)  # cards left in the pile by points - 1
+
+    @classmethod
+    def from_standard_deck(cls, n_decks: int = 1) -> CompactPile:
+        return cls(list(range(N_CARDS_PER_DECK)) * n_decks)
+
+    # =========== Helper Methods ===========
+    @property
+    def n_items(self) -> int:
+        return len(self.buffer) - self.cursor
+
+    @property
+    def card_ids(self) -> List[int]:
+        """This property gets the ids left in the pile, top card first"""
+        return self.buffer[self.cursor:].tolist()
+
+    def peak(self) -> Card:
+        return Card.from_id(self.buffer[self.cursor])
+
+    def __str__(self):
+        return self.peak().__str__().ljust(self.n_items - 1, ']')
+
+    def _compact(self) -> None:
+        """Drops the already drawn ids from the front of the buffer in one block move"""
+        if self._shared:
+            self.buffer, self.cursor, self._shared = self.buffer[self.cursor:], 0, False
+        elif self.cursor > 0:
+            del self.buffer[:self.cursor]
+            self.cursor = 0
+
+    def _own(self) -> None:
+        """Copies the buffer if a snapshot shares it, before the pile changes it in place"""
+        if self._shared:
+            self.buffer, self._shared = self.buffer[:], False
+
+    def snapshot(self) -> PileState:
+        """This returns the pile's state in constant time by sharing the buffer with the pile (copy-on-write)"""
+        self._shared = True
+        return PileState(self.buffer, self.cursor, tuple(self.rank_counts))
+
+    def restore(self, state: PileState) -> None:
+        """This puts the pile back to :param state in constant time; the buffer stays shared with the snapshot"""
+        self.buffer, self.cursor, self._shared = state.buffer, state.cursor, True
+        self.rank_counts = list(state.rank_counts)
+
+    # =========== Pile Operations ===========
+    def draw_id(self) -> int:
+        if self.cursor >= len(self.buffer):
+            raise IndexError('draw from an empty pile')
+        card_id = self.buffer[self.cursor]
+        self.cursor += 1
+        self.rank_counts[CARD_RANKS[card_id]] -= 1
+        return card_id
+
+    def draw(self) -> Card:
+        return Card.from_id(self.draw_id())
+
+    def add_id(self, card_id: int, to_bottom: bool = False) -> None:
+        self._own()
+        self.rank_counts[CARD_RANKS[card_id]] += 1
+        if to_bottom:
+            self.buffer.append(card_id)
+        elif self.cursor > 0:
+            # reuse the slot of the last drawn card
+            self.cursor -= 1
+            self.buffer[self.cursor] = card_id
+        else:
+            self.buffer.insert(0, card_id)
+
+    def add(self, card: Card, to_bottom: bool = False) -> None:
+        self.add_id(card.id, to_bottom)
+
+    def add_cards(self, cards: List[Card]) -> None:
+        """Puts :param cards on top of the pile in order, as if added one at a time"""
+        ids = array('b', [card.id for card in reversed(cards)])  # the last card added ends up on top
+        rank_counts = self.rank_counts
+        for card in cards:
+            rank_counts[card.points - 1] += 1
+        if self.cursor >= len(ids):
+            self._own()
+            self.cursor -= len(ids)
+            self.buffer[self.cursor:self.cursor + len(ids)] = ids
+        else:
+            self.buffer = ids + self.buffer[self.cursor:]
+            self.cursor, self._shared = 0, False
+
+    def extend_ids(self, card_ids: array) -> None:
+        """Puts :param card_ids on the bottom of the pile in one block copy"""
+        self._own()
+        self.buffer.extend(card_ids)
+        rank_counts = self.rank_counts
+        for card_id in card_ids:
+            rank_counts[CARD_RANKS[card_id]] += 1
+
+    def shuffle(self, rng: Optional[random.Random] = None) -> None:
+        """Permutes the remaining ids in place with :param rng, or the global random stream if no generator is given"""
+        self._compact()
+        self._own()
+        if rng is None:
+            random.shuffle(self.buffer)
+        else:
+            rng.shuffle(self.buffer)
+
+
+class CardShoe(CompactPile):
+    """
+    A dealing shoe of :param n_decks shuffled together, stored as a CompactPile. Both ends are constant time:
+    drawing bumps the cursor and recycled cards are block-copied onto the bottom.
+    A cut card sits :param penetration of the way into the shuffled shoe; once it has been dealt past,
+    needs_reshuffle is set so the table can recycle the discards and reshuffle between rounds
+    """
+    # =========== Constructors ===========
+    def __init__(self, n_decks: int = 1, penetration: float = 0.75) -> None:
+        if n_decks < 1:
+            raise ValueError('A shoe needs at least one deck, not {}'.format(n_decks))
+        if not 0.0 < penetration <= 1.0:
+            raise ValueError('Penetration must be in (0, 1], not {}'.format(penetration))
+        super(CardShoe, self).__init__(list(range(N_CARDS_PER_DECK)) * n_decks)
+        self.n_decks: int = n_decks
+        self.penetration: float = penetration
+        self.cut_card: int = self._cut_card_position()
+        self.shuffled_counts: Tuple[int, ...] = tuple(self.rank_counts)  # the shoe's ranks when last shuffled
+
+    @classmethod
+    def from_standard_deck(cls, n_decks: int = 1) -> CardShoe:
+        return cls(n_decks)
+
+    # =========== Helper Methods ===========
+    def _cut_card_position(self) -> int:
+        """The cursor position of the cut card, never before the first card"""
+        return max(1, int(self.n_items * self.penetration))
+
+    @property
+    def needs_reshuffle(self) -> bool:
+        """This property is True once the cut card has come out (or the shoe is empty)"""
+        return self.cursor >= self.cut_card or self.n_items == 0
+
+    def snapshot(self) -> PileState:
+        return super(CardShoe, self).snapshot()._replace(cut_card=self.cut_card, shuffled_counts=self.shuffled_counts)
+
+    def restore(self, state: PileState) -> None:
+        super(CardShoe, self).restore(state)
+        self.cut_card, self.shuffled_counts = state.cut_card, state.shuffled_counts
+
+    # =========== Pile Operations ===========
+    def shuffle(self, rng: Optional[random.Random] = None) -> None:
+        super(CardShoe, self).shuffle(rng)
+        self.cut_card = self._cut_card_position()
+        self.shuffled_counts = tuple(self.rank_counts)
+
+    def recycle(self, discard_pile: CompactPile) -> None:
+        """Moves the whole discard pile under the remaining cards in one block operation, without shuffling"""
+        if self.n_items == 0:
+            # nothing left to keep, so just swap buffers with the discard pile
+            self.buffer, discard_pile.buffer = discard_pile.buffer, self.buffer
+            self.cursor, discard_pile.cursor = discard_pile.cursor, self.cursor
+            self._shared = discard_pile._shared
+            self.rank_counts = discard_pile.rank_counts
+        else:
+            self.buffer = self.buffer[self.cursor:] + discard_pile.buffer[discard_pile.cursor:]
+            self.cursor, self._shared = 0, False
+            self.rank_counts = [n + m for n, m in zip(self.rank_counts, discard_pile.rank_counts)]
+        # a new empty buffer, since a snapshot may still share the old one
+        discard_pile.buffer, discard_pile.cursor, discard_pile._shared = array('b'), 0, False
+        discard_pile.rank_counts = [0] * N_RANKS
+
+    def reshuffle(self, discard_pile: CompactPile, rng: Optional[random.Random] = None) -> None:
+        """Recycles :param discard_pile into the shoe, shuffles it and places a new cut card"""
+        self.recycle(discard_pile)
+        self.shuffle(rng)
+
+
+class CompactHand:
+    """A hand of cards stored as integer card ids with a parallel byte array of face-up flags"""
+    # =========== Constructors ===========
+    def __init__(self, card_ids: Optional[List[int]] = None) -> None:
+        self.ids: array = array('b', card_ids if card_ids is not None else [])
+        self.visible: array = array('b', [0] * len(self.ids))
+        self.hard_total: int = sum([VALUE_POINTS[card_id % len(CARD_VALUES)] for card_id in self.ids])
+        self.n_aces: int = sum([VALUE_POINTS[card_id % len(CARD_VALUES)] == 1 for card_id in self.ids])
+
+    # =========== Helper Methods ===========
+    @property
+    def value(self) -> HandValue:
+        """This property gets the blackjack value of the hand in constant time"""
+        return get_hand_value(self.hard_total, self.n_aces)
+
+    @property
+    def hand(self) -> List[Card]:
+        """This property gets the hand as Card objects"""
+        return [CARDS[card_id] for card_id in self.ids]
+
+    def to_string(self, all_visible: bool = False) -> str:
+        if len(self.ids) == 0:
+            return '<empty hand>'
+        return ''.join([CARDS[card_id].to_string(visible=(all_visible or bool(visible)))
+                        for card_id, visible in zip(self.ids, self.visible)])
+
+    # =========== Hand Operations ===========
+    def add_id(self, card_id: int, visible: bool = False) -> None:
+        self.ids.append(card_id)
+        self.visible.append(int(visible))
+        points = VALUE_POINTS[card_id % len(CARD_VALUES)]
+        self.hard_total += points
+        self.n_aces += points == 1
+
+    def remove_id(self, card_id: int) -> int:
+        index = self.ids.index(card_id)
+        del self.visible[index]
+        points = VALUE_POINTS[card_id % len(CARD_VALUES)]
+        self.hard_total -= points
+        self.n_aces -= points == 1
+        return self.ids.pop(index)
+
+    def draw(self, pile: CompactPile, visible: bool = False) -> int:
+        card_id = pile.draw_id()
+        self.add_id(card_id, visible)
+        return card_id
+
+    def clear_into(self, pile: CompactPile) -> None:
+        """Moves every card in the hand to the bottom of :param pile in one block copy"""
+        pile.extend_ids(self.ids)
+        self.ids = array('b')
+        self.visible = array('b')
+        self.hard_total, self.n_aces = 0, 0
 
 
 if __name__ == '__main__':
     main_hand = CardHand()
     print(main_hand.to_string())
-    hand = CardHand([Card('2', Suit.DIAMONDS, True), Card('J', Suit.CLUBS, True), Card('4', Suit.SPADES)])
+    hand = CardHand([Card('2', Suit.DIAMONDS), Card('J', Suit.CLUBS)], visible=True)
+    hand.add_card(Card('4', Suit.SPADES))
     print('Printing a hand of cards: ')
     print(hand.to_string())
+    shoe = CardShoe(n_decks=6)
+    print('Six deck shoe with {0} cards, cut card after {1} cards'.format(shoe.n_items, shoe.cut_card))
     pile = CardPile.from_standard_deck()
     print('\n\nPrinting a standard pile: ')
     print(pile)
     print('Drawing a few times into hand...')
     for _ in range(1, 15):
-        hand.add_card(pile.draw())
+        hand.add_card(pile.draw(), visible=True)
     print('\n\nPrinting the new pile: ')
     print(pile)
     print('Printing a hand of cards: ')
@@ -1,6 +1,135 @@
 from __future__ import annotations
-from typing import Dict, Optional, List
-from math import floor, ceil
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, Optional, List, Set, Tuple
+from functools import lru_cache
+from math import gcd
+
+# Fixed order of the denominations in a ChipStack's count vector
+DENOMS: List[str] = ['$1', '$5', '$10', '$20', '$25', '$50', '$100']
+DENOM_VALUES: List[int] = [1, 5, 10, 20, 25, 50, 100]
+DENOM_INDEX: Dict[str, int] = {denom: i for i, denom in enumerate(DENOMS)}
+N_DENOMS: int = len(DENOMS)
+
+
+def filled_vector_from_amount(amount: int) -> List[int]:
+    """This returns a count vector worth :param amount, filled from the highest denomination down"""
+    counts: List[int] = [0] * N_DENOMS
+    for i in range(N_DENOMS - 1, -1, -1):
+        counts[i], amount = divmod(amount, DENOM_VALUES[i])
+    return counts
+
+
+# Every denomination above $1 is a multiple of this, so only $1 chips can pay the remainder of an amount modulo it
+CHIP_STEP: int = gcd(*DENOM_VALUES[1:])
+
+
+def _exact_payment(available: Tuple[int, ...], amount: int, i: int,
+                   dead_ends: Set[Tuple[int, int]]) -> Optional[List[int]]:
+    """
+    Bounded change-making: finds counts of denominations 0..i, no more than :param available, worth exactly
+    :param amount. Larger denominations are tried first, and a branch is dropped as soon as the denominations
+    below it can't cover what is left or can only make amounts of the wrong step, so a hit is usually found on the
+    first path. Every (i, amount) without a payment is kept in :param dead_ends, so no sub-problem is searched twice
+    and a miss can't blow up
+    """
+    if amount == 0:
+        return [0] * N_DENOMS
+    if i < 0 or (i, amount) in dead_ends:
+        return None
+    capacity_below: int = sum([available[j] * DENOM_VALUES[j] for j in range(i)])
+    step_below: int = gcd(*[DENOM_VALUES[j] for j in range(i) if available[j]])  # 0 when there are none
+    value: int = DENOM_VALUES[i]
+    for n in range(min(available[i], amount // value), -1, -1):
+        rest: int = amount - n * value
+        if rest > capacity_below:
+            break  # taking fewer of this denomination only leaves more for the smaller ones
+        if rest and rest % step_below:
+            continue  # the smaller chips only make multiples of step_below
+        payment = _exact_payment(available, rest, i - 1, dead_ends)
+        if payment is not None:
+            payment[i] = n
+            return payment
+    dead_ends.add((i, amount))
+    return None
+
+
+def exact_payment(available: Tuple[int, ...], amount: int) -> Optional[List[int]]:
+    """
+    This returns counts of chips, no more than :param available, worth exactly :param amount, or None. The common
+    misses, too few chips overall or too few $1 chips for the odd dollars, are rejected before any search
+    """
+    if amount % CHIP_STEP > available[0]:
+        return None
+    if sum([qty * value for qty, value in zip(available, DENOM_VALUES)]) < amount:
+        return None
+    return _exact_payment(available, amount, N_DENOMS - 1, set())
+
+
+@lru_cache(maxsize=4096)
+def plan_payment(available: Tuple[int, ...], amount: int) -> Tuple[Tuple[int, ...], int, int]:
+    """
+    This works out which chips to take from a stack holding :param available to pay :param amount, without
+    touching any other chips. It returns (take, broken, change): when no exact combination exists, take overpays
+    by including the smallest chip that covers the shortfall, broken is that chip's denomination index and change
+    is the value that must come back. For an exact payment broken is -1 and change is 0.
+    Callers should clip available with clip_available so that equivalent inventories share a cache entry
+    """
+    exact = exact_payment(available, amount)
+    if exact is not None:
+        return tuple(exact), -1, 0
+    # greedy from the top, then break the smallest chip that's still left over. Every left over chip is worth
+    # more than the shortfall, since the greedy pass only skips a chip when it's bigger than what is still owed
+    take: List[int] = [0] * N_DENOMS
+    owed: int = amount
+    for i in range(N_DENOMS - 1, -1, -1):
+        take[i] = min(available[i], owed // DENOM_VALUES[i])
+        owed -= take[i] * DENOM_VALUES[i]
+    for i in range(N_DENOMS):
+        if available[i] > take[i]:
+            take[i] += 1
+            return tuple(take), i, DENOM_VALUES[i] - owed
+    raise ValueError('Cannot pay {0} from chips {1}'.format(amount, available))
+
+
+def clip_available(counts: List[int], amount: int) -> Tuple[int, ...]:
+    """
+    Caps each count at one more than could ever be used towards :param amount, so a 1000 chip dealer stack
+    and a 10 chip player stack map to the same plan_payment key whenever the difference can't matter
+    """
+    return tuple([min(qty, amount // value + 1) for qty, value in zip(counts, DENOM_VALUES)])
+
+
+class ChipStackView(MutableMapping):
+    """
+    A dict-like '$1'-keyed view of a ChipStack's count vector. Reads and writes go straight to the vector,
+    so code written against the old dictionary stacks keeps working
+    """
+    def __init__(self, chip_stack: ChipStack) -> None:
+        self._chip_stack = chip_stack
+
+    def __getitem__(self, denom: str) -> int:
+        return self._chip_stack.counts[DENOM_INDEX[denom]]
+
+    def __setitem__(self, denom: str, quantity: int) -> None:
+        i = DENOM_INDEX[denom]
+        counts = self._chip_stack.counts
+        self._chip_stack._value += (quantity - counts[i]) * DENOM_VALUES[i]
+        counts[i] = quantity
+
+    def __delitem__(self, denom: str) -> None:
+        raise TypeError('Denominations cannot be removed from a chip stack')
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(DENOMS)
+
+    def __len__(self) -> int:
+        return N_DENOMS
+
+    def __repr__(self) -> str:
+        return repr(self.copy())
+
+    def copy(self) -> Dict[str, int]:
+        return dict(zip(DENOMS, self._chip_stack.counts))
 
 
 class ChipStack:
@@ -14,10 +143,18 @@ class ChipStack:
     # =========== Constructors ===========
     def __init__(self, stack: Optional[Dict[str, int]] = None, name: str = '') -> None:
         self.name = name  # name of the stack
-        self.stack: Dict[str, int] = {'$1': 0, '$5': 0, '$10': 0, '$20': 0, '$25': 0, '$50': 0, '$100': 0}
+        self.counts: List[int] = [0] * N_DENOMS  # chip quantities indexed like DENOMS
+        self._value: int = 0  # total value of the chips, kept up to date by every chip operation
         if stack is not None:
             self._add_chips(stack)
 
+    @classmethod
+    def from_counts(cls, counts: List[int], name: str = '') -> ChipStack:
+        """Initializes the chip stack from a count vector ordered like DENOMS"""
+        chip_stack = cls(name=name)
+        chip_stack.add_vector(counts)
+        return chip_stack
+
     @classmethod
     def from_amount(cls, amount: int = 211) -> ChipStack:
         return cls(stack=ChipStack.filled_stack_from_amount(amount))
@@ -33,10 +170,28 @@ class ChipStack:
         return cls({'$1': 1000, '$5': 1000, '$10': 1000, '$20': 1000, '$25': 1000, '$50': 1000, '$100': 1000}, 'dealer')
 
     # =========== Helper Methods ===========
+    @property
+    def stack(self) -> ChipStackView:
+        """This property gets a '$1'-keyed dictionary view of the count vector"""
+        return ChipStackView(self)
+
+    @stack.setter
+    def stack(self, stack_dict: Dict[str, int]) -> None:
+        self.counts = [stack_dict.get(denom, 0) for denom in DENOMS]
+        self._value = sum([qty * value for qty, value in zip(self.counts, DENOM_VALUES)])
+
     @property
     def stack_value(self) -> int:
-        """This property gets the total value of the chips in the stack"""
-        return ChipStack.get_stack_value(self.stack)
+        """This property gets the total value of the chips in the stack, which is kept as a running total"""
+        return self._value
+
+    def snapshot(self) -> Tuple[Tuple[int, ...], int]:
+        """This returns an immutable copy of the count vector and its value, for restoring the stack later"""
+        return tuple(self.counts), self._value
+
+    def restore(self, state: Tuple[Tuple[int, ...], int]) -> None:
+        counts, self._value = state
+        self.counts = list(counts)
 
     @staticmethod
     def get_stack_value(stack_dict: Dict[str, int]) -> int:
@@ -106,41 +261,61 @@ class ChipStack:
         This function returns a stack dictionary of chips that add up to equal the amount.
         The dictionary is biased high so that $200 yields $100: 2 rather than $1: 200
         """
-        output_dict: Dict[str, int] = ChipStack.get_empty_stack()
-        denoms = list(ChipStack.CHIP_VALUES.keys()).copy()  # don't modify this class attribute
-        denoms.reverse()  # start filling in amount by highest denomination first
-
-        for denom in denoms:
-            # determine number of "denom" chips to put towards reducing amount to 0
-            N = floor(amount / ChipStack.get_chip_value(denom))
-            output_dict[denom] += N
-            amount -= N * ChipStack.get_chip_value(denom)  # reduce amount left to consider
+        return dict(zip(DENOMS, filled_vector_from_amount(amount)))
 
-        return output_dict
 
+    @staticmethod
+    def get_vector(stack_dict: Dict[str, int]) -> List[int]:
+        """
+        This converts a stack dictionary into a count vector ordered like DENOMS
+        Invalid denominations are ignored by using .get(denom, 0) for every valid denomination
+        """
+        return [stack_dict.get(denom, 0) for denom in DENOMS]
 
     # =========== Chip Operations ===========
+    def add_vector(self, added: List[int]) -> None:
+        """This adds a count vector ordered like DENOMS to the stack"""
+        counts = self.counts
+        for i in range(N_DENOMS):
+            counts[i] += added[i]
+        self._value += sum([qty * value for qty, value in zip(added, DENOM_VALUES)])
+
+    def remove_vector(self, removed: List[int]) -> None:
+        """This removes a count vector ordered like DENOMS, leaving the stack untouched if any quantity would go negative"""
+        counts = self.counts
+        for i in range(N_DENOMS):
+            if counts[i] < removed[i]:
+                raise ValueError('The quantity of {0} chips cannot go negative'.format(DENOMS[i]))
+        for i in range(N_DENOMS):
+            counts[i] -= removed[i]
+        self._value -= sum([qty * value for qty, value in zip(removed, DENOM_VALUES)])
+
+    def transfer_vector(self, destination: ChipStack, transferred: List[int]) -> None:
+        """This moves a count vector ordered like DENOMS from this stack to :param destination"""
+        self.remove_vector(transferred)
+        destination.add_vector(transferred)
+
+    def transfer_all(self, destination: ChipStack) -> None:
+        """This moves every chip in this stack to :param destination"""
+        if destination is self:
+            return  # do nothing
+        destination.add_vector(self.counts)
+        self.counts = [0] * N_DENOMS
+        self._value = 0
+
     def _add_chips(self, added_stack: Dict[str, int]) -> None:
         """
         This adds all of the quantities of valid denominations from added_stack to self.stack
-        Valid denominations are handled by iterating over self.stack keys and using .get(key, 0) to make sure its valid
+        Valid denominations are handled by using .get(key, 0) for every denomination to make sure its valid
         """
-        for denomination, quantity in self.stack.items():
-            # for every chip value $1 to $100, check if that is in the added_stack.
-            # if so add its quantity, if not add 0
-            self.stack[denomination] += added_stack.get(denomination, 0)
+        self.add_vector(ChipStack.get_vector(added_stack))
 
     def _remove_chips(self, removed_stack: Dict[str, int]) -> None:
         """
-        This removes all of the quantities of valid denominations from added_stack to self.stack
-        Valid denominations are handled by iterating over self.stack keys and using .get(key, 0) to make sure its valid
+        This removes all of the quantities of valid denominations from removed_stack from self.stack
+        Valid denominations are handled by using .get(key, 0) for every denomination to make sure its valid
         """
-        for denomination, quantity in self.stack.items():
-            # for every chip value $1 to $100, check if that is in the added_stack.
-            # if so add its quantity, if not add 0
-            if self.stack[denomination] - removed_stack.get(denomination, 0) < 0:
-                raise ValueError('The quantity of {0} chips cannot go negative'.format(denomination))
-            self.stack[denomination] -= removed_stack.get(denomination, 0)
+        self.remove_vector(ChipStack.get_vector(removed_stack))
 
     def exchange_chips(self, denom1: str, denom2: str, N1: int = -1) -> None:
         """
@@ -171,10 +346,10 @@ class ChipStack:
         if N1 == -1:
             # exchange ALL chips of denom1 for denom2
             N1 = self.stack[denom1]  # get number of denom1 chips
-        N2: int = floor((denom1_value/denom2_value) * N1)  # number of denom2 chips gained
-        deltaN1: int = ceil((denom2_value/denom1_value) * N2)  # number of denom1 chips used
-        R: int = floor(((denom1_value/denom2_value) * deltaN1 - N2) * denom2_value)  # remainder value
-        if N2 < 1.0:
+        N2: int = (denom1_value * N1) // denom2_value  # number of denom2 chips gained
+        deltaN1: int = -(-denom2_value * N2 // denom1_value)  # number of denom1 chips used, rounded up
+        R: int = denom1_value * deltaN1 - N2 * denom2_value  # remainder value
+        if N2 < 1:
             raise ValueError('You cannot exchange "{0}" for fractional "{1}"'.format(denom1, denom2))
         # add and remove the exchanged quantities
         add_stack: Dict[str, int] = {denom2: N2}
@@ -189,14 +364,8 @@ class ChipStack:
         This function transfers the chip quantities specified in :param transfer_stack to the destination ChipStack
         """
         transfer_success: bool = True
-        # ensure that input is a copy so that state changes during removal doesn't influence add
-        transfer_stack = transfer_stack.copy()
-        try:
-            self._remove_chips(transfer_stack)
-        except ValueError:
-            raise
-        else:
-            destination._add_chips(transfer_stack)
+        # converting to a vector copies the input so that state changes during removal don't influence the add
+        self.transfer_vector(destination, ChipStack.get_vector(transfer_stack))
         return transfer_success
 
     def add_amount_of_chips(self, amount: int) -> None:
@@ -215,19 +384,25 @@ class ChipStack:
     def transfer_amount_of_chips(self, destination: ChipStack, amount: int) -> None:
         """
         This function transfers chips valued at :param amount to the other stack :param destination
-        This function does this by sorting low to reduce all value to $1 chips, transfers the amount as the quantity,
-        and finally sorts the stack back high. This can change the layout of the stack as a side effect but stack value
-        is preserved
+        If some of this stack's chips add up to exactly the amount, those chips are moved and nothing else changes.
+        Otherwise the smallest chip that covers the shortfall is broken: the destination gets its share of that chip
+        and the change comes back to this stack, both filled from the highest denomination down
         """
         if amount == 0:
             return  # do nothing
         if amount > self.stack_value:
             raise ValueError('Cannot remove amount {0}, stack value is only {1}'.format(amount, self.stack_value))
 
-        transfer_stack: Dict[str, int] = {'$1': amount}
-        self.sort_stack(denom_pref='low')  # convert all chips to $1
-        self.transfer_chips(destination=destination, transfer_stack=transfer_stack)
-        self.sort_stack(denom_pref='high')  # could be made to be uniform
+        take, broken, change = plan_payment(clip_available(self.counts, amount), amount)
+        self.remove_vector(take)
+        if broken < 0:
+            destination.add_vector(take)
+            return
+        sent: List[int] = list(take)
+        sent[broken] -= 1
+        share: List[int] = filled_vector_from_amount(DENOM_VALUES[broken] - change)
+        destination.add_vector([qty + extra for qty, extra in zip(sent, share)])
+        self.add_vector(filled_vector_from_amount(change))
 
     def sort_stack(self, denom_pref: str = 'high') -> None:
         """This function exchanges chips in the stack to either be biased low, uniformly, or high"""
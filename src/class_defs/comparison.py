@@ -0,0 +1,159 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+import os
+import random
+from src.class_defs.cards import CardShoe, CompactPile
+from src.class_defs.engine import BlackJackEngine, Decision
+from src.class_defs.online_stats import RunningStats
+from src.class_defs.simulation import SimulationResult, derive_seed, restock, seat_payouts
+from src.class_defs.strategies import Strategy
+
+Contender = Union[Strategy, Decision]
+
+
+class ComparisonResult:
+    """
+    Per-contender results of a common-random-numbers run, plus the paired difference of each contender against the
+    baseline (the first contender). A paired difference is taken per round, summed over the seats, so the luck of
+    the cards cancels out and only the effect of the decisions is left
+    """
+    # =========== Constructors ===========
+    def __init__(self, names: List[str]) -> None:
+        self.names: List[str] = names
+        self.results: Dict[str, SimulationResult] = {name: SimulationResult() for name in names}
+        self.round_payouts: Dict[str, RunningStats] = {name: RunningStats() for name in names}  # summed over seats
+        self.differences: Dict[str, RunningStats] = {name: RunningStats() for name in names[1:]}
+
+    # =========== Helper Methods ===========
+    @property
+    def baseline(self) -> str:
+        return self.names[0]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ComparisonResult):
+            return NotImplemented
+        return self.__dict__ == other.__dict__
+
+    def n_seats(self) -> int:
+        result = self.results[self.baseline]
+        return result.n_hands // result.n_rounds if result.n_rounds > 0 else 0
+
+    def ev_difference(self, name: str) -> float:
+        """This returns the EV per hand of :param name minus the baseline's"""
+        return self.differences[name].mean / self.n_seats()
+
+    def difference_interval(self, name: str, confidence: float = 0.95) -> Tuple[float, float]:
+        low, high = self.differences[name].confidence_interval(confidence)
+        return low / self.n_seats(), high / self.n_seats()
+
+    def variance_reduction(self, name: str) -> float:
+        """
+        This returns how many times more rounds two independent runs would need for the precision of the paired
+        difference, estimated from the per-round variances
+        """
+        independent = self.round_payouts[name].variance + self.round_payouts[self.baseline].variance
+        paired = self.differences[name].variance
+        return independent / paired if paired > 0 else float('inf')
+
+    def summary(self) -> str:
+        lines = ['{0:<12} EV {1:+.5f}'.format(self.baseline, self.results[self.baseline].expected_value)]
+        for name in self.names[1:]:
+            low, high = self.difference_interval(name)
+            lines.append('{0:<12} EV {1:+.5f}  diff {2:+.5f} [{3:+.5f}, {4:+.5f}]  {5:.1f}x fewer rounds'.format(
+                name, self.results[name].expected_value, self.ev_difference(name), low, high,
+                self.variance_reduction(name)))
+        return '\n'.join(lines)
+
+    # =========== Aggregate Operations ===========
+    def merge(self, other: ComparisonResult) -> None:
+        for name in self.names:
+            self.results[name].merge(other.results[name])
+            self.round_payouts[name].merge(other.round_payouts[name])
+        for name in self.names[1:]:
+            self.differences[name].merge(other.differences[name])
+
+
+def run_comparison_chunk(seed: int, n_rounds: int, contenders: Dict[str, Contender], n_seats: int = 1,
+                         n_decks: int = 6, penetration: float = 0.75) -> ComparisonResult:
+    """
+    This plays :param n_rounds with every contender at its own table, all seated with :param n_seats seats playing
+    the contender. Before each round every table is restored to a snapshot of the same shoe and discard pile, and
+    reseeded with the same round seed, so every table is dealt the same cards wherever the decisions agree.
+    The baseline table's piles after the round carry on as the shared shoe, so the shoe depletes as in real play.
+    Seats and banks are restocked as in run_chunk, so a losing contender never drops out of the pairing
+    """
+    names = list(contenders.keys())
+    seat_names = ['seat{}'.format(i) for i in range(n_seats)]
+    rng = random.Random(seed)
+    engines = [BlackJackEngine(seat_names, {seat: contenders[name] for seat in seat_names},
+                               rng=random.Random(0), n_decks=n_decks, penetration=penetration) for name in names]
+    shoe = CardShoe(n_decks, penetration)
+    shoe.shuffle(rng)
+    discard = CompactPile()
+    result = ComparisonResult(names)
+    for _ in range(n_rounds):
+        round_seed = rng.getrandbits(64)
+        payouts: List[float] = []
+        # freeze the shared piles first, since they belong to the baseline table that plays first
+        shoe_state, discard_state = shoe.snapshot(), discard.snapshot()
+        for name, engine in zip(names, engines):
+            restock(engine)  # a losing contender rebuys rather than sitting out, so every table plays every round
+            engine.draw_pile.restore(shoe_state)  # the tables share the buffers copy-on-write
+            engine.discard_pile.restore(discard_state)
+            engine.rng = random.Random(round_seed)  # any reshuffle this round comes out the same at every table
+            outcomes = engine.play_hand()
+            result.results[name].add_round(outcomes, engine.dealer.hand[0].points)
+            payouts.append(sum(seat_payouts(outcomes).values()))
+        for name, payout in zip(names, payouts):
+            result.round_payouts[name].add(payout)
+        for name, payout in zip(names[1:], payouts[1:]):
+            result.differences[name].add(payout - payouts[0])
+        # the baseline's piles carry on; the other tables' hands are thrown away with their copies
+        for i, engine in enumerate(engines):
+            sink = engine.discard_pile if i == 0 else CompactPile()
+            engine.dealer.discard_all(sink)
+            for player in engine.players.values():
+                player.discard_all(sink)
+        shoe, discard = engines[0].draw_pile, engines[0].discard_pile
+    return result
+
+
+def _run_comparison_chunk_args(args: Tuple) -> ComparisonResult:
+    """Unpacks one work item for the process pool"""
+    return run_comparison_chunk(*args)
+
+
+def compare_strategies(contenders: Dict[str, Contender], n_rounds: int, seed: int = 0, n_seats: int = 1,
+                       n_decks: int = 6, penetration: float = 0.75, n_workers: Optional[int] = 1,
+                       chunk_size: int = 10000) -> ComparisonResult:
+    """
+    This plays every contender in :param contenders on common random numbers and returns their paired comparison;
+    the first contender is the baseline. Chunks are seeded with derive_seed and merged in order like run_simulation,
+    so the result doesn't depend on :param n_workers. Contenders must be picklable to use more than one worker
+    """
+    if len(contenders) < 2:
+        raise ValueError('A comparison needs at least two contenders')
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    chunks: List[Tuple] = []
+    for i, start in enumerate(range(0, n_rounds, chunk_size)):
+        chunks.append((derive_seed(seed, i), min(chunk_size, n_rounds - start), contenders, n_seats, n_decks,
+                       penetration))
+    total = ComparisonResult(list(contenders.keys()))
+    if n_workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            total.merge(_run_comparison_chunk_args(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            for chunk_result in pool.map(_run_comparison_chunk_args, chunks):
+                total.merge(chunk_result)
+    return total
+
+
+if __name__ == '__main__':
+    from src.class_defs.dealer_policy import H17
+    from src.class_defs.strategies import BasicStrategy, DealerPolicyStrategy
+    comparison = compare_strategies({'basic': BasicStrategy(), 'mimic S17': DealerPolicyStrategy(),
+                                     'mimic H17': DealerPolicyStrategy(H17)}, n_rounds=20000, seed=2019, n_seats=3)
+    print(comparison.summary())
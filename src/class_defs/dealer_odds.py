@@ -0,0 +1,115 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Iterable, List, Sequence, Tuple
+from src.class_defs.cards import N_RANKS, count_ranks
+from src.class_defs.dealer_policy import S17, DealerPolicy
+from src.class_defs.hand_values import get_hand_value
+
+# A composition is a rank-count vector indexed by blackjack points - 1: aces, 2 through 9, then all ten-valued cards,
+# the same vector a CompactPile keeps as rank_counts (N_RANKS comes from cards)
+# The dealer's possible final results, in the order of a distribution tuple
+DEALER_OUTCOMES: Tuple[str, ...] = ('17', '18', '19', '20', '21', 'bust')
+BUST: int = len(DEALER_OUTCOMES) - 1
+
+Distribution = Tuple[float, ...]
+
+
+def full_shoe_composition(n_decks: int = 1) -> List[int]:
+    """This returns the composition of :param n_decks fresh decks"""
+    return [4 * n_decks] * (N_RANKS - 1) + [16 * n_decks]
+
+
+def composition_from_ids(card_ids: Iterable[int]) -> List[int]:
+    """This counts integer card ids (as stored by CompactPile and CardShoe) into a composition"""
+    return count_ranks(card_ids)
+
+
+class DealerOutcomeCalculator:
+    """
+    Exact probabilities of the dealer's final total given the upcard and the cards left in the shoe.
+    The dealer draws by :param policy, the same DealerPolicy table BlackJackEngine._finish_hand plays from.
+    Intermediate results are memoized by (hard total, has an ace, composition) in a cache that evicts the
+    least recently used entry once it holds :param maxsize results
+    """
+    # =========== Constructors ===========
+    def __init__(self, maxsize: int = 200000, policy: DealerPolicy = S17) -> None:
+        self.maxsize: int = maxsize
+        self.policy: DealerPolicy = policy
+        self._cache: OrderedDict = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    # =========== Helper Methods ===========
+    @property
+    def cache_size(self) -> int:
+        return len(self._cache)
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+        self.hits, self.misses = 0, 0
+
+    @staticmethod
+    def _stand_distribution(best: int) -> Distribution:
+        outcome: List[float] = [0.0] * len(DEALER_OUTCOMES)
+        outcome[BUST if best > 21 else best - 17] = 1.0
+        return tuple(outcome)
+
+    # =========== Calculations ===========
+    def distribution(self, upcard_points: int, composition: Sequence[int]) -> Distribution:
+        """
+        This returns the probability of each DEALER_OUTCOMES entry for a dealer showing an upcard worth
+        :param upcard_points (1 for an ace) whose hole card and hits come from :param composition. A ValueError is
+        raised if some draw would empty the composition before the dealer stands
+        """
+        if sum(composition) == 0:
+            raise ValueError('The dealer cannot draw from an empty composition')
+        return self._final(upcard_points, int(upcard_points == 1), tuple(composition))
+
+    def bust_probability(self, upcard_points: int, composition: Sequence[int]) -> float:
+        return self.distribution(upcard_points, composition)[BUST]
+
+    def _final(self, hard_total: int, has_ace: int, composition: Tuple[int, ...]) -> Distribution:
+        hand_value = get_hand_value(hard_total, has_ace)
+        if self.policy.stands(hard_total, has_ace):
+            return DealerOutcomeCalculator._stand_distribution(hand_value.best)
+        key = (hard_total, has_ace, composition)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return cached
+        self.misses += 1
+
+        n_cards: int = sum(composition)
+        result: List[float] = [0.0] * len(DEALER_OUTCOMES)
+        if n_cards == 0:
+            # a real shoe would be reshuffled here, so there is no exact answer to give
+            raise ValueError('The composition runs out before the dealer reaches a standing total')
+        for rank in range(N_RANKS):
+            count = composition[rank]
+            if count == 0:
+                continue
+            remaining = composition[:rank] + (count - 1,) + composition[rank + 1:]
+            sub = self._final(hard_total + rank + 1, has_ace or int(rank == 0), remaining)
+            weight = count / n_cards
+            for i in range(len(DEALER_OUTCOMES)):
+                result[i] += weight * sub[i]
+
+        distribution: Distribution = tuple(result)
+        self._cache[key] = distribution
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)  # evict the least recently used entry
+        return distribution
+
+
+if __name__ == '__main__':
+    calculator = DealerOutcomeCalculator()
+    shoe = full_shoe_composition(n_decks=6)
+    print('upcard ' + ' '.join([outcome.rjust(6) for outcome in DEALER_OUTCOMES]))
+    for points in range(1, N_RANKS + 1):
+        composition = shoe.copy()
+        composition[points - 1] -= 1  # the upcard is no longer in the shoe
+        row = calculator.distribution(points, composition)
+        print('{0:>6} '.format('A' if points == 1 else points) + ' '.join(['{:6.4f}'.format(p) for p in row]))
+    print('cache entries: {0}, hits: {1}, misses: {2}'.format(calculator.cache_size, calculator.hits,
+                                                              calculator.misses))
@@ -0,0 +1,49 @@
+from __future__ import annotations
+from typing import Dict
+from src.class_defs.hand_values import MAX_TABLE_HARD_TOTAL, compute_hand_value, get_hand_value
+
+DEALER_STAND_VALUE: int = 17  # the dealer stands on this total or more, soft 17 aside under H17
+
+
+class DealerPolicy:
+    """
+    The dealer's hit/stand rule compiled into a table over (hard total, has an ace), the two numbers every hand
+    keeps as it goes, so playing the dealer is one index per card. With :param hits_soft_17 the dealer hits a
+    soft 17 (H17), otherwise the dealer stands on every 17 (S17).
+    The engine, DealerOutcomeCalculator and StrategySolver all read the same policy object
+    """
+    # =========== Constructors ===========
+    def __init__(self, hits_soft_17: bool = False) -> None:
+        self.hits_soft_17: bool = hits_soft_17
+        self.name: str = 'H17' if hits_soft_17 else 'S17'
+        self.table: bytearray = bytearray(2 * (MAX_TABLE_HARD_TOTAL + 1))
+        for hard_total in range(MAX_TABLE_HARD_TOTAL + 1):
+            for has_ace in (0, 1):
+                hand_value = compute_hand_value(hard_total, has_ace)
+                stands = hand_value.best >= DEALER_STAND_VALUE
+                if hits_soft_17 and hand_value.soft and hand_value.best == DEALER_STAND_VALUE:
+                    stands = False
+                self.table[2 * hard_total + has_ace] = stands
+
+    def __repr__(self) -> str:
+        return 'DealerPolicy({})'.format(self.name)
+
+    # =========== Decisions ===========
+    def stands(self, hard_total: int, has_ace: int) -> bool:
+        """This returns True when the dealer stands on a hand of :param hard_total with or without an ace"""
+        if hard_total > MAX_TABLE_HARD_TOTAL:
+            return True  # bust long ago
+        return self.table[2 * hard_total + (1 if has_ace else 0)] == 1
+
+
+S17: DealerPolicy = DealerPolicy(hits_soft_17=False)
+H17: DealerPolicy = DealerPolicy(hits_soft_17=True)
+DEALER_POLICIES: Dict[str, DealerPolicy] = {S17.name: S17, H17.name: H17}
+
+
+if __name__ == '__main__':
+    for policy in (S17, H17):
+        hits = {(get_hand_value(hard, ace).best, get_hand_value(hard, ace).soft)
+                for hard in range(2, 22) for ace in (0, 1) if not policy.stands(hard, ace)}
+        print('{0} hits on: {1}'.format(policy.name, ' '.join(['{0}{1}'.format(best, 's' if soft else '')
+                                                                 for best, soft in sorted(hits)])))
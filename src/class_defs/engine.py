@@ -0,0 +1,634 @@
+from __future__ import annotations
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+import math
+import random
+from src.class_defs.chip_stack import N_DENOMS, ChipStack, filled_vector_from_amount
+from src.class_defs.betting import DEFAULT_BET_POLICY, BetPolicy, BettingState
+from src.class_defs.card_counting import ShoeView
+from src.class_defs.cards import CardHand, CardShoe, CompactPile, HandState, PileState
+from src.class_defs.dealer_policy import DealerPolicy
+from src.class_defs.hand_history import HandHistoryWriter
+from src.class_defs.hand_values import BLACKJACK
+from src.class_defs.players import Player
+from src.class_defs.rules import (ACTION_BITS, CAN_DOUBLE, CAN_SPLIT, CAN_STAND, DEFAULT_RULES, DOUBLED, SETTLED,
+                                  SPLIT_ACE, SPLIT_HAND, SURRENDERED, TableConfig, TableRules, compile_rules,
+                                  is_natural)
+from src.class_defs.strategies import CallbackStrategy, DecisionState, Strategy
+
+# A decision callback receives the acting player and the dealer and returns one of the ACTIONS legal on the hand
+Decision = Callable[[Player, Player], str]
+ACTIONS: Tuple[str, ...] = tuple(ACTION_BITS)
+
+
+def always_stand(player: Player, dealer: Player) -> str:
+    """Default decision for seats without a callback so the headless loop always terminates"""
+    return 'stand'
+
+
+DEFAULT_STRATEGY: Strategy = CallbackStrategy(always_stand)
+
+
+class HandOutcome(NamedTuple):
+    """The settled result of one of a player's hands for one round"""
+    player: str
+    result: str  # one of 'blackjack', 'bust', 'win', 'lose', 'push', 'surrender'
+    player_value: int
+    dealer_value: int
+    bet: int  # the wager the hand was dealt with, before any double
+    payout_rate: float  # net return in units of the bet, e.g. 1.5 for a natural, 2.0 for a doubled win or -0.5
+    hand_index: int = 0  # which of the seat's split hands this is
+    insurance: int = 0  # the net chips of the seat's insurance bet, reported on its first hand
+
+
+class SeatState(NamedTuple):
+    """
+    One seat's part of a GameSnapshot: its hands with their rule flags, and its chips and pots as count vectors with
+    their values
+    """
+    name: str
+    hands: Tuple[HandState, ...]
+    flags: Tuple[int, ...]
+    active_hand: int
+    chips: Tuple[Tuple[int, ...], int]
+    pots: Tuple[Tuple[Tuple[int, ...], int], ...]
+
+
+class GameSnapshot(NamedTuple):
+    """
+    The full state of a table, taken by BlackJackEngine.snapshot. The piles' buffers are shared with the table
+    copy-on-write, so a snapshot costs time proportional to the seats rather than the cards in the shoe
+    """
+    draw_pile: PileState
+    discard_pile: PileState
+    dealer: SeatState
+    seats: Tuple[SeatState, ...]
+    dealt_in_players: Tuple[str, ...]
+    acting_players: Tuple[str, ...]
+    outcomes: Tuple[HandOutcome, ...]
+    insurance: Tuple[Tuple[str, int], ...]
+    rng_state: Optional[tuple]  # only kept when asked for, since it is as large as the generator's state
+
+
+class BlackJackEngine:
+    """
+    The rules of a BlackJack round without any printing, sleeping or prompting.
+    The house rules (payouts, doubling, splitting, insurance, surrender and the dealer's rule) come from
+    :param config, compiled once into TableRules; a :param dealer_policy overrides the config's dealer rule.
+    Each seat's actions come from a Strategy or a plain Decision callback, and its wager from a BetPolicy
+    (the table minimum by default) within the table limits :param min_bet and :param max_bet. Every round returns a
+    list of HandOutcome, one per hand
+    """
+    # =========== Constructors ===========
+    def __init__(self, player_names: Optional[List[str]] = None,
+                 decisions: Optional[Dict[str, Union[Strategy, Decision]]] = None, rng: Optional[random.Random] = None,
+                 n_decks: int = 1, penetration: float = 0.75, history: Optional[HandHistoryWriter] = None,
+                 dealer_policy: Optional[DealerPolicy] = None, bet_policies: Optional[Dict[str, BetPolicy]] = None,
+                 min_bet: int = 1, max_bet: int = 500, config: Optional[TableConfig] = None) -> None:
+        if player_names is None:
+            player_names = ['human']
+        if decisions is None:
+            decisions = {}
+        if rng is None:
+            rng = random.Random()
+        if bet_policies is None:
+            bet_policies = {}
+        if not 0 < min_bet <= max_bet:
+            raise ValueError('Invalid table limits {0}-{1}'.format(min_bet, max_bet))
+        if config is None:
+            config = DEFAULT_RULES.config
+        if dealer_policy is not None:
+            config = config._replace(dealer_rule=dealer_policy.name)
+        self.rng: random.Random = rng  # every shuffle of this table draws from its own generator
+        # Setup the Players
+        self.dealer: Player = Player(name='dealer', chips=ChipStack.from_dealer_stack())
+        self.players: Dict[str, Player] = {name: Player(name, ChipStack.from_standard_stack())
+                                           for name in player_names}
+        self.dealt_in_players: List[str] = list(self.players.keys())  # deal-in all players initially
+        self.acting_players: List[str] = []  # dealt-in players with a hand still to play this round
+        self.decisions: Dict[str, Union[Strategy, Decision]] = decisions
+        self.bet_policies: Dict[str, BetPolicy] = bet_policies
+        self.min_bet: int = min_bet
+        self.max_bet: int = max_bet
+        self.outcomes: List[HandOutcome] = []  # outcomes settled so far in the current round
+        self.insurance: Dict[str, int] = {}  # net chips of each insurance bet settled this round
+        self.history: Optional[HandHistoryWriter] = history  # records every round's events when set
+        self.rules: TableRules = compile_rules(config)
+        self.dealer_policy: DealerPolicy = self.rules.dealer_policy  # the dealer's hit/stand rule, S17 or H17
+        # Setup the Decks
+        self.draw_pile: CardShoe = CardShoe(n_decks, penetration)
+        self.draw_pile.shuffle(self.rng)
+        self.discard_pile: CompactPile = CompactPile()
+        self._record_shuffle()
+
+    # =========== Seating ===========
+    # Seats may only be changed between rounds
+    def add_player(self, player_name: str, decision: Optional[Union[Strategy, Decision]] = None,
+                   bet_policy: Optional[BetPolicy] = None) -> Player:
+        """This seats a new player with a standard stack, joining from the next round"""
+        if player_name in self.players:
+            raise KeyError('There is already a player named {}'.format(player_name))
+        player = Player(player_name, ChipStack.from_standard_stack())
+        self.players[player_name] = player
+        if decision is not None:
+            self.decisions[player_name] = decision
+        if bet_policy is not None:
+            self.bet_policies[player_name] = bet_policy
+        return player
+
+    def remove_player(self, player_name: str) -> Player:
+        """This unseats a player, discarding their cards"""
+        player = self.players.pop(player_name)
+        player.discard_all(self.discard_pile)
+        self.decisions.pop(player_name, None)
+        self.bet_policies.pop(player_name, None)
+        return player
+
+    # =========== Snapshots ===========
+    # Forking a table for lookahead or what-if play: snapshot it, play on, and restore it as often as needed
+    @staticmethod
+    def _seat_state(player: Player) -> SeatState:
+        return SeatState(player.name, tuple([hand.snapshot() for hand in player.hands]), tuple(player.hand_flags),
+                         player.active_hand, player.chips.snapshot(), tuple([pot.snapshot() for pot in player.pots]))
+
+    @staticmethod
+    def _restore_seat(player: Player, state: SeatState) -> None:
+        # the first hand and pot are restored in place, since views such as ShoeView may hold on to them
+        n_hands = len(state.hands)
+        del player.hands[n_hands:], player.pots[n_hands:]
+        while len(player.hands) < n_hands:
+            player.hands.append(CardHand())
+            player.pots.append(ChipStack())
+        for hand, hand_state in zip(player.hands, state.hands):
+            hand.restore(hand_state)
+        for pot, pot_state in zip(player.pots, state.pots):
+            pot.restore(pot_state)
+        player.hand_flags = list(state.flags)
+        player.active_hand = state.active_hand
+        player.chips.restore(state.chips)
+
+    def snapshot(self, include_rng: bool = False) -> GameSnapshot:
+        """
+        This captures the table's state between any two actions. With :param include_rng the generator's state is kept
+        too, so reshuffles after a restore come out the same; otherwise they keep drawing from the live generator
+        """
+        return GameSnapshot(self.draw_pile.snapshot(), self.discard_pile.snapshot(), self._seat_state(self.dealer),
+                            tuple([self._seat_state(player) for player in self.players.values()]),
+                            tuple(self.dealt_in_players), tuple(self.acting_players), tuple(self.outcomes),
+                            tuple(self.insurance.items()), self.rng.getstate() if include_rng else None)
+
+    def restore(self, snapshot: GameSnapshot) -> None:
+        """
+        This puts the table back to :param snapshot in time proportional to the seats, with the same players seated.
+        The hand history is not rewound, so tables being forked shouldn't be recording one
+        """
+        if len(snapshot.seats) != len(self.players):
+            raise KeyError('The snapshot was taken with different players seated')
+        self.draw_pile.restore(snapshot.draw_pile)
+        self.discard_pile.restore(snapshot.discard_pile)
+        self._restore_seat(self.dealer, snapshot.dealer)
+        for state in snapshot.seats:
+            self._restore_seat(self.players[state.name], state)
+        self.dealt_in_players = list(snapshot.dealt_in_players)
+        self.acting_players = list(snapshot.acting_players)
+        self.outcomes = list(snapshot.outcomes)
+        self.insurance = dict(snapshot.insurance)
+        if snapshot.rng_state is not None:
+            self.rng.setstate(snapshot.rng_state)
+
+    # =========== Helper Methods ===========
+    @staticmethod
+    def get_hand_value(player: Player) -> Tuple[int]:
+        """This returns the possible values of the player's hand: the hard total (aces as 1), plus the soft total
+        (one ace as 11) if the hand has an ace. It is read from the hand's running total in constant time"""
+        return player.hand_value.values
+
+    @staticmethod
+    def get_best_hand_value(player: Player) -> int:
+        """This returns the highest hand value that doesn't bust, or the hard total if every option busts"""
+        return player.hand_value.best
+
+    @staticmethod
+    def is_bust(player: Player) -> bool:
+        """If all of the possible values are above 21, then the player has busted"""
+        return player.hand_value.bust
+
+    @staticmethod
+    def is_blackjack(player: Player, payout_rate: Optional[float] = None) -> Tuple[bool, float]:
+        """A natural (blackjack) is 21 on the first two cards of a hand that wasn't split, and pays :param payout_rate,
+        3:2 unless given. Any other 21 is an ordinary hand that stands"""
+        if is_natural(player._player_hand, player.hand_flags[player.active_hand]):
+            return True, DEFAULT_RULES.blackjack_payout if payout_rate is None else payout_rate
+        return False, 0
+
+    def dealer_has_natural(self) -> bool:
+        return is_natural(self.dealer._player_hand)
+
+    def legal_actions(self, player: Player) -> int:
+        """
+        This returns the legal-action bits of the player's active hand from the compiled rules, without double and
+        split when the player's chips can't match the bet
+        """
+        legal = self.rules.legal_actions(player._player_hand, player.hand_flags[player.active_hand], len(player.hands))
+        if legal & (CAN_DOUBLE | CAN_SPLIT) and player.chips.stack_value < player.bet_value:
+            legal &= ~(CAN_DOUBLE | CAN_SPLIT)
+        return legal
+
+    def needs_decision(self, player: Player) -> bool:
+        """A hand that may only stand (21, bust, or split aces) is played without asking the seat"""
+        return self.legal_actions(player) & ~CAN_STAND != 0
+
+    @property
+    def shoe_view(self) -> ShoeView:
+        """This property gets a read-only view of the unseen cards and the counts, with the hole card still unseen"""
+        return ShoeView(self.draw_pile, hidden=self.dealer._player_hand)
+
+    def _record_shuffle(self) -> None:
+        if self.history is not None:
+            self.history.shuffle(self.draw_pile.buffer[self.draw_pile.cursor:].tobytes())
+
+    # =========== Game Actions ===========
+    # These are the fundamental operations of a game
+    def take_bets(self, min_bet: Optional[int] = None) -> None:
+        """
+        This asks each dealt-in player's BetPolicy for a wager of at least :param min_bet (the table minimum by default),
+        caps it at the table maximum and the player's chips, and moves it into the player's pot in one transfer.
+        Players who bet 0 or can't cover the minimum sit the round out
+        """
+        if min_bet is None:
+            min_bet = self.min_bet
+        shoe: ShoeView = self.shoe_view
+        betting: List[str] = []
+        for player_name in self.dealt_in_players:  # the dealer doesn't have to buy-in; they are the house
+            player: Player = self.players[player_name]
+            bankroll: int = player.chips.stack_value
+            policy: BetPolicy = self.bet_policies.get(player_name, DEFAULT_BET_POLICY)
+            amount: int = policy.bet(BettingState(player_name, bankroll, min_bet, self.max_bet, shoe))
+            if amount < 0:
+                raise ValueError('{0} cannot bet a negative amount {1}'.format(player_name, amount))
+            amount = min(amount, self.max_bet, bankroll)
+            if amount == 0 or amount < min_bet:
+                continue  # sits out this round
+            player.chips.transfer_amount_of_chips(player.pot, amount)
+            betting.append(player_name)
+        self.dealt_in_players = betting
+
+    def deal_cards(self, players: List[Player], n_cards: int = 1, n_visible: Optional[int] = None) -> None:
+        """
+        This function deals :param n_cards to each player in the list :param players. This is specified this way so that
+        the dealer can deal to himself separately from players
+        If the draw pile runs out mid-round, the discard pile is recycled into it in one step and shuffled.
+        Leaving :param n_visible as None deals every card face up.
+        """
+        for player in players:
+            n_face_up: int = n_cards if n_visible is None else n_visible
+            for i in range(n_cards):
+                # check to see if draw pile still has cards in it
+                if self.draw_pile.n_items == 0:
+                    # if not, shuffle discard pile into draw pile and continue
+                    self.draw_pile.reshuffle(self.discard_pile, self.rng)
+                    self._record_shuffle()
+
+                visible: bool = True if n_face_up > 0 else False  # flag to see if this card is visible
+                player.draw(self.draw_pile, n_cards=1, all_visible=visible)
+                if self.history is not None:
+                    self.history.deal(player.name, player.hand[-1].id, visible, player.active_hand)
+                n_face_up -= 1
+
+    def classify(self, player: Player, dealer_value: Optional[int] = None,
+                 hand_index: Optional[int] = None) -> Optional[Tuple[str, float]]:
+        """
+        This returns the (result, payout rate) of one of :param player's hands (the active one unless
+        :param hand_index is given), or None while the hand is still live. Naturals, busts and surrenders are settled
+        as soon as they happen; passing the dealer's final :param dealer_value also settles a standing hand against
+        the dealer. A doubled hand wins or loses twice the bet
+        """
+        i: int = player.active_hand if hand_index is None else hand_index
+        hand, flags = player.hands[i], player.hand_flags[i]
+        if flags & SURRENDERED:
+            return 'surrender', -0.5
+        hand_value = hand.value
+        stake: float = 2.0 if flags & DOUBLED else 1.0
+        if hand_value.bust:
+            return 'bust', -stake
+        if is_natural(hand, flags):
+            # a natural has nothing left to play, so it is paid at once unless the dealer has one too
+            return ('push', 0.0) if self.dealer_has_natural() else ('blackjack', self.rules.blackjack_payout)
+        if dealer_value is None:
+            return None
+        if self.dealer_has_natural():
+            return 'lose', -stake  # a dealer natural beats any other 21
+        if dealer_value > BLACKJACK or hand_value.best > dealer_value:
+            return 'win', stake
+        if hand_value.best < dealer_value:
+            return 'lose', -stake
+        return 'push', 0.0  # Player does not lose their money, but doesn't get paid out
+
+    def settle(self, player: Player, result: str, payout_rate: float) -> HandOutcome:
+        """This settles the player's active hand, see settle_all"""
+        return self.settle_all([(player, player.active_hand, result, payout_rate)])[0]
+
+    def settle_all(self, settlements: List[Tuple[Player, int, str, float]]) -> List[HandOutcome]:
+        """
+        This settles every (player, hand index, result, payout rate) in :param settlements as one ledger update to the
+        dealer's bank: the losing pots are summed into one deposit and the winnings into one withdrawal, so the bank
+        changes once however many hands there are. Each pot then goes back to its player and the outcomes are
+        recorded. Rounding goes to the house: winnings are rounded down and paid in the largest chips, and the half
+        bet lost to a surrender is rounded up. A seat is done for the round once all of its hands are settled
+        """
+        bank: ChipStack = self.dealer.chips
+        deposit: List[int] = [0] * N_DENOMS
+        withdrawal: List[int] = [0] * N_DENOMS
+        winnings: List[Tuple[ChipStack, int, List[int]]] = []
+        bets: List[int] = []
+        stakes: List[int] = []
+        for player, i, result, payout_rate in settlements:
+            pot: ChipStack = player.pots[i]
+            stake: int = pot.stack_value
+            bet: int = stake // 2 if player.hand_flags[i] & DOUBLED else stake
+            bets.append(bet)
+            stakes.append(stake)
+            if payout_rate > 0:
+                amount = int(payout_rate * bet)
+                paid = filled_vector_from_amount(amount)
+                winnings.append((pot, amount, paid))
+                withdrawal = [total + qty for total, qty in zip(withdrawal, paid)]
+            elif payout_rate < 0:
+                amount = min(stake, math.ceil(-payout_rate * bet))
+                if amount < stake:
+                    pot.transfer_amount_of_chips(bank, amount)  # only part of the pot is lost, so make change
+                    continue
+                lost = list(pot.counts)
+                pot.remove_vector(lost)
+                deposit = [total + qty for total, qty in zip(deposit, lost)]
+        bank.add_vector(deposit)
+        if all([have >= need for have, need in zip(bank.counts, withdrawal)]):
+            bank.remove_vector(withdrawal)
+            for pot, amount, paid in winnings:
+                pot.add_vector(paid)
+        else:
+            # the bank is short of some denomination, so make change hand by hand
+            for pot, amount, paid in winnings:
+                bank.transfer_amount_of_chips(pot, amount)
+
+        dealer_value: int = self.dealer.hand_value.best
+        outcomes: List[HandOutcome] = []
+        for (player, i, result, payout_rate), bet, stake in zip(settlements, bets, stakes):
+            chip_delta: int = player.pots[i].stack_value - stake
+            player.pots[i].transfer_all(player.chips)  # whatever is left in the pot goes back to the player
+            player.hand_flags[i] |= SETTLED
+            insurance: int = self.insurance.get(player.name, 0) if i == 0 else 0
+            outcomes.append(HandOutcome(player.name, result, player.hands[i].value.best, dealer_value, bet,
+                                        float(payout_rate), i, insurance))
+            if self.history is not None:
+                self.history.payout(player.name, result, payout_rate, bet, chip_delta, i)
+        self.outcomes.extend(outcomes)
+        settled = {player.name for player, _, _, _ in settlements
+                   if all([flags & SETTLED for flags in player.hand_flags])}
+        if settled:
+            self.dealt_in_players = [name for name in self.dealt_in_players if name not in settled]
+        return outcomes
+
+    def check_for_payout(self, player: Player) -> bool:
+        """
+        This function checks to see if a single player (not a dealer) has gotten blackjack, busted or surrendered
+        their active hand. If they have, the hand is settled and True is returned
+        """
+        settlement = self.classify(player)
+        if settlement is None:
+            return False
+        self.settle(player, *settlement)
+        return True
+
+    def check_for_payouts(self, end_of_hand: bool = False) -> None:
+        """
+        This function checks every unsettled hand of the dealt-in players for naturals, busts and surrenders.
+        Those are paid out, and seats whose hands are all settled are removed from the dealt-in players.
+        Additionally, if its the end of the hand, the scores vs. the dealer are checked and paid out.
+        Every hand is classified in one pass against the dealer's value, then all of them are settled together
+        """
+        dealer_value: Optional[int] = self.dealer.hand_value.best if end_of_hand else None
+        settlements: List[Tuple[Player, int, str, float]] = []
+        for player_name in self.dealt_in_players:
+            player: Player = self.players[player_name]
+            for i, flags in enumerate(player.hand_flags):
+                if flags & SETTLED:
+                    continue
+                settlement = self.classify(player, dealer_value, i)
+                if settlement is not None:
+                    settlements.append((player, i, settlement[0], settlement[1]))
+        if settlements:
+            self.settle_all(settlements)
+
+    def offer_insurance(self) -> None:
+        """
+        This asks the Strategy of each dealt-in seat whether to insure against the dealer's ace: a side bet of half
+        the wager that pays 2:1 if the hole card makes a natural. It is settled against the hole card straight away,
+        and its net chips are reported on the seat's first HandOutcome
+        """
+        dealer_natural: bool = self.dealer_has_natural()
+        bank: ChipStack = self.dealer.chips
+        shoe: ShoeView = self.shoe_view
+        for player_name in self.dealt_in_players:
+            player: Player = self.players[player_name]
+            stake: int = min(player.bet_value // 2, player.chips.stack_value)
+            if stake == 0:
+                continue
+            state = DecisionState.from_players(player, self.dealer, shoe, self.legal_actions(player))
+            if not self.get_strategy(player_name).take_insurance(state):
+                continue
+            if dealer_natural:
+                bank.transfer_amount_of_chips(player.chips, 2 * stake)
+                self.insurance[player_name] = 2 * stake
+            else:
+                player.chips.transfer_amount_of_chips(bank, stake)
+                self.insurance[player_name] = -stake
+            if self.history is not None:
+                self.history.insurance(player_name, stake, self.insurance[player_name])
+
+    # =========== Control Flow Actions ===========
+    # These are the phases of a round, run in order by play_hand
+    def play_hand(self, buy_in: Optional[int] = None) -> List[HandOutcome]:
+        """This plays one full round and returns the outcome of every player's hand. See play_hands for many tables"""
+        self._init_hand(buy_in)
+        return self.play_out()
+
+    def play_out(self) -> List[HandOutcome]:
+        """This plays the current round to the end from wherever it is, e.g. from a restored snapshot"""
+        self._loop_hand()
+        return self._finish_hand()
+
+    def _init_hand(self, buy_in: Optional[int] = None) -> None:
+        """This initializes a hand of blackjack with a minimum buy-in of :param buy_in dollars, or the table minimum"""
+        # first discard any cards in the hand already
+        self.dealer.discard_all(self.discard_pile)
+        for player in self.players.values():
+            player.discard_all(self.discard_pile)
+        # reshuffle between rounds once the cut card has come out
+        if self.draw_pile.needs_reshuffle:
+            self.draw_pile.reshuffle(self.discard_pile, self.rng)
+            self._record_shuffle()
+        self.outcomes = []
+        # then take the bets; the players who don't buy-in sit the hand out
+        self.dealt_in_players = list(self.players.keys())  # deal in all players initially
+        self.take_bets(min_bet=buy_in)
+        if self.history is not None:
+            self.history.begin_round(self.dealt_in_players)
+        # second deal hands to all players that are still dealt-in
+        self.deal_cards([self.players[name] for name in self.dealt_in_players], n_cards=2, n_visible=2)  # face up
+        self.deal_cards([self.dealer], n_cards=1, n_visible=1)  # one face up
+        self.deal_cards([self.dealer], n_cards=1, n_visible=0)  # one face down
+        # lastly offer insurance, let the dealer peek under an ace or ten-card, and pay any naturals
+        self.insurance = {}
+        upcard_points: int = self.dealer.hand[0].points
+        if upcard_points == 1 and self.rules.config.insurance:
+            self.offer_insurance()
+        if self.rules.config.dealer_peeks and upcard_points in (1, 10) and self.dealer_has_natural():
+            self.check_for_payouts(end_of_hand=True)  # the round is over before anyone acts
+        else:
+            self.check_for_payouts(end_of_hand=False)
+        self.acting_players = list(self.dealt_in_players)
+
+    def get_strategy(self, player_name: str) -> Strategy:
+        """This returns the seat's Strategy, wrapping a plain Decision callback if that's what the seat was given"""
+        decision = self.decisions.get(player_name)
+        if decision is None:
+            return DEFAULT_STRATEGY
+        if isinstance(decision, Strategy):
+            return decision
+        return CallbackStrategy(decision)
+
+    def pending_decisions(self) -> List[DecisionState]:
+        """This returns the decision state of the active hand of every seat still acting"""
+        shoe = self.shoe_view
+        return [DecisionState.from_players(player, self.dealer, shoe, self.legal_actions(player))
+                for player in [self.players[name] for name in self.acting_players]]
+
+    def apply_action(self, player_name: str, action: str) -> None:
+        """
+        This carries out one of the ACTIONS on a seat's active hand. Once the hand is done it moves on to the seat's
+        next split hand, and takes the seat out of the acting players after its last hand
+        """
+        player: Player = self.players[player_name]
+        if not ACTION_BITS.get(action, 0) & self.legal_actions(player):
+            raise ValueError('Invalid action "{0}" for {1}'.format(action, player_name))
+        if self.history is not None:
+            self.history.action(player_name, action, player.active_hand)
+        if action == 'hit':
+            self.deal_cards([player], n_cards=1, n_visible=1)
+            if self.needs_decision(player):
+                return  # still acting
+        elif action == 'double':
+            player.chips.transfer_amount_of_chips(player.pot, player.bet_value)
+            player.hand_flags[player.active_hand] |= DOUBLED
+            self.deal_cards([player], n_cards=1, n_visible=1)  # exactly one more card
+        elif action == 'split':
+            self.split(player)
+            if self.needs_decision(player):
+                return
+        elif action == 'surrender':
+            player.hand_flags[player.active_hand] |= SURRENDERED
+        self._next_hand(player)
+
+    def split(self, player: Player) -> None:
+        """
+        This splits the player's active pair into two hands, matching the bet for the new hand, and deals the active
+        hand its second card. The new hand gets its second card when its turn comes
+        """
+        i: int = player.active_hand
+        flags: int = SPLIT_HAND | (SPLIT_ACE if player.hand[0].points == 1 else 0)
+        new_hand: int = player.split_hand()
+        player.chips.transfer_amount_of_chips(player.pots[new_hand], player.bet_value)
+        player.hand_flags[i] |= flags
+        player.hand_flags[new_hand] = flags
+        self.deal_cards([player], n_cards=1, n_visible=1)
+
+    def _next_hand(self, player: Player) -> None:
+        """
+        This settles the active hand if it busted or was surrendered, then moves on to the seat's next hand that needs
+        a decision, or takes the seat out of the acting players once its hands are all played
+        """
+        self.check_for_payout(player)
+        while player.active_hand + 1 < len(player.hands):
+            player.active_hand += 1
+            self.deal_cards([player], n_cards=1, n_visible=1)  # split hands wait on one card until their turn
+            if self.needs_decision(player):
+                return
+        self.acting_players.remove(player.name)
+
+    def _loop_hand(self) -> None:
+        """This runs the game in the looping state until an exit condition (every hand is played) is reached"""
+        loop_hands([self])
+
+    def _finish_hand(self) -> List[HandOutcome]:
+        """After exit condition for looping state is reached, this method plays the dealer and settles the hand"""
+        # Dealer turns up their face down card
+        self.dealer.reveal_hand()
+        # Continue hitting until the table's dealer policy stands, looking the running hand up in its compiled table
+        # NOTE: aces count as 11 if doing so brings hand value to 17 or more (but not over 21)
+        hand, stands = self.dealer._player_hand, self.dealer_policy.stands
+        while not stands(hand.hard_total, hand.n_aces):
+            self.deal_cards([self.dealer], n_cards=1, n_visible=1)
+
+        # if the dealer busts, that is handled in the payouts phase next:
+        self.check_for_payouts(end_of_hand=True)
+        if self.history is not None:
+            self.history.end_round(BlackJackEngine.get_best_hand_value(self.dealer))
+        return self.outcomes
+
+
+def _batch_key(strategy: Strategy) -> Tuple[int, bool]:
+    """
+    Seats are batched by Strategy, and seats given the same plain callback by that callback, since each of them
+    gets its own CallbackStrategy wrapper. The ids only need to hold for one step, while the engines keep the
+    strategies and callbacks alive
+    """
+    if isinstance(strategy, CallbackStrategy):
+        return id(strategy.callback), strategy.batched
+    return id(strategy), False
+
+
+def loop_hands(engines: List[BlackJackEngine]) -> None:
+    """
+    This runs the playing phase of several tables together. Each step gathers the pending decision of every
+    acting seat on every table, asks each distinct Strategy (or callback) for all of its seats' actions in a single
+    decide_batch call, then applies the actions. Steps repeat until no seat on any table is still acting
+    """
+    while True:
+        groups: Dict[Tuple[int, bool], Tuple[Strategy, List[BlackJackEngine], List[DecisionState]]] = {}
+        for engine in engines:
+            for state in engine.pending_decisions():
+                strategy = engine.get_strategy(state.seat)
+                key = _batch_key(strategy)
+                group = groups.get(key)
+                if group is None:
+                    group = groups[key] = (strategy, [], [])
+                group[1].append(engine)
+                group[2].append(state)
+        if len(groups) == 0:
+            return
+        for strategy, group_engines, states in groups.values():
+            for engine, state, action in zip(group_engines, states, strategy.decide_batch(states)):
+                engine.apply_action(state.seat, action)
+
+
+def play_hands(engines: List[BlackJackEngine], buy_in: Optional[int] = None) -> List[List[HandOutcome]]:
+    """This plays one round on every table in :param engines, batching decisions across all of them"""
+    for engine in engines:
+        engine._init_hand(buy_in)
+    loop_hands(engines)
+    return [engine._finish_hand() for engine in engines]
+
+
+if __name__ == '__main__':
+    engine = BlackJackEngine(['npc'], decisions={'npc': lambda p, d: 'hit' if len(p.hand) < 3 else 'stand'})
+    for _ in range(5):
+        for hand_outcome in engine.play_hand():
+            print(hand_outcome)
+
+    # forking a table: a snapshot and restore against a deepcopy of the whole engine
+    import copy
+    import timeit
+    engine._init_hand()
+    print('snapshot+restore: {0:.1f}us, deepcopy: {1:.1f}us'.format(
+        timeit.timeit(lambda: engine.restore(engine.snapshot()), number=2000) / 2000 * 1e6,
+        timeit.timeit(lambda: copy.deepcopy(engine), number=200) / 200 * 1e6))
@@ -0,0 +1,299 @@
+from __future__ import annotations
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple
+import mmap
+import struct
+import zlib
+from src.class_defs.cards import CARD_VALUES, VALUE_POINTS
+from src.class_defs.hand_values import get_hand_value
+
+# A log is an 8 byte header (magic, format version, record size) followed by fixed-width little-endian records:
+# round index u32, event u8, seat u8, hand u8 (which of the seat's split hands), code i8, flag i8, value i64, extra i64
+MAGIC: bytes = b'BJHL'
+VERSION: int = 2
+HEADER = struct.Struct('<4sHH')
+RECORD = struct.Struct('<IBBBbbqq')
+DEALER_SEAT: int = 255
+
+# Event types, and what each record's code/flag/value/extra hold
+ROUND = 0  # a round begins: code = number of seats dealt in
+SEAT = 1  # a seat index is assigned: value = first 8 bytes of the seat name
+SHUFFLE = 2  # the shoe was shuffled: value = cards in the shoe, extra = crc32 of the shuffled order
+DEAL = 3  # code = card id, flag = dealt face up
+ACTION = 4  # code = index into ACTION_CODES; a split moves the hand's second card to a new hand after the last one
+PAYOUT = 5  # code = index into RESULT_CODES, flag = payout rate in tenths of a bet, value = bet, extra = chip delta
+END = 6  # the round is settled: code = the dealer's final value
+INSURANCE = 7  # an insurance bet was settled: value = stake, extra = chip delta
+EVENT_NAMES: Tuple[str, ...] = ('round', 'seat', 'shuffle', 'deal', 'action', 'payout', 'end', 'insurance')
+ACTION_CODES: Tuple[str, ...] = ('hit', 'stand', 'double', 'split', 'surrender')
+RESULT_CODES: Tuple[str, ...] = ('blackjack', 'bust', 'win', 'lose', 'push', 'surrender')
+
+
+class HistoryRecord(NamedTuple):
+    round: int
+    event: int
+    seat: int
+    hand: int
+    code: int
+    flag: int
+    value: int
+    extra: int
+
+
+class LoggedPayout(NamedTuple):
+    seat: str
+    result: str
+    payout_rate: float
+    bet: int
+    chip_delta: int
+    hand: int
+
+
+class LoggedRound(NamedTuple):
+    """One round rebuilt from the log"""
+    index: int
+    cards: Dict[str, List[List[int]]]  # card ids of each of a seat's hands, the dealer included, in deal order
+    actions: List[Tuple[str, str]]
+    payouts: List[LoggedPayout]
+    dealer_value: int
+
+
+def encode_name(name: str) -> int:
+    return int.from_bytes(name.encode()[:8].ljust(8, b'\0'), 'little')
+
+
+def decode_name(label: int) -> str:
+    return label.to_bytes(8, 'little').rstrip(b'\0').decode(errors='replace')
+
+
+def best_value(card_ids: List[int]) -> int:
+    """This returns the best value of a hand of card ids"""
+    points = [VALUE_POINTS[card_id % len(CARD_VALUES)] for card_id in card_ids]
+    return get_hand_value(sum(points), points.count(1)).best
+
+
+class HandHistoryWriter:
+    """
+    Appends the events of every round to a binary log. Records are packed into an in-memory buffer that is written
+    out once it holds :param buffer_records records, so logging costs no system call per event.
+    Give it to BlackJackEngine as its history to record the table
+    """
+    # =========== Constructors ===========
+    def __init__(self, path: str, buffer_records: int = 4096) -> None:
+        self.path: str = path
+        self.buffer_size: int = buffer_records * RECORD.size
+        self._buffer: bytearray = bytearray()
+        self._file: BinaryIO = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self.seats: Dict[str, int] = {'dealer': DEALER_SEAT}
+        self.round_index: int = 0
+        self.n_records: int = 0
+
+    def __enter__(self) -> HandHistoryWriter:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # =========== Helper Methods ===========
+    def _append(self, event: int, seat: int = 0, code: int = 0, flag: int = 0, value: int = 0, extra: int = 0,
+                hand: int = 0) -> None:
+        self._buffer += RECORD.pack(self.round_index, event, seat, hand, code, flag, value, extra)
+        self.n_records += 1
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def _seat(self, name: str) -> int:
+        seat = self.seats.get(name)
+        if seat is None:
+            seat = len(self.seats) - 1  # the dealer's entry isn't a numbered seat
+            if seat >= DEALER_SEAT:
+                raise ValueError('A history log can hold at most {} seats'.format(DEALER_SEAT))
+            self.seats[name] = seat
+            self._append(SEAT, seat, value=encode_name(name))
+        return seat
+
+    def flush(self) -> None:
+        self._file.write(self._buffer)
+        self._buffer = bytearray()
+        self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    # =========== Events ===========
+    def begin_round(self, seat_names: List[str]) -> None:
+        self.round_index += 1
+        for name in seat_names:
+            self._seat(name)
+        self._append(ROUND, code=len(seat_names))
+
+    def shuffle(self, card_ids: bytes) -> None:
+        """This records a shuffle given the shoe's remaining card ids in dealing order"""
+        self._append(SHUFFLE, value=len(card_ids), extra=zlib.crc32(card_ids))
+
+    def deal(self, name: str, card_id: int, visible: bool, hand: int = 0) -> None:
+        self._append(DEAL, self._seat(name), card_id, int(visible), hand=hand)
+
+    def action(self, name: str, action: str, hand: int = 0) -> None:
+        self._append(ACTION, self._seat(name), ACTION_CODES.index(action), hand=hand)
+
+    def payout(self, name: str, result: str, payout_rate: float, bet: int, chip_delta: int, hand: int = 0) -> None:
+        self._append(PAYOUT, self._seat(name), RESULT_CODES.index(result), round(payout_rate * 10), bet, chip_delta,
+                     hand)
+
+    def insurance(self, name: str, stake: int, chip_delta: int) -> None:
+        self._append(INSURANCE, self._seat(name), value=stake, extra=chip_delta)
+
+    def end_round(self, dealer_value: int) -> None:
+        self._append(END, DEALER_SEAT, dealer_value)
+
+
+class HandHistoryReader:
+    """
+    Reads a log through a read-only memory map, so replaying millions of hands pages the file in on demand
+    instead of loading or re-simulating it
+    """
+    # =========== Constructors ===========
+    def __init__(self, path: str) -> None:
+        self._file: BinaryIO = open(path, 'rb')
+        self._map: mmap.mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError('{} is not a version {} hand history log'.format(path, VERSION))
+        self.n_records: int = (len(self._map) - HEADER.size) // RECORD.size
+
+    def __enter__(self) -> HandHistoryReader:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    # =========== Record Access ===========
+    def record(self, i: int) -> HistoryRecord:
+        if not 0 <= i < self.n_records:
+            raise IndexError('Record {} is out of range'.format(i))
+        return HistoryRecord(*RECORD.unpack_from(self._map, HEADER.size + i * RECORD.size))
+
+    def raw_records(self) -> Iterator[Tuple[int, ...]]:
+        """This iterates over every record as a plain tuple, the fastest way through the log"""
+        view = memoryview(self._map)[HEADER.size:HEADER.size + self.n_records * RECORD.size]
+        try:
+            yield from RECORD.iter_unpack(view)
+        finally:
+            view.release()
+
+    def __iter__(self) -> Iterator[HistoryRecord]:
+        for fields in self.raw_records():
+            yield HistoryRecord(*fields)
+
+    # =========== Replay ===========
+    def rounds(self) -> Iterator[LoggedRound]:
+        """This rebuilds every complete round in the log, in order"""
+        names: Dict[int, str] = {DEALER_SEAT: 'dealer'}
+        current: Optional[LoggedRound] = None
+        for round_index, event, seat, hand, code, flag, value, extra in self.raw_records():
+            if event == SEAT:
+                names[seat] = decode_name(value)
+            elif event == ROUND:
+                current = LoggedRound(round_index, {}, [], [], 0)
+            elif current is None:
+                continue  # records before the first round, e.g. the opening shuffle
+            elif event == DEAL:
+                hands = current.cards.setdefault(names[seat], [[]])
+                hands[hand].append(code)
+            elif event == ACTION:
+                current.actions.append((names[seat], ACTION_CODES[code]))
+                if ACTION_CODES[code] == 'split':
+                    hands = current.cards[names[seat]]
+                    hands.append([hands[hand].pop()])
+            elif event == PAYOUT:
+                current.payouts.append(LoggedPayout(names[seat], RESULT_CODES[code], flag / 10, value, extra, hand))
+            elif event == END:
+                yield current._replace(dealer_value=code)
+                current = None
+
+    def summarize(self) -> Tuple[Dict[str, int], int, float]:
+        """
+        This returns (result counts, total chip delta, total payout in bets) over the whole log. The chip delta
+        includes insurance bets, the payout doesn't
+        """
+        counts: Dict[str, int] = {result: 0 for result in RESULT_CODES}
+        chip_delta, payout = 0, 0
+        for _, event, _, _, code, flag, _, extra in self.raw_records():
+            if event == PAYOUT:
+                counts[RESULT_CODES[code]] += 1
+                chip_delta += extra
+                payout += flag
+            elif event == INSURANCE:
+                chip_delta += extra
+        return counts, chip_delta, payout / 10
+
+    def audit(self) -> List[int]:
+        """
+        This re-scores every round from its logged cards and returns the indices of the rounds whose logged results
+        don't follow from those cards
+        """
+        disputed: List[int] = []
+        for logged in self.rounds():
+            dealer_cards = logged.cards.get('dealer', [[]])[0]
+            dealer_value = best_value(dealer_cards)
+            if dealer_value != logged.dealer_value:
+                disputed.append(logged.index)
+                continue
+            dealer_natural = len(dealer_cards) == 2 and dealer_value == 21
+            for payout in logged.payouts:
+                hands = logged.cards.get(payout.seat, [[]])
+                cards = hands[payout.hand] if payout.hand < len(hands) else []
+                value = best_value(cards)
+                natural = len(cards) == 2 and value == 21 and len(hands) == 1  # split hands are never naturals
+                if payout.result == 'blackjack':
+                    valid = natural and not dealer_natural
+                elif payout.result == 'bust':
+                    valid = value > 21
+                elif payout.result == 'surrender':
+                    valid = len(cards) == 2
+                elif value > 21:
+                    valid = False
+                elif payout.result == 'win':
+                    valid = not dealer_natural and (value > dealer_value or dealer_value > 21)
+                elif payout.result == 'lose':
+                    valid = value < dealer_value <= 21 or (dealer_natural and not natural)
+                else:
+                    valid = value == dealer_value and natural == dealer_natural
+                if not valid:
+                    disputed.append(logged.index)
+                    break
+        return disputed
+
+
+if __name__ == '__main__':
+    import os
+    import random
+    import tempfile
+    import time
+    from src.class_defs.engine import BlackJackEngine
+    from src.class_defs.strategies import BasicStrategy
+
+    log_path = os.path.join(tempfile.mkdtemp(), 'hands.bjhl')
+    strategy = BasicStrategy()
+    with HandHistoryWriter(log_path) as writer:
+        engine = BlackJackEngine(['p1', 'p2', 'p3'], decisions={name: strategy for name in ('p1', 'p2', 'p3')},
+                                 rng=random.Random(7), n_decks=6, history=writer)
+        start = time.perf_counter()
+        for _ in range(20000):
+            engine.play_hand()
+        print('recorded {0} records in {1:.2f}s'.format(writer.n_records, time.perf_counter() - start))
+    with HandHistoryReader(log_path) as reader:
+        start = time.perf_counter()
+        print(reader.summarize())
+        print('summarized {0} records in {1:.2f}s'.format(reader.n_records, time.perf_counter() - start))
+        start = time.perf_counter()
+        print('disputed rounds: {0} ({1:.2f}s)'.format(reader.audit(), time.perf_counter() - start))
@@ -0,0 +1,44 @@
+from __future__ import annotations
+from typing import Dict, NamedTuple, Tuple
+
+# Blackjack points of each card value, counting an ace as 1. An ace is worth 11 when that doesn't bust the hand
+CARD_POINTS: Dict[str, int] = {'2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9, '10': 10,
+                               'J': 10, 'Q': 10, 'K': 10, 'A': 1}
+BLACKJACK: int = 21
+SOFT_ACE_BONUS: int = 10  # the extra value of counting one ace as 11 instead of 1
+MAX_TABLE_HARD_TOTAL: int = 31  # the largest hard total a hand can reach by hitting on 21 or less
+
+
+class HandValue(NamedTuple):
+    """Everything the rules need to know about a hand, derived from its hard total and number of aces"""
+    values: Tuple[int, ...]  # the hard total, plus the soft total when an ace can count as 11
+    best: int  # the highest value that doesn't bust, or the hard total if the hand is bust
+    soft: bool  # True when an ace is currently being counted as 11
+    bust: bool
+
+
+def compute_hand_value(hard_total: int, n_aces: int) -> HandValue:
+    """This works out the HandValue of a hand from its hard total (aces as 1) and its number of aces"""
+    soft: bool = n_aces > 0 and hard_total + SOFT_ACE_BONUS <= BLACKJACK
+    values: Tuple[int, ...] = (hard_total, hard_total + SOFT_ACE_BONUS) if n_aces > 0 else (hard_total,)
+    best: int = hard_total + SOFT_ACE_BONUS if soft else hard_total
+    return HandValue(values, best, soft, hard_total > BLACKJACK)
+
+
+# Precomputed lookup table keyed by (hard total, number of aces)
+HAND_VALUES: Dict[Tuple[int, int], HandValue] = {(hard, aces): compute_hand_value(hard, aces)
+                                                 for hard in range(MAX_TABLE_HARD_TOTAL + 1)
+                                                 for aces in range(hard + 1)}
+
+
+def get_hand_value(hard_total: int, n_aces: int) -> HandValue:
+    """This reads the HandValue from the lookup table, computing it only for hands larger than the table"""
+    hand_value = HAND_VALUES.get((hard_total, n_aces))
+    if hand_value is None:
+        hand_value = compute_hand_value(hard_total, n_aces)
+    return hand_value
+
+
+if __name__ == '__main__':
+    for key in [(11, 1), (7, 1), (17, 0), (16, 2), (26, 0)]:
+        print(key, get_hand_value(*key))
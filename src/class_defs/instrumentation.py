@@ -0,0 +1,223 @@
+from __future__ import annotations
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+import functools
+import json
+import threading
+import time
+from src.class_defs import engine as engine_module
+from src.class_defs.cards import CardHand, CardShoe, CompactHand, CompactPile
+from src.class_defs.chip_stack import ChipStack
+from src.class_defs.engine import BlackJackEngine
+
+# Histogram bucket upper bounds in seconds: 1 microsecond doubling up to about 1 second, plus an overflow bucket
+BUCKET_BOUNDS: Tuple[float, ...] = tuple(2 ** i * 1e-6 for i in range(21))
+
+# (class or module, attribute, histogram) for every method timed while instrumentation is enabled. The decision loop
+# is timed at loop_hands, where a single table's _loop_hand and the multi-table play_hands both end up
+TIMED_METHODS: Tuple[Tuple[object, str, str], ...] = (
+    (BlackJackEngine, '_init_hand', 'phase.init_hand'),
+    (engine_module, 'loop_hands', 'phase.loop_hand'),
+    (BlackJackEngine, '_finish_hand', 'phase.finish_hand'),
+    (BlackJackEngine, 'check_for_payouts', 'check_for_payouts'),
+)
+# (class, attribute, counter) for every method or property counted while instrumentation is enabled
+COUNTED_METHODS: Tuple[Tuple[type, str, str], ...] = (
+    (CompactPile, 'draw_id', 'draws'),
+    (CardShoe, 'reshuffle', 'reshuffles'),
+    (ChipStack, 'exchange_chips', 'chip_exchanges'),
+    (ChipStack, 'transfer_amount_of_chips', 'chip_transfers'),
+    (CardHand, 'value', 'hand_value_calls'),
+    (CompactHand, 'value', 'hand_value_calls'),
+)
+
+
+class Histogram:
+    """Counts observed durations into fixed exponential buckets, so recording is one bisect and one increment"""
+    # =========== Constructors ===========
+    def __init__(self) -> None:
+        self.buckets: List[int] = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+
+    # =========== Helper Methods ===========
+    def observe(self, seconds: float) -> None:
+        self.buckets[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def percentile(self, fraction: float) -> float:
+        """This returns the upper bound of the bucket holding the :param fraction quantile (the max if it overflowed)"""
+        if self.count == 0:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n > 0:
+                return BUCKET_BOUNDS[i] if i < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict:
+        return {'count': self.count, 'total': self.total, 'mean': self.mean, 'max': self.max,
+                'p50': self.percentile(0.5), 'p99': self.percentile(0.99), 'buckets': list(self.buckets)}
+
+
+class Metrics:
+    """In-process counters and duration histograms, keyed by name"""
+    # =========== Constructors ===========
+    def __init__(self) -> None:
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, Histogram] = {}
+
+    # =========== Helper Methods ===========
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name: str, seconds: float) -> None:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.histograms.clear()
+
+    def snapshot(self) -> Dict:
+        """This returns a JSON-ready copy of every counter and histogram"""
+        return {'time': time.time(), 'counters': dict(self.counters),
+                'histograms': {name: h.to_dict() for name, h in list(self.histograms.items())}}
+
+
+METRICS: Metrics = Metrics()
+# the original class and module attributes replaced by enable, restored by disable
+_originals: List[Tuple[object, str, object]] = []
+
+
+# =========== Enabling & Disabling ===========
+def _timed(function: Callable, name: str, metrics: Metrics) -> Callable:
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            metrics.observe(name, time.perf_counter() - start)
+    return wrapper
+
+
+def _counted(function: Callable, name: str, metrics: Metrics) -> Callable:
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        metrics.count(name)
+        return function(*args, **kwargs)
+    return wrapper
+
+
+def _wrap(owner: object, attribute: str, wrap: Callable, name: str, metrics: Metrics) -> None:
+    original = owner.__dict__[attribute]
+    if isinstance(original, property):
+        replacement = property(wrap(original.fget, name, metrics), original.fset, original.fdel, original.__doc__)
+    elif isinstance(original, staticmethod):
+        replacement = staticmethod(wrap(original.__func__, name, metrics))
+    else:
+        replacement = wrap(original, name, metrics)
+    _originals.append((owner, attribute, original))
+    setattr(owner, attribute, replacement)
+
+
+def enable(metrics: Metrics = METRICS) -> None:
+    """
+    This swaps timing and counting wrappers into the hot-path classes. While disabled the classes are untouched, so
+    instrumentation costs nothing unless it's switched on
+    """
+    if is_enabled():
+        return
+    for owner, attribute, name in TIMED_METHODS:
+        _wrap(owner, attribute, _timed, name, metrics)
+    for owner, attribute, name in COUNTED_METHODS:
+        _wrap(owner, attribute, _counted, name, metrics)
+
+
+def disable() -> None:
+    """This restores every wrapped class and module attribute"""
+    while _originals:
+        owner, attribute, original = _originals.pop()
+        setattr(owner, attribute, original)
+
+
+def is_enabled() -> bool:
+    return len(_originals) > 0
+
+
+@contextmanager
+def instrumented(metrics: Metrics = METRICS) -> Iterator[Metrics]:
+    """
+    Enables instrumentation for the body of a with block. A block nested inside one that already enabled it leaves
+    the wrappers (and their metrics) to the outer block
+    """
+    owner = not is_enabled()
+    enable(metrics)
+    try:
+        yield metrics
+    finally:
+        if owner:
+            disable()
+
+
+class SnapshotDumper:
+    """A daemon thread writing a metrics snapshot as one JSON line to :param stream every :param interval seconds"""
+    # =========== Constructors ===========
+    def __init__(self, stream: TextIO, interval: float = 10.0, metrics: Metrics = METRICS) -> None:
+        self.stream: TextIO = stream
+        self.interval: float = interval
+        self.metrics: Metrics = metrics
+        self._stop: threading.Event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # =========== Control Flow Actions ===========
+    def dump(self) -> None:
+        self.stream.write(json.dumps(self.metrics.snapshot()) + '\n')
+        self.stream.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.dump()
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='metrics-dumper', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """This stops the thread and writes one last snapshot"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.dump()
+
+
+if __name__ == '__main__':
+    import random
+    import sys
+    from src.class_defs.strategies import BasicStrategy
+
+    names = ['p{}'.format(i) for i in range(5)]
+    engine = BlackJackEngine(names, decisions={name: BasicStrategy() for name in names}, rng=random.Random(4),
+                             n_decks=6)
+    dumper = SnapshotDumper(sys.stdout, interval=0.5)
+    with instrumented():
+        dumper.start()
+        for _ in range(20000):
+            engine.play_hand()
+        dumper.stop()
@@ -0,0 +1,112 @@
+from __future__ import annotations
+from statistics import NormalDist
+from typing import Dict, Hashable, Iterable, Tuple
+import math
+
+
+def z_score(confidence: float) -> float:
+    """This returns the two-sided normal critical value for :param confidence, e.g. 1.96 for 0.95"""
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+class RunningStats:
+    """
+    Mean and variance of a stream in constant memory with Welford's update, which stays accurate where the
+    sum-of-squares formula cancels. Two runs merge exactly as if one had seen both streams (Chan et al.)
+    """
+    # =========== Constructors ===========
+    def __init__(self) -> None:
+        self.n: int = 0
+        self.mean: float = 0.0
+        self.m2: float = 0.0  # sum of squared deviations from the mean
+
+    @classmethod
+    def from_values(cls, values: Iterable[float]) -> RunningStats:
+        stats = cls()
+        for value in values:
+            stats.add(value)
+        return stats
+
+    @classmethod
+    def from_moments(cls, n: int, mean: float, m2: float) -> RunningStats:
+        """This builds the stats of a batch summarized elsewhere, e.g. by array reductions, ready to merge"""
+        stats = cls()
+        stats.n, stats.mean, stats.m2 = n, mean, m2
+        return stats
+
+    # =========== Helper Methods ===========
+    @property
+    def variance(self) -> float:
+        """This property gets the sample variance"""
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def standard_error(self) -> float:
+        return math.sqrt(self.variance / self.n) if self.n > 1 else math.inf
+
+    def confidence_interval(self, confidence: float = 0.95) -> Tuple[float, float]:
+        half_width = z_score(confidence) * self.standard_error
+        return self.mean - half_width, self.mean + half_width
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RunningStats):
+            return NotImplemented
+        return (self.n, self.mean, self.m2) == (other.n, other.mean, other.m2)
+
+    def __repr__(self) -> str:
+        return 'RunningStats(n={0}, mean={1:.6f}, variance={2:.6f})'.format(self.n, self.mean, self.variance)
+
+    # =========== Aggregate Operations ===========
+    def add(self, value: float) -> None:
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other: RunningStats) -> None:
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+
+
+class ValueCounts:
+    """How many times each value or situation was seen, e.g. a histogram of net chip changes. Merging adds counts"""
+    # =========== Constructors ===========
+    def __init__(self) -> None:
+        self.counts: Dict[Hashable, int] = {}
+
+    # =========== Helper Methods ===========
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def __getitem__(self, key: Hashable) -> int:
+        return self.counts.get(key, 0)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ValueCounts):
+            return NotImplemented
+        return self.counts == other.counts
+
+    def __repr__(self) -> str:
+        return 'ValueCounts({})'.format(dict(sorted(self.counts.items(), key=str)))
+
+    # =========== Aggregate Operations ===========
+    def add(self, key: Hashable, n: int = 1) -> None:
+        self.counts[key] = self.counts.get(key, 0) + n
+
+    def merge(self, other: ValueCounts) -> None:
+        for key, n in other.counts.items():
+            self.add(key, n)
+
+
+if __name__ == '__main__':
+    import random
+    rng = random.Random(0)
+    halves = [RunningStats.from_values([rng.gauss(1e9, 1) for _ in range(5000)]) for _ in range(2)]
+    halves[0].merge(halves[1])
+    print(halves[0], halves[0].confidence_interval())
@@ -2,6 +2,7 @@ from __future__ import annotations
 from typing import List, Dict, Optional, Callable
 from src.class_defs.chip_stack import ChipStack
 from src.class_defs.cards import Card, CardPile, CardHand, Suit
+from src.class_defs.hand_values import HandValue
 
 ActionSet = Dict[str, Dict[str, Callable]]
 
@@ -14,11 +15,10 @@ def get_valid_input(input_prompt: str, valid_input_list: List[str]) -> str:
     :return: returns a valid item from the valid_input_list parameter
     """
     x = input(input_prompt)
-    if x in valid_input_list:
-        return x
-    else:
+    while x not in valid_input_list:
         print("Input {0} is invalid.".format(x))
-        return get_valid_input(input_prompt, valid_input_list)  # try again
+        x = input(input_prompt)  # try again
+    return x
 
 
 class Player:
@@ -32,9 +32,12 @@ class Player:
             hand = CardHand()
         if pot is None:
             pot = ChipStack()
-        self.pot = pot  # unless there is a shared pot object passed in, each player instance gets its own pot instance
+        # unless there is a shared pot object passed in, each player instance gets its own pot instance
+        self.pots: List[ChipStack] = [pot]  # the wager riding on each hand
         self.chips: ChipStack = chips  # empty stack unless otherwise specified
-        self._player_hand: CardHand = hand
+        self.hands: List[CardHand] = [hand]  # splitting adds hands after the first, played in order
+        self.hand_flags: List[int] = [0]  # the rule flags of each hand, see rules.py
+        self.active_hand: int = 0  # the hand being played; the other properties read and act on this hand
         if action_set is None:
             action_set = {'actions_basic':  # load only a basic set of instance methods for actions
                               {'view-hand': self.view_hand, 'draw': self.draw,
@@ -43,12 +46,37 @@ class Player:
         self.action_set: ActionSet = action_set
 
     # =========== Helper Methods ===========
+    @property
+    def _player_hand(self) -> CardHand:
+        return self.hands[self.active_hand]
+
+    @_player_hand.setter
+    def _player_hand(self, hand: CardHand) -> None:
+        self.hands[self.active_hand] = hand
+
+    @property
+    def pot(self) -> ChipStack:
+        return self.pots[self.active_hand]
+
+    @pot.setter
+    def pot(self, pot: ChipStack) -> None:
+        self.pots[self.active_hand] = pot
+
+    @property
+    def n_hands(self) -> int:
+        return len(self.hands)
+
     @property
     def hand(self) -> List[Card]:
         """This is a shortcut for getting the list of cards stored in the player's CardHand object
         This prevents calls like player.hand.hand"""
         return self._player_hand.hand
 
+    @property
+    def hand_value(self) -> HandValue:
+        """This is a shortcut for the constant time blackjack value kept by the player's CardHand"""
+        return self._player_hand.value
+
     @property
     def bet_value(self) -> int:
         return self.pot.stack_value
@@ -70,7 +98,6 @@ class Player:
 
     # =========== Player Card Actions ===========
     def view_hand(self, player: Optional[Player] = None, all_visible: bool = False) -> None:
-        # TODO: Players manage the visibility per Card of a Hand of Cards, it shouldn't be a state of Card
         # if no player is passed to this method, assume 'self' is the player
         if player is None:
             player = self
@@ -79,17 +106,48 @@ class Player:
 
     def draw(self, card_pile: CardPile, n_cards: int = 1, all_visible: bool = False) -> None:
         for _ in range(1, n_cards + 1):
-            drawn = card_pile.draw()
-            drawn.visible = all_visible
-            self._player_hand.add_card(drawn)
+            self._player_hand.add_card(card_pile.draw(), visible=all_visible)
+
+    def reveal_hand(self) -> None:
+        """Turns every card in the player's hand face up"""
+        self._player_hand.reveal()
 
     def discard(self, discard_pile: CardPile, card_names: List[str]) -> None:
         for name in card_names:
             discard_pile.add(self._player_hand.remove_card(name))
 
+    def discard_all(self, discard_pile: CardPile) -> None:
+        """Moves every hand onto the discard pile, one step per hand, leaving the player one empty hand"""
+        for hand in self.hands:
+            hand.clear_into(discard_pile)
+        if len(self.hands) > 1:
+            for pot in self.pots[1:]:
+                if pot.stack_value > 0:
+                    pot.transfer_all(self.pots[0])
+            self.hands, self.pots = self.hands[:1], self.pots[:1]
+        self.hand_flags = [0]
+        self.active_hand = 0
+
+    def split_hand(self) -> int:
+        """
+        This moves the second card of the active hand into a new hand after the last one, with its own empty pot, and
+        returns the new hand's index. Each hand keeps a single card until it is dealt another
+        """
+        hand = self._player_hand
+        card, visible = hand.hand[1], hand.visible[1]
+        hand.remove(card)
+        self.hands.append(CardHand())
+        self.hands[-1].add_card(card, visible)
+        self.pots.append(ChipStack())
+        self.hand_flags.append(0)
+        return len(self.hands) - 1
+
     def transfer(self, other_player: Player, card_names: List[str]) -> None:
         self._player_hand.transfer_cards(other_hand=other_player._player_hand, card_names=card_names)
 
+    def transfer_all(self, other_player: Player) -> None:
+        self._player_hand.transfer_all(other_player._player_hand)
+
     # =========== Player Chip Actions ===========
     def view_chips(self, player: Optional[Player] = None, all_visible: bool = False) -> None:
         # if no player is passed to this method, assume 'self' is the player
@@ -110,9 +168,7 @@ class Player:
 
     def payout_all(self, destination_pot: ChipStack) -> None:
         """This is a great function to use when moving around chip stacks after a hand"""
-        # TODO: refactor with chip stack changes
-        chip_amounts = self.pot.stack.copy()
-        self.pot.transfer_chips(destination_pot, chip_amounts)
+        self.pot.transfer_all(destination_pot)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,149 @@
+from __future__ import annotations
+from typing import Dict, NamedTuple, Tuple
+from src.class_defs.cards import CardHand
+from src.class_defs.dealer_policy import DEALER_POLICIES, DealerPolicy
+from src.class_defs.hand_values import BLACKJACK
+
+# One bit per action, so the actions legal on a hand are one small int
+CAN_HIT, CAN_STAND, CAN_DOUBLE, CAN_SPLIT, CAN_SURRENDER = 1, 2, 4, 8, 16
+ACTION_BITS: Dict[str, int] = {'hit': CAN_HIT, 'stand': CAN_STAND, 'double': CAN_DOUBLE, 'split': CAN_SPLIT,
+                               'surrender': CAN_SURRENDER}
+
+# Flags of one hand. The low four bits are the situation the legal actions are compiled over: TWO_CARDS and
+# SPLIT_LIMIT are read off the seat when a hand is looked up, the others are kept per hand as it is played
+TWO_CARDS = 1  # the hand holds its first two cards
+SPLIT_HAND = 2  # the hand came from a split, so it can't be a natural
+SPLIT_ACE = 4  # the hand came from splitting aces
+SPLIT_LIMIT = 8  # the seat already holds as many hands as it may split into
+DOUBLED = 16
+SURRENDERED = 32
+SETTLED = 64
+N_SITUATIONS: int = 16
+N_PAIR_RANKS: int = 11  # 0 when the hand isn't a pair, else the points of the paired cards
+N_LEGAL_TOTALS: int = BLACKJACK + 1
+
+
+class TableConfig(NamedTuple):
+    """The house rules of a table, declared once and compiled into the TableRules every round is played by"""
+    dealer_rule: str = 'S17'  # a key of DEALER_POLICIES
+    blackjack_payout: float = 1.5  # a natural pays 3:2, or e.g. 1.2 at a 6:5 table
+    dealer_peeks: bool = True  # the dealer checks an ace or ten-card upcard for a natural before anyone acts
+    insurance: bool = True  # offered when the dealer shows an ace, paying 2:1 on half the bet
+    double_totals: Tuple[int, ...] = ()  # the two-card totals a hand may double on, any total when empty
+    double_after_split: bool = True
+    max_hands: int = 4  # a seat may split and resplit until it holds this many hands
+    resplit_aces: bool = False
+    hit_split_aces: bool = False  # otherwise split aces get one card each
+    late_surrender: bool = False  # give up half the bet on the first two cards, after the dealer peeks
+
+
+class TableRules:
+    """
+    A TableConfig compiled into a table of legal-action bitmasks over (situation flags, pair rank, best total), so
+    finding what a hand may do is one index however many rules the table has. A hand on 21 only stands, and a hand
+    whose only legal action is to stand (21, or split aces that can't be hit) is stood by the engine without asking.
+    Whether the seat can afford to double or split is checked by the engine, since it changes from round to round
+    """
+    # =========== Constructors ===========
+    def __init__(self, config: TableConfig = TableConfig()) -> None:
+        if config.max_hands < 1:
+            raise ValueError('A seat must be able to hold at least one hand, not {}'.format(config.max_hands))
+        if config.blackjack_payout <= 0:
+            raise ValueError('Invalid blackjack payout {}'.format(config.blackjack_payout))
+        self.config: TableConfig = config
+        self.dealer_policy: DealerPolicy = DEALER_POLICIES[config.dealer_rule]
+        self.blackjack_payout: float = config.blackjack_payout
+        self.max_hands: int = config.max_hands
+        self.table: bytearray = bytearray(N_SITUATIONS * N_PAIR_RANKS * N_LEGAL_TOTALS)
+        for situation in range(N_SITUATIONS):
+            for pair_rank in range(N_PAIR_RANKS):
+                for total in range(N_LEGAL_TOTALS):
+                    self.table[TableRules.index(situation, pair_rank, total)] = self._compile(situation, pair_rank,
+                                                                                              total)
+
+    def __repr__(self) -> str:
+        return 'TableRules({})'.format(', '.join(['{0}={1}'.format(name, value) for name, value in zip(
+            self.config._fields, self.config) if value != TableConfig._field_defaults[name]]))
+
+    def _compile(self, situation: int, pair_rank: int, total: int) -> int:
+        """This works out the legal actions of one situation from the config"""
+        config = self.config
+        if total >= BLACKJACK:
+            return CAN_STAND
+        two_cards = situation & TWO_CARDS
+        from_split = situation & SPLIT_HAND
+        legal = CAN_STAND
+        if config.hit_split_aces or not situation & SPLIT_ACE:
+            legal |= CAN_HIT
+            if (two_cards and (config.double_after_split or not from_split) and
+                    (not config.double_totals or total in config.double_totals)):
+                legal |= CAN_DOUBLE
+        if (two_cards and pair_rank and not situation & SPLIT_LIMIT and
+                (pair_rank != 1 or config.resplit_aces or not situation & SPLIT_ACE)):
+            legal |= CAN_SPLIT
+        if two_cards and not from_split and config.late_surrender:
+            legal |= CAN_SURRENDER
+        return legal
+
+    # =========== Lookups ===========
+    @staticmethod
+    def index(situation: int, pair_rank: int, total: int) -> int:
+        return (situation * N_PAIR_RANKS + pair_rank) * N_LEGAL_TOTALS + total
+
+    def legal_actions(self, hand: CardHand, flags: int = 0, n_hands: int = 1) -> int:
+        """
+        This returns the legal-action bits of :param hand with hand :param flags, at a seat holding :param n_hands.
+        A bust hand has none
+        """
+        total = hand.value.best
+        if total > BLACKJACK:
+            return 0
+        situation = flags & (SPLIT_HAND | SPLIT_ACE)
+        pair_rank = 0
+        cards = hand.hand
+        if len(cards) == 2:
+            situation |= TWO_CARDS
+            if cards[0].points == cards[1].points:
+                pair_rank = cards[0].points
+        if n_hands >= self.max_hands:
+            situation |= SPLIT_LIMIT
+        return self.table[(situation * N_PAIR_RANKS + pair_rank) * N_LEGAL_TOTALS + total]
+
+
+def action_names(legal: int) -> Tuple[str, ...]:
+    """This returns the names of the actions set in :param legal, in ACTION_BITS order"""
+    return tuple([name for name, bit in ACTION_BITS.items() if legal & bit])
+
+
+def is_natural(hand: CardHand, flags: int = 0) -> bool:
+    """A natural is 21 on the first two cards of a hand that didn't come from a split"""
+    return len(hand.hand) == 2 and hand.value.best == BLACKJACK and not flags & SPLIT_HAND
+
+
+_COMPILED: Dict[TableConfig, TableRules] = {}
+
+
+def compile_rules(config: TableConfig) -> TableRules:
+    """This returns the TableRules of :param config, compiling each distinct config only once per process"""
+    rules = _COMPILED.get(config)
+    if rules is None:
+        rules = _COMPILED[config] = TableRules(config)
+    return rules
+
+
+DEFAULT_RULES: TableRules = compile_rules(TableConfig())
+
+
+if __name__ == '__main__':
+    from src.class_defs.cards import Card, Suit
+    tables = {'default': DEFAULT_RULES,
+              'strict': compile_rules(TableConfig(dealer_rule='H17', blackjack_payout=1.2, double_totals=(10, 11),
+                                                  double_after_split=False, max_hands=2)),
+              'liberal': compile_rules(TableConfig(resplit_aces=True, hit_split_aces=True, late_surrender=True))}
+    hands = {'8 8': ['8', '8'], 'A A (split)': ['A', 'A'], '6 3': ['6', '3'], '10 6 2': ['10', '6', '2']}
+    for name, rules in tables.items():
+        print(rules)
+        for label, values in hands.items():
+            hand = CardHand([Card(value, Suit.SPADES) for value in values])
+            flags = SPLIT_HAND | SPLIT_ACE if 'split' in label else 0
+            print('    {0:12} {1}'.format(label, action_names(rules.legal_actions(hand, flags, 2 if flags else 1))))
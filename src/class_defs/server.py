@@ -0,0 +1,297 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import json
+import random
+import time
+from src.class_defs.engine import BlackJackEngine, HandOutcome
+from src.class_defs.rules import ACTION_BITS, CAN_HIT, action_names
+from src.class_defs.strategies import DecisionState, basic_strategy_table
+from src.class_defs.strategy_solver import DecisionTable
+
+# Every message is one JSON object per line. A client sends {"type": "join", "name": ...} first, then answers each
+# {"type": "decision", "id": ..., "legal": [...]} with {"type": "action", "id": ..., "action": ...} naming one of the
+# legal actions, and may send {"type": "leave"} at any time. The server also sends "joined" once and an "outcome"
+# after every hand is settled. A seat that can't cover the table minimum is sent {"type": "unseated", "reason": ...}
+# between rounds and disconnected
+DEFAULT_ACTIONS: Tuple[str, ...] = ('hit', 'stand')  # the actions a seat may fall back to when it doesn't answer
+
+
+def encode(message: Dict) -> bytes:
+    return (json.dumps(message) + '\n').encode()
+
+
+class RemoteSeat:
+    """
+    One connected client sitting at a Table. A reader task queues the client's messages, so each decision is an
+    awaitable that resolves to the client's answer or to the default action once the timeout runs out
+    """
+    # =========== Constructors ===========
+    def __init__(self, name: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.name: str = name
+        self.reader: asyncio.StreamReader = reader
+        self.writer: asyncio.StreamWriter = writer
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        self.connected: bool = True
+        self.decision_id: int = 0
+        self.n_timeouts: int = 0
+
+    # =========== Seat Operations ===========
+    async def send(self, message: Dict) -> None:
+        if not self.connected:
+            return
+        try:
+            self.writer.write(encode(message))
+            await self.writer.drain()
+        except ConnectionError:
+            self.connected = False
+
+    async def read_messages(self) -> None:
+        """Queues the client's messages until it leaves or disconnects"""
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if message.get('type') == 'leave':
+                    break
+                self.inbox.put_nowait(message)
+        except (ConnectionError, ValueError):
+            pass  # a broken connection or garbled message ends the session
+        self.connected = False
+        self.inbox.put_nowait(None)  # wake up a decision that is still waiting
+
+    async def request_decision(self, state: DecisionState, timeout: float, default_action: str) -> str:
+        """
+        This asks the client for one of the hand's legal actions, answering :param default_action if it doesn't
+        reply in time or answers with an action the hand can't take (standing if the hand can't hit)
+        """
+        if default_action == 'hit' and not state.legal & CAN_HIT:
+            default_action = 'stand'
+        if not self.connected:
+            return default_action
+        self.decision_id += 1
+        await self.send({'type': 'decision', 'id': self.decision_id, 'total': state.total, 'soft': state.soft,
+                         'upcard': state.upcard_points, 'legal': list(action_names(state.legal)),
+                         'cards': [card.value + card.suit.value for card in state.player.hand]})
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            try:
+                message = await asyncio.wait_for(self.inbox.get(), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                self.n_timeouts += 1
+                return default_action
+            if message is None:
+                return default_action
+            if message.get('type') == 'action' and message.get('id') == self.decision_id:
+                action = message.get('action')
+                return action if ACTION_BITS.get(action, 0) & state.legal else default_action
+            # anything else is a late answer to an earlier decision, so skip it
+
+
+class Table:
+    """A BlackJackEngine whose seats are RemoteSeats, played round after round by its own task"""
+    # =========== Constructors ===========
+    def __init__(self, table_id: int, n_seats: int, engine: BlackJackEngine, decision_timeout: float,
+                 default_action: str) -> None:
+        self.table_id: int = table_id
+        self.n_seats: int = n_seats
+        self.engine: BlackJackEngine = engine
+        self.decision_timeout: float = decision_timeout
+        self.default_action: str = default_action
+        self.seats: Dict[str, RemoteSeat] = {}
+        self.rounds_played: int = 0
+        self.task: Optional[asyncio.Task] = None
+
+    # =========== Helper Methods ===========
+    @property
+    def has_free_seat(self) -> bool:
+        return len(self.seats) < self.n_seats
+
+    def join(self, seat: RemoteSeat) -> None:
+        """Seats the client; it is dealt in from the next round"""
+        self.seats[seat.name] = seat
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+
+    async def unseat(self, name: str, reason: str) -> None:
+        """Tells the client why it is leaving the table and closes its connection"""
+        seat = self.seats.pop(name)
+        await seat.send({'type': 'unseated', 'reason': reason})
+        seat.connected = False
+        seat.writer.close()
+
+    # =========== Control Flow Actions ===========
+    async def run(self) -> None:
+        """
+        Plays rounds until every seat has left. Waiting on one table's clients never blocks other tables. Seats that
+        can't cover the minimum bet are unseated first, so every round played has every seat dealt in
+        """
+        engine = self.engine
+        while True:
+            # seat changes only happen between rounds
+            for name in list(self.seats):
+                if not self.seats[name].connected:
+                    del self.seats[name]
+            for name in list(self.seats):
+                if name not in engine.players:
+                    engine.add_player(name)
+                if engine.players[name].chips.stack_value < engine.min_bet:
+                    await self.unseat(name, 'not enough chips for the {} minimum bet'.format(engine.min_bet))
+            for name in list(engine.players):
+                if name not in self.seats:
+                    engine.remove_player(name)
+            if len(self.seats) == 0:
+                break
+            seats = dict(self.seats)  # seats joining mid-round wait for the next one
+            engine._init_hand()
+            while engine.acting_players:
+                states = engine.pending_decisions()
+                actions = await asyncio.gather(*[seats[state.seat].request_decision(
+                    state, self.decision_timeout, self.default_action) for state in states])
+                for state, action in zip(states, actions):
+                    engine.apply_action(state.seat, action)
+            outcomes: List[HandOutcome] = engine._finish_hand()
+            await asyncio.gather(*[seats[outcome.player].send(dict(outcome._asdict(), type='outcome'))
+                                   for outcome in outcomes])
+            self.rounds_played += 1
+            await asyncio.sleep(0)  # let other tables and new connections run between rounds
+        self.task = None
+
+
+class GameServer:
+    """
+    Hosts many concurrent tables over local TCP in one asyncio event loop. A joining client takes the first free
+    seat, and a new table is opened whenever every table is full
+    """
+    # =========== Constructors ===========
+    def __init__(self, seats_per_table: int = 1, decision_timeout: float = 10.0, default_action: str = 'stand',
+                 n_decks: int = 6, seed: Optional[int] = None, min_bet: int = 1, max_bet: int = 500) -> None:
+        if default_action not in DEFAULT_ACTIONS:
+            raise ValueError('Invalid default action "{}"'.format(default_action))
+        if not 0 < min_bet <= max_bet:
+            raise ValueError('Invalid table limits {0}-{1}'.format(min_bet, max_bet))
+        self.seats_per_table: int = seats_per_table
+        self.decision_timeout: float = decision_timeout
+        self.default_action: str = default_action
+        self.n_decks: int = n_decks
+        self.min_bet: int = min_bet
+        self.max_bet: int = max_bet
+        self.rng: random.Random = random.Random(seed)  # seeds each table's own shuffle generator
+        self.tables: List[Table] = []
+        self.n_connections: int = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    # =========== Helper Methods ===========
+    @property
+    def rounds_played(self) -> int:
+        return sum([table.rounds_played for table in self.tables])
+
+    @property
+    def n_active_tables(self) -> int:
+        return len([table for table in self.tables if table.task is not None])
+
+    def _table_with_free_seat(self) -> Table:
+        for table in self.tables:
+            if table.has_free_seat:
+                return table
+        engine = BlackJackEngine([], rng=random.Random(self.rng.getrandbits(64)), n_decks=self.n_decks,
+                                 min_bet=self.min_bet, max_bet=self.max_bet)
+        table = Table(len(self.tables), self.seats_per_table, engine, self.decision_timeout, self.default_action)
+        self.tables.append(table)
+        return table
+
+    # =========== Server Operations ===========
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> Tuple[str, int]:
+        """Starts listening and returns the bound (host, port); port 0 picks a free port"""
+        self._server = await asyncio.start_server(self._handle_client, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        tasks = [table.task for table in self.tables if table.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            line = await asyncio.wait_for(reader.readline(), self.decision_timeout)
+            join = json.loads(line) if line else {}
+            if join.get('type') != 'join':
+                return
+            self.n_connections += 1
+            seat = RemoteSeat('{0}#{1}'.format(join.get('name', 'player'), self.n_connections), reader, writer)
+            table = self._table_with_free_seat()
+            table.join(seat)  # take the seat before the first await, so concurrent joins can't overfill the table
+            await seat.send({'type': 'joined', 'table': table.table_id, 'seat': seat.name})
+            await seat.read_messages()
+        except (asyncio.TimeoutError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+# =========== Client Simulator ===========
+async def run_client(host: str, port: int, name: str, n_rounds: int, table: Optional[DecisionTable] = None,
+                     think_time: float = 0.0) -> int:
+    """
+    This connects one simulated player, answers decisions from :param table (basic strategy by default) after
+    :param think_time seconds, and leaves after :param n_rounds outcomes. It returns the rounds it saw
+    """
+    if table is None:
+        table = basic_strategy_table()
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(encode({'type': 'join', 'name': name}))
+    rounds: int = 0
+    try:
+        while rounds < n_rounds:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if message['type'] == 'decision':
+                if think_time > 0:
+                    await asyncio.sleep(think_time)
+                action = table.action(message['total'], message['soft'], message['upcard'])
+                if action not in message['legal']:
+                    action = 'stand'
+                writer.write(encode({'type': 'action', 'id': message['id'], 'action': action}))
+            elif message['type'] == 'outcome' and message['hand_index'] == 0:
+                rounds += 1  # a seat gets one outcome per hand, and every round has a first hand
+            elif message['type'] == 'unseated':
+                break
+        writer.write(encode({'type': 'leave'}))
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+    return rounds
+
+
+async def simulate_clients(host: str, port: int, n_clients: int, n_rounds: int, think_time: float = 0.0) -> int:
+    """This runs :param n_clients simulated players at once and returns the total rounds they played"""
+    table = basic_strategy_table()
+    results = await asyncio.gather(*[run_client(host, port, 'bot{}'.format(i), n_rounds, table, think_time)
+                                     for i in range(n_clients)])
+    return sum(results)
+
+
+async def load_test(n_clients: int = 2000, n_rounds: int = 5, seats_per_table: int = 1) -> None:
+    server = GameServer(seats_per_table=seats_per_table, decision_timeout=5.0, seed=2019)
+    host, port = await server.start()
+    start = time.perf_counter()
+    total_rounds = await simulate_clients(host, port, n_clients, n_rounds)
+    elapsed = time.perf_counter() - start
+    print('{0} clients on {1} tables played {2} seat-rounds in {3:.2f}s ({4:.0f}/s)'.format(
+        n_clients, len(server.tables), total_rounds, elapsed, total_rounds / elapsed))
+    await server.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(load_test())
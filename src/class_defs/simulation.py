@@ -0,0 +1,284 @@
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Dict, List, Optional, Tuple
+import hashlib
+import math
+import os
+import random
+from src.class_defs.betting import BetPolicy, BettingState, EVTable
+from src.class_defs.card_counting import COUNT_SYSTEMS, HI_LO, CountSystem
+from src.class_defs.chip_stack import ChipStack
+from src.class_defs.engine import BlackJackEngine, Decision, HandOutcome
+from src.class_defs.online_stats import RunningStats, ValueCounts
+
+RESULTS: Tuple[str, ...] = ('blackjack', 'bust', 'win', 'lose', 'push', 'surrender')
+
+
+def derive_seed(master_seed: int, stream_index: int) -> int:
+    """
+    This derives an independent 64-bit seed for one RNG stream from the master seed.
+    Hashing keeps neighbouring stream indices uncorrelated, unlike seeding with master_seed + stream_index
+    """
+    digest = hashlib.sha256('{0}:{1}'.format(master_seed, stream_index).encode()).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def net_chip_change(outcome: HandOutcome) -> int:
+    """
+    This returns how many chips the hand won or lost, matching BlackJackEngine.settle_all's rounding, plus the
+    seat's insurance on its first hand
+    """
+    if outcome.payout_rate > 0:
+        return int(outcome.payout_rate * outcome.bet) + outcome.insurance
+    if outcome.payout_rate < 0:
+        return -math.ceil(-outcome.payout_rate * outcome.bet) + outcome.insurance
+    return outcome.insurance
+
+
+def net_payout(outcome: HandOutcome) -> float:
+    """This returns the hand's payout rate with the seat's insurance added in, in units of the bet"""
+    if outcome.insurance and outcome.bet:
+        return outcome.payout_rate + outcome.insurance / outcome.bet
+    return outcome.payout_rate
+
+
+def seat_payouts(outcomes: List[HandOutcome]) -> Dict[str, float]:
+    """This sums each seat's net payouts over its split hands, so a round counts once per seat"""
+    payouts: Dict[str, float] = {}
+    for outcome in outcomes:
+        payouts[outcome.player] = payouts.get(outcome.player, 0.0) + net_payout(outcome)
+    return payouts
+
+
+class SimulationResult:
+    """
+    Streaming aggregates over many hands, held in constant memory however many hands are played: result counts and
+    counts per (dealer upcard, result) situation for every hand, and Welford statistics of the payout and a histogram
+    of the net chip changes per seat per round, summed over its split hands and insurance.
+    Merging chunk results in a fixed order gives identical totals however the chunks were computed
+    """
+    # =========== Constructors ===========
+    def __init__(self) -> None:
+        self.n_rounds: int = 0
+        self.result_counts: Dict[str, int] = {result: 0 for result in RESULTS}
+        self.payouts: RunningStats = RunningStats()  # payout rate per seat per round, in units of the bet
+        self.situations: ValueCounts = ValueCounts()  # hands per (dealer upcard points, result)
+        self.chip_changes: ValueCounts = ValueCounts()  # seat rounds per net chip change
+
+    # =========== Helper Methods ===========
+    @property
+    def n_hands(self) -> int:
+        """This property gets the number of hands, one per dealt-in seat per round"""
+        return self.payouts.n
+
+    @property
+    def expected_value(self) -> float:
+        """This property gets the mean payout per hand in units of the bet"""
+        return self.payouts.mean
+
+    @property
+    def variance(self) -> float:
+        """This property gets the sample variance of the payout per hand"""
+        return self.payouts.variance
+
+    def confidence_interval(self, confidence: float = 0.95) -> Tuple[float, float]:
+        return self.payouts.confidence_interval(confidence)
+
+    def half_width(self, confidence: float = 0.95) -> float:
+        low, high = self.confidence_interval(confidence)
+        return (high - low) / 2
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, SimulationResult):
+            return NotImplemented
+        return self.__dict__ == other.__dict__
+
+    def __repr__(self) -> str:
+        return 'SimulationResult(n_hands={0}, ev={1:.5f}, counts={2})'.format(self.n_hands, self.expected_value,
+                                                                               self.result_counts)
+
+    # =========== Aggregate Operations ===========
+    def add_round(self, outcomes: List[HandOutcome], upcard_points: int = 0) -> None:
+        self.n_rounds += 1
+        chip_changes: Dict[str, int] = {}
+        for outcome in outcomes:
+            self.result_counts[outcome.result] += 1
+            self.situations.add((upcard_points, outcome.result))
+            chip_changes[outcome.player] = chip_changes.get(outcome.player, 0) + net_chip_change(outcome)
+        for payout in seat_payouts(outcomes).values():
+            self.payouts.add(payout)
+        for change in chip_changes.values():
+            self.chip_changes.add(change)
+
+    def merge(self, other: SimulationResult) -> None:
+        self.n_rounds += other.n_rounds
+        for result, count in other.result_counts.items():
+            self.result_counts[result] += count
+        self.payouts.merge(other.payouts)
+        self.situations.merge(other.situations)
+        self.chip_changes.merge(other.chip_changes)
+
+
+def restock(engine: BlackJackEngine) -> None:
+    """
+    This keeps a simulated table going however long it runs: a player who can't cover the minimum bet rebuys a
+    standard stack, and the dealer's bank is topped up with another dealer stack whenever a round of maximum bets
+    could exhaust it
+    """
+    for player in engine.players.values():
+        if player.chips.stack_value < engine.min_bet:
+            player.chips.add_vector(ChipStack.from_standard_stack().counts)
+    bank = engine.dealer.chips
+    if bank.stack_value < 2 * engine.max_bet * len(engine.players):
+        bank.add_vector(ChipStack.from_dealer_stack().counts)
+
+
+def run_chunk(seed: int, n_rounds: int, player_names: List[str], decisions: Dict[str, Decision],
+              bet_policies: Optional[Dict[str, BetPolicy]] = None) -> SimulationResult:
+    """This plays :param n_rounds on a fresh table whose shuffles all come from the stream seeded by :param seed"""
+    engine = BlackJackEngine(player_names, decisions, rng=random.Random(seed), bet_policies=bet_policies)
+    result = SimulationResult()
+    for _ in range(n_rounds):
+        restock(engine)
+        outcomes = engine.play_hand()
+        result.add_round(outcomes, engine.dealer.hand[0].points)
+    return result
+
+
+def _run_chunk_args(args: Tuple) -> SimulationResult:
+    """Unpacks one work item for the process pool"""
+    return run_chunk(*args)
+
+
+def run_simulation(n_rounds: int, seed: int = 0, n_workers: Optional[int] = None,
+                   player_names: Optional[List[str]] = None, decisions: Optional[Dict[str, Decision]] = None,
+                   chunk_size: int = 10000, target_half_width: Optional[float] = None,
+                   confidence: float = 0.95, bet_policies: Optional[Dict[str, BetPolicy]] = None) -> SimulationResult:
+    """
+    This splits :param n_rounds into chunks of :param chunk_size rounds and plays them across a process pool.
+    Chunk i always gets the stream derive_seed(seed, i) and the chunk results are merged in chunk order,
+    so the aggregate depends only on the seed and chunk size, never on :param n_workers.
+    With :param target_half_width the run is sequential: it stops after the first chunk that brings the
+    :param confidence interval of the EV down to that half width, and :param n_rounds becomes a cap.
+    Decision callbacks and :param bet_policies must be picklable (module-level functions) when more than one worker
+    is used
+    """
+    if player_names is None:
+        player_names = ['player']
+    if decisions is None:
+        decisions = {}
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    chunks: List[Tuple] = []
+    for i, start in enumerate(range(0, n_rounds, chunk_size)):
+        chunks.append((derive_seed(seed, i), min(chunk_size, n_rounds - start), player_names, decisions,
+                       bet_policies))
+
+    def precise_enough(result: SimulationResult) -> bool:
+        return target_half_width is not None and result.half_width(confidence) <= target_half_width
+
+    total = SimulationResult()
+    if n_workers == 1 or len(chunks) <= 1:
+        # skip the pool start-up cost when there is nothing to parallelize
+        for chunk in chunks:
+            total.merge(_run_chunk_args(chunk))
+            if precise_enough(total):
+                break
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            # keep a bounded window of chunks in flight, so stopping early wastes at most one window of work
+            pending: Deque[Future] = deque()
+            next_chunk = 0
+            while next_chunk < len(chunks) or pending:
+                while next_chunk < len(chunks) and len(pending) < 2 * n_workers:
+                    pending.append(pool.submit(_run_chunk_args, chunks[next_chunk]))
+                    next_chunk += 1
+                total.merge(pending.popleft().result())  # always merge in chunk order
+                if precise_enough(total):
+                    for future in pending:
+                        future.cancel()
+                    break
+    return total
+
+
+class _CountRecorder(BetPolicy):
+    """Bets the table minimum, noting the EVTable bin of the true count each round was bet at"""
+    def __init__(self, system: CountSystem, min_count: int, max_count: int) -> None:
+        self.system: CountSystem = system
+        self.min_count: int = min_count
+        self.max_count: int = max_count
+        self.bin: int = 0
+
+    def bet(self, state: BettingState) -> int:
+        true_count = math.floor(state.shoe.true_count(self.system))
+        self.bin = min(max(true_count, self.min_count), self.max_count) - self.min_count
+        return state.min_bet
+
+
+def run_count_chunk(seed: int, n_rounds: int, player_names: List[str], decisions: Dict[str, Decision],
+                    system_name: str, min_count: int, max_count: int, n_decks: int,
+                    penetration: float) -> List[RunningStats]:
+    """This plays :param n_rounds like run_chunk and returns the payout statistics per true count bin"""
+    recorder = _CountRecorder(COUNT_SYSTEMS[system_name], min_count, max_count)
+    engine = BlackJackEngine(player_names, decisions, rng=random.Random(seed), n_decks=n_decks,
+                             penetration=penetration, bet_policies={name: recorder for name in player_names})
+    stats: List[RunningStats] = [RunningStats() for _ in range(max_count - min_count + 1)]
+    for _ in range(n_rounds):
+        restock(engine)
+        for payout in seat_payouts(engine.play_hand()).values():
+            stats[recorder.bin].add(payout)
+    return stats
+
+
+def _run_count_chunk_args(args: Tuple) -> List[RunningStats]:
+    """Unpacks one work item for the process pool"""
+    return run_count_chunk(*args)
+
+
+def build_ev_table(n_rounds: int, seed: int = 0, n_workers: Optional[int] = None,
+                   player_names: Optional[List[str]] = None, decisions: Optional[Dict[str, Decision]] = None,
+                   system: CountSystem = HI_LO, count_range: Tuple[int, int] = (-6, 6), n_decks: int = 6,
+                   penetration: float = 0.75, chunk_size: int = 10000) -> EVTable:
+    """
+    This measures the EV and variance per hand at each floored true count of :param system within
+    :param count_range, by playing :param n_rounds chunked and seeded like run_simulation. The table is built once,
+    saved, and shared by the KellyBet policies of every seat and worker
+    """
+    if player_names is None:
+        player_names = ['player']
+    if decisions is None:
+        decisions = {}
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    min_count, max_count = count_range
+    chunks: List[Tuple] = []
+    for i, start in enumerate(range(0, n_rounds, chunk_size)):
+        chunks.append((derive_seed(seed, i), min(chunk_size, n_rounds - start), player_names, decisions, system.name,
+                       min_count, max_count, n_decks, penetration))
+    if n_workers == 1 or len(chunks) <= 1:
+        chunk_results = [_run_count_chunk_args(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            chunk_results = list(pool.map(_run_count_chunk_args, chunks))
+    totals: List[RunningStats] = [RunningStats() for _ in range(max_count - min_count + 1)]
+    for stats in chunk_results:  # merged in chunk order
+        for total, chunk_stat in zip(totals, stats):
+            total.merge(chunk_stat)
+    return EVTable(system.name, min_count, [stat.mean for stat in totals], [stat.variance for stat in totals],
+                   [stat.n for stat in totals])
+
+
+if __name__ == '__main__':
+    print(run_simulation(20000, seed=2019, n_workers=2, chunk_size=5000))
+    sequential = run_simulation(10 ** 8, seed=2019, chunk_size=5000, target_half_width=0.01)
+    print('stopped after {0} rounds: EV {1:.4f} +/- {2:.4f}'.format(sequential.n_rounds, sequential.expected_value,
+                                                                   sequential.half_width()))
+    from src.class_defs.betting import KellyBet
+    from src.class_defs.strategies import BasicStrategy
+    ev_table = build_ev_table(100000, seed=2019, n_workers=2, decisions={'player': BasicStrategy()})
+    print(ev_table)
+    kelly = run_simulation(20000, seed=2019, n_workers=1, decisions={'player': BasicStrategy()},
+                           bet_policies={'player': KellyBet(ev_table)})
+    net = sum([change * n for change, n in kelly.chip_changes.counts.items()])
+    print('Kelly betting: {0:+d} chips over {1} hands'.format(net, kelly.n_hands))
@@ -0,0 +1,124 @@
+from __future__ import annotations
+from array import array
+from typing import Callable, List, NamedTuple, Optional, Sequence
+from src.class_defs.card_counting import ShoeView
+from src.class_defs.dealer_odds import N_RANKS
+from src.class_defs.dealer_policy import S17, DealerPolicy
+from src.class_defs.hand_values import BLACKJACK
+from src.class_defs.players import Player
+from src.class_defs.rules import CAN_HIT, CAN_STAND
+from src.class_defs.strategy_solver import ACTION_NAMES, HIT, N_TOTALS, STAND, DecisionTable
+
+
+class DecisionState(NamedTuple):
+    """Everything a strategy may look at for one pending decision on a seat's active hand"""
+    seat: str
+    total: int  # the best value of the hand
+    soft: bool
+    hard_total: int
+    n_aces: int
+    n_cards: int
+    upcard_points: int  # the dealer's face up card, 1 for an ace
+    player: Player
+    dealer: Player
+    shoe: Optional[ShoeView] = None  # the unseen cards and the counts, for count-based deviations
+    legal: int = CAN_HIT | CAN_STAND  # the rules.ACTION_BITS of the actions the table allows on this hand
+
+    @classmethod
+    def from_players(cls, player: Player, dealer: Player, shoe: Optional[ShoeView] = None,
+                     legal: int = CAN_HIT | CAN_STAND) -> DecisionState:
+        hand_value = player.hand_value
+        hand = player._player_hand
+        return cls(player.name, hand_value.best, hand_value.soft, hand.hard_total, hand.n_aces, len(hand.hand),
+                   dealer.hand[0].points, player, dealer, shoe, legal)
+
+
+class Strategy:
+    """
+    The decision-maker for a non-human seat. The engine gathers the pending decisions of every seat (and table)
+    sharing a strategy and asks for all of them in one decide_batch call, so subclasses that can answer a whole
+    batch at once (a table lookup, one model call) should override decide_batch rather than decide.
+    A decision must be one of the actions set in state.legal. Stand always is, and so is hit except on split aces
+    at a table that allows resplitting them but not hitting them
+    """
+    def decide(self, state: DecisionState) -> str:
+        raise NotImplementedError
+
+    def take_insurance(self, state: DecisionState) -> bool:
+        """This is asked before play when the dealer shows an ace, and declines unless a subclass says otherwise"""
+        return False
+
+    def decide_batch(self, states: Sequence[DecisionState]) -> List[str]:
+        return [self.decide(state) for state in states]
+
+
+class TableStrategy(Strategy):
+    """Looks every decision up in a DecisionTable"""
+    def __init__(self, table: DecisionTable) -> None:
+        self.table: DecisionTable = table
+
+    def decide(self, state: DecisionState) -> str:
+        if not state.legal & CAN_HIT:
+            return ACTION_NAMES[STAND]
+        return self.table.action(state.total, state.soft, state.upcard_points)
+
+    def decide_batch(self, states: Sequence[DecisionState]) -> List[str]:
+        actions = self.table.actions
+        return [ACTION_NAMES[actions[(s.soft * N_TOTALS + s.total) * N_RANKS + s.upcard_points - 1]]
+                if s.total <= BLACKJACK and s.legal & CAN_HIT else ACTION_NAMES[STAND] for s in states]
+
+
+def basic_strategy_table() -> DecisionTable:
+    """The textbook multi-deck hit/stand chart for a dealer who stands on soft 17"""
+    actions = array('b', [STAND] * (2 * N_TOTALS * N_RANKS))
+    for upcard_points in range(1, N_RANKS + 1):
+        dealer_weak = 2 <= upcard_points <= 6
+        for total in range(N_TOTALS):
+            if total <= 11:
+                hard_hit = True
+            elif total == 12:
+                hard_hit = upcard_points not in (4, 5, 6)
+            elif total <= 16:
+                hard_hit = not dealer_weak
+            else:
+                hard_hit = False
+            soft_hit = total <= 17 or (total == 18 and upcard_points in (9, 10, 1))
+            actions[DecisionTable.index(total, False, upcard_points)] = HIT if hard_hit else STAND
+            actions[DecisionTable.index(total, True, upcard_points)] = HIT if soft_hit else STAND
+    return DecisionTable(actions, [])
+
+
+class BasicStrategy(TableStrategy):
+    """Plays the basic strategy chart from basic_strategy_table"""
+    def __init__(self) -> None:
+        super(BasicStrategy, self).__init__(basic_strategy_table())
+
+
+class DealerPolicyStrategy(Strategy):
+    """Mimics the dealer: hits until the hand meets :param policy's stand rule, whatever the upcard"""
+    def __init__(self, policy: DealerPolicy = S17) -> None:
+        self.policy: DealerPolicy = policy
+
+    def decide(self, state: DecisionState) -> str:
+        return 'stand' if self.policy.stands(state.hard_total, state.n_aces) or not state.legal & CAN_HIT else 'hit'
+
+
+class CallbackStrategy(Strategy):
+    """
+    Wraps a plain callable. With :param batched the callable gets the whole list of DecisionStates and
+    must return one action per state (e.g. a single model call); otherwise it's a Decision callback that
+    gets (player, dealer) once per seat
+    """
+    def __init__(self, callback: Callable, batched: bool = False) -> None:
+        self.callback: Callable = callback
+        self.batched: bool = batched
+
+    def decide(self, state: DecisionState) -> str:
+        if self.batched:
+            return self.callback([state])[0]
+        return self.callback(state.player, state.dealer)
+
+    def decide_batch(self, states: Sequence[DecisionState]) -> List[str]:
+        if self.batched:
+            return list(self.callback(list(states)))
+        return [self.callback(state.player, state.dealer) for state in states]
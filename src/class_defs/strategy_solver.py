@@ -0,0 +1,168 @@
+from __future__ import annotations
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+import json
+from src.class_defs.dealer_odds import BUST, DEALER_OUTCOMES, N_RANKS, DealerOutcomeCalculator, full_shoe_composition
+from src.class_defs.dealer_policy import DEALER_POLICIES, S17, DealerPolicy
+from src.class_defs.hand_values import BLACKJACK, SOFT_ACE_BONUS, get_hand_value
+from src.class_defs.players import Player
+
+# Action codes stored in a DecisionTable
+STAND, HIT = 0, 1
+ACTION_NAMES: Tuple[str, ...] = ('stand', 'hit')
+N_TOTALS: int = BLACKJACK + 1  # table rows for totals 0-21
+SOLVER_CACHE_SIZE: int = 400000  # enough dealer results for a full six deck table without evicting
+
+
+class StrategySolver:
+    """
+    Expected values of standing and hitting for a player hand against a dealer upcard, where every card the player
+    draws comes out of the shoe composition. Player states are (hard total, has an ace), and results are memoized by
+    (hard total, has an ace, upcard, composition) in one dictionary shared by every query on the solver, while the
+    dealer's outcome distributions come from a shared DealerOutcomeCalculator playing the dealer by :param policy
+    (a given calculator keeps its own policy)
+    """
+    # =========== Constructors ===========
+    def __init__(self, dealer_calculator: Optional[DealerOutcomeCalculator] = None, policy: DealerPolicy = S17) -> None:
+        if dealer_calculator is None:
+            dealer_calculator = DealerOutcomeCalculator(maxsize=SOLVER_CACHE_SIZE, policy=policy)
+        self.dealer_calculator: DealerOutcomeCalculator = dealer_calculator
+        self._best: Dict[Tuple[int, int, int, Tuple[int, ...]], float] = {}
+
+    # =========== Calculations ===========
+    def stand_ev(self, player_value: int, upcard_points: int, composition: Sequence[int]) -> float:
+        """This returns the expected value of standing on :param player_value in units of the bet"""
+        if player_value > BLACKJACK:
+            return -1.0
+        dealer = self.dealer_calculator.distribution(upcard_points, composition)
+        ev: float = dealer[BUST]
+        for i in range(len(DEALER_OUTCOMES) - 1):
+            dealer_value = 17 + i
+            if player_value > dealer_value:
+                ev += dealer[i]
+            elif player_value < dealer_value:
+                ev -= dealer[i]
+        return ev
+
+    def hit_ev(self, hard_total: int, has_ace: int, upcard_points: int, composition: Sequence[int]) -> float:
+        """This returns the expected value of taking one card and then playing on optimally"""
+        composition = tuple(composition)
+        n_cards: int = sum(composition)
+        ev: float = 0.0
+        for rank in range(N_RANKS):
+            count = composition[rank]
+            if count == 0:
+                continue
+            remaining = composition[:rank] + (count - 1,) + composition[rank + 1:]
+            ev += count / n_cards * self.best_ev(hard_total + rank + 1, has_ace or int(rank == 0),
+                                                 upcard_points, remaining)
+        return ev
+
+    def best_ev(self, hard_total: int, has_ace: int, upcard_points: int, composition: Tuple[int, ...]) -> float:
+        """This returns the expected value of the better of standing and hitting, from the shared memo"""
+        hand_value = get_hand_value(hard_total, has_ace)
+        if hand_value.bust:
+            return -1.0
+        key = (hard_total, has_ace, upcard_points, composition)
+        ev = self._best.get(key)
+        if ev is None:
+            ev = self.stand_ev(hand_value.best, upcard_points, composition)
+            if hand_value.best < BLACKJACK:
+                ev = max(ev, self.hit_ev(hard_total, has_ace, upcard_points, composition))
+            self._best[key] = ev
+        return ev
+
+    def action_evs(self, total: int, soft: bool, upcard_points: int, composition: Sequence[int]) -> Tuple[float, float]:
+        """This returns (stand EV, hit EV) for a hand worth :param total, counting an ace as 11 when :param soft"""
+        hard_total = total - SOFT_ACE_BONUS if soft else total
+        return (self.stand_ev(total, upcard_points, composition),
+                self.hit_ev(hard_total, int(soft), upcard_points, composition))
+
+    def build_table(self, composition: Sequence[int]) -> DecisionTable:
+        """
+        This solves every (total, soft, upcard) state against :param composition, with the upcard taken out of the
+        shoe, and packs the better action of each into a DecisionTable
+        """
+        actions = array('b', [STAND] * (2 * N_TOTALS * N_RANKS))
+        evs = array('d', [0.0] * (2 * len(actions)))
+        for upcard_points in range(1, N_RANKS + 1):
+            remaining = list(composition)
+            if remaining[upcard_points - 1] == 0:
+                continue  # this upcard can't come out of the composition
+            remaining[upcard_points - 1] -= 1
+            for soft in (False, True):
+                for total in range(SOFT_ACE_BONUS + 2 if soft else 4, N_TOTALS):
+                    stand, hit = self.action_evs(total, soft, upcard_points, remaining)
+                    i = DecisionTable.index(total, soft, upcard_points)
+                    actions[i] = HIT if hit > stand else STAND
+                    evs[2 * i], evs[2 * i + 1] = stand, hit
+        return DecisionTable(actions, list(composition), evs, self.dealer_calculator.policy.name)
+
+
+class DecisionTable:
+    """
+    A solved strategy packed into one byte per (total, soft, dealer upcard) state, so a bot's decision is a single
+    index computation. Tables are saved to JSON so they're solved once and loaded at startup.
+    A table is also a Decision callback, so it can be handed straight to BlackJackEngine
+    """
+    # =========== Constructors ===========
+    def __init__(self, actions: array, composition: List[int], evs: Optional[array] = None,
+                 dealer_rule: str = S17.name) -> None:
+        self.actions: array = actions
+        self.composition: List[int] = composition  # the shoe composition the table was solved for
+        self.evs: Optional[array] = evs  # (stand EV, hit EV) per state when the table came from the solver
+        self.dealer_rule: str = dealer_rule  # the name of the DealerPolicy the table was solved against
+
+    @classmethod
+    def solve(cls, n_decks: int = 6, policy: DealerPolicy = S17) -> DecisionTable:
+        """Solves a table for a freshly shuffled shoe of :param n_decks against a dealer playing :param policy"""
+        return StrategySolver(policy=policy).build_table(full_shoe_composition(n_decks))
+
+    @classmethod
+    def load(cls, path: str) -> DecisionTable:
+        with open(path, 'r') as file:
+            data = json.load(file)
+        evs = array('d', data['evs']) if data.get('evs') is not None else None
+        return cls(array('b', data['actions']), data['composition'], evs, data.get('dealer_rule', S17.name))
+
+    # =========== Helper Methods ===========
+    @property
+    def dealer_policy(self) -> DealerPolicy:
+        return DEALER_POLICIES[self.dealer_rule]
+
+    @staticmethod
+    def index(total: int, soft: bool, upcard_points: int) -> int:
+        return ((int(soft) * N_TOTALS) + total) * N_RANKS + upcard_points - 1
+
+    def save(self, path: str) -> None:
+        data = {'composition': self.composition, 'dealer_rule': self.dealer_rule, 'actions': self.actions.tolist(),
+                'evs': self.evs.tolist() if self.evs is not None else None}
+        with open(path, 'w') as file:
+            json.dump(data, file)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, DecisionTable):
+            return NotImplemented
+        return (self.actions == other.actions and self.composition == other.composition
+                and self.dealer_rule == other.dealer_rule)
+
+    # =========== Decisions ===========
+    def action(self, total: int, soft: bool, upcard_points: int) -> str:
+        """This returns 'hit' or 'stand' for a hand worth :param total against the dealer's upcard"""
+        if total > BLACKJACK:
+            return ACTION_NAMES[STAND]
+        return ACTION_NAMES[self.actions[DecisionTable.index(total, soft, upcard_points)]]
+
+    def __call__(self, player: Player, dealer: Player) -> str:
+        hand_value = player.hand_value
+        return self.action(hand_value.best, hand_value.soft, dealer.hand[0].points)
+
+
+if __name__ == '__main__':
+    table = DecisionTable.solve(n_decks=6)
+    for soft in (False, True):
+        print('Soft totals' if soft else 'Hard totals')
+        print('    ' + ''.join(['A' if up == 1 else str(up % 10) for up in range(1, N_RANKS + 1)]))
+        for total in range(SOFT_ACE_BONUS + 3 if soft else 8, BLACKJACK):
+            print('{:>3} '.format(total) + ''.join(['H' if table.action(total, soft, up) == 'hit' else 'S'
+                                                    for up in range(1, N_RANKS + 1)]))
@@ -0,0 +1,79 @@
+from array import array
+import random
+import unittest
+from src.class_defs.batch_engine import BatchEngine, np
+from src.class_defs.dealer_policy import H17
+from src.class_defs.engine import BlackJackEngine
+from src.class_defs.simulation import RESULTS
+from src.class_defs.strategies import BasicStrategy, DealerPolicyStrategy
+
+
+@unittest.skipUnless(np is not None, 'the batch engine needs NumPy')
+class MyTestCase(unittest.TestCase):
+    def assert_matches_scalar_engine(self, strategy, n_seats, dealer_policy=None):
+        """Plays the same shoe orders through both engines, round by round until the first reshuffle"""
+        n_tables, n_decks = 20, 2
+        rng = random.Random(7)
+        shoes = [rng.sample(list(range(52)) * n_decks, 52 * n_decks) for _ in range(n_tables)]
+        kwargs = {} if dealer_policy is None else {'dealer_policy': dealer_policy}
+        batch = BatchEngine(n_tables, n_seats, strategy, n_decks=n_decks, **kwargs)
+        batch.load_shoes(shoes)
+        names = ['seat{}'.format(i) for i in range(n_seats)]
+        scalars = []
+        for shoe in shoes:
+            engine = BlackJackEngine(names, {name: strategy for name in names}, n_decks=n_decks, **kwargs)
+            engine.draw_pile.buffer = array('b', shoe)
+            engine.draw_pile.cursor, engine.draw_pile.cut_card = 0, batch.cut_card[0]
+            scalars.append(engine)
+        n_compared = 0
+        while not any([engine.draw_pile.needs_reshuffle for engine in scalars]):
+            results, rates = batch.play_round()
+            for k, engine in enumerate(scalars):
+                outcomes = sorted(engine.play_hand(), key=lambda outcome: names.index(outcome.player))
+                self.assertEqual([RESULTS[code] for code in results[k]], [outcome.result for outcome in outcomes])
+                self.assertEqual(list(rates[k]), [outcome.payout_rate for outcome in outcomes])
+                self.assertEqual(batch.upcards[k], engine.dealer.hand[0].points)
+            n_compared += 1
+        self.assertGreater(n_compared, 3)
+
+    def test_matches_scalar_engine(self):
+        self.assert_matches_scalar_engine(BasicStrategy(), n_seats=1)
+        self.assert_matches_scalar_engine(BasicStrategy(), n_seats=5)
+        self.assert_matches_scalar_engine(DealerPolicyStrategy(), n_seats=3)
+        self.assert_matches_scalar_engine(DealerPolicyStrategy(H17), n_seats=2, dealer_policy=H17)
+
+    def test_run_aggregates(self):
+        engine = BatchEngine(n_tables=500, n_seats=3, seed=1, bet=10)
+        result = engine.run(40)
+        self.assertEqual(result.n_rounds, 500 * 40)
+        self.assertEqual(result.n_hands, 500 * 40 * 3)
+        self.assertEqual(sum(result.result_counts.values()), result.n_hands)
+        self.assertEqual(result.situations.total, result.n_hands)
+        self.assertEqual(result.chip_changes.total, result.n_hands)
+        self.assertEqual(result.chip_changes[-10], result.result_counts['lose'] + result.result_counts['bust'])
+        self.assertLess(abs(result.expected_value), 0.2)
+        self.assertEqual(result, BatchEngine(n_tables=500, n_seats=3, seed=1, bet=10).run(40))
+
+    def test_shoes_run_dry_mid_round(self):
+        # with full penetration the shoes run out mid-round and recycle only their discards
+        engine = BatchEngine(n_tables=50, n_seats=7, n_decks=1, penetration=1.0, seed=3)
+        for _ in range(30):
+            engine.play_round()
+            self.assertTrue((engine.results >= 0).all())
+        self.assertTrue((np.sort(engine.shoes, axis=1) == np.sort(engine.shoes[0])).all())
+
+    def test_default_bet_moves_chips(self):
+        result = BatchEngine(n_tables=100, n_seats=2, seed=4).run(10)
+        self.assertEqual(result.chip_changes[0], result.result_counts['push'])
+        self.assertEqual(result.chip_changes[-1], result.result_counts['lose'] + result.result_counts['bust'])
+        self.assertRaises(ValueError, BatchEngine, 2, bet=0)
+
+    def test_rejects_other_strategies(self):
+        with self.assertRaises(TypeError):
+            BatchEngine(2, strategy=lambda player, dealer: 'hit')
+        with self.assertRaises(ValueError):
+            BatchEngine(2).load_shoes([[0] * 10])
+
+
+if __name__ == '__main__':
+    unittest.main()
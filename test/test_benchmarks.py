@@ -0,0 +1,34 @@
+import unittest
+import os
+import tempfile
+from src.class_defs.benchmarks import compare, load_results, main, run_benchmarks, save_results
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'benchmark_baseline.json')
+
+
+class MyTestCase(unittest.TestCase):
+    def test_suite_runs(self):
+        results = run_benchmarks(seats=(1, 3), scale=0.01, repeat=1)
+        self.assertIn('hands_3_seats', results)
+        self.assertEqual(set(load_results(BASELINE_PATH)) - set(results), {'hands_7_seats'})
+        for ops in results.values():
+            self.assertGreater(ops, 0)
+
+    def test_compare_threshold(self):
+        baseline = {'a': 100.0, 'b': 100.0, 'c': 100.0}
+        regressions = compare({'a': 80.0, 'b': 70.0, 'd': 1.0}, baseline, threshold=0.25)
+        self.assertEqual([r.name for r in regressions], ['b'])
+        self.assertAlmostEqual(regressions[0].slowdown, 0.3)
+
+    def test_regression_fails_loudly(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            save_results(path, {'get_hand_value': 1e12})  # an impossible baseline to fall short of
+            self.assertEqual(main(['--scale', '0.01', '--seats', '1', '--baseline', path]), 1)
+            output = os.path.join(directory, 'results.json')
+            self.assertEqual(main(['--scale', '0.01', '--seats', '1', '--output', output]), 0)
+            self.assertIn('sort_stack', load_results(output))
+
+
+if __name__ == '__main__':
+    unittest.main()
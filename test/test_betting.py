@@ -0,0 +1,88 @@
+import os
+import random
+import tempfile
+import unittest
+from src.class_defs.betting import BetPolicy, BettingState, CountRamp, EVTable, FlatBet, KellyBet
+from src.class_defs.card_counting import KO, ShoeView
+from src.class_defs.cards import CardShoe
+from src.class_defs.chip_stack import ChipStack
+from src.class_defs.engine import BlackJackEngine
+from src.class_defs.simulation import build_ev_table
+
+
+class FixedCount:
+    """A stand-in ShoeView reporting one true count"""
+    def __init__(self, true_count):
+        self.count = true_count
+
+    def true_count(self, system=None):
+        return self.count
+
+
+class Greedy(BetPolicy):
+    def bet(self, state):
+        return 10 ** 6
+
+
+class MyTestCase(unittest.TestCase):
+    def state(self, true_count, bankroll=1000):
+        return BettingState('seat', bankroll, 5, 500, FixedCount(true_count))
+
+    def test_policies(self):
+        self.assertEqual(FlatBet().bet(self.state(3)), 5)
+        self.assertEqual(FlatBet(25).bet(self.state(3)), 25)
+        ramp = CountRamp({1: 2, 2: 4, 3: 8})
+        self.assertEqual([ramp.bet(self.state(count)) for count in (-2, 0.9, 1, 2.5, 9)], [5, 5, 10, 20, 40])
+        table = EVTable('Hi-Lo', -1, [-0.01, 0.0, 0.01, 0.02], [1.25] * 4, [100] * 4)
+        kelly = KellyBet(table, fraction=1.0)
+        self.assertEqual([kelly.bet(self.state(count)) for count in (-5, 0.5, 1.2, 2, 8)], [5, 5, 8, 16, 16])
+        self.assertEqual(kelly.bet(self.state(8, bankroll=10000)), 160)
+
+    def test_ev_table_save_load(self):
+        table = EVTable(KO.name, -3, [0.1, 0.2], [1.0, 1.5], [10, 20])
+        self.assertEqual((table.max_count, table.ev(-10), table.ev(-1.5), table.variance(7)), (-2, 0.1, 0.2, 1.5))
+        self.assertIs(table.system, KO)
+        path = os.path.join(tempfile.mkdtemp(), 'ev_table.json')
+        table.save(path)
+        self.assertEqual(EVTable.load(path), table)
+
+    def test_take_bets(self):
+        engine = BlackJackEngine(['flat', 'greedy', 'broke', 'out'], rng=random.Random(1), min_bet=5, max_bet=50,
+                                 bet_policies={'greedy': Greedy(), 'out': FlatBet(0)})
+        engine.players['broke'].chips = ChipStack({'$1': 4})
+        engine.dealt_in_players = list(engine.players.keys())
+        engine.take_bets()
+        self.assertEqual(engine.dealt_in_players, ['flat', 'greedy'])
+        self.assertEqual([engine.players[name].pot.stack_value for name in ('flat', 'greedy', 'broke', 'out')],
+                         [5, 50, 0, 0])
+        self.assertEqual(engine.players['greedy'].chips.stack_value, 250)
+        engine.bet_policies['flat'] = FlatBet(-1)
+        with self.assertRaises(ValueError):
+            engine.take_bets()
+        self.assertRaises(ValueError, BlackJackEngine, ['a'], min_bet=10, max_bet=5)
+
+    def test_rounds_settle_the_bets(self):
+        engine = BlackJackEngine(['a', 'b'], rng=random.Random(2), min_bet=10, max_bet=100,
+                                 bet_policies={'b': CountRamp({0: 2, 2: 5})})
+        bank = engine.dealer.chips.stack_value
+        for _ in range(100):
+            for outcome in engine.play_hand():
+                self.assertIn(outcome.bet, (10, 20, 50))
+                self.assertEqual(engine.players[outcome.player].pot.stack_value, 0)
+        held = sum([player.chips.stack_value for player in engine.players.values()])
+        self.assertEqual(held + engine.dealer.chips.stack_value, 600 + bank)
+
+    def test_build_ev_table(self):
+        kwargs = dict(seed=3, player_names=['a', 'b'], count_range=(-2, 2), n_decks=2, chunk_size=150)
+        table = build_ev_table(300, n_workers=1, **kwargs)
+        self.assertEqual(sum(table.n_hands), 600)
+        self.assertEqual(len(table.evs), 5)
+        self.assertEqual(table, build_ev_table(300, n_workers=2, **kwargs))
+        shoe = CardShoe(n_decks=2)
+        shoe.shuffle(random.Random(4))
+        state = BettingState('a', 300, 1, 500, ShoeView(shoe))
+        self.assertGreaterEqual(KellyBet(table).bet(state), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
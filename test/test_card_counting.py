@@ -0,0 +1,62 @@
+import random
+import unittest
+from src.class_defs.card_counting import COUNT_SYSTEMS, HI_LO, KO, CountSystem, ShoeView
+from src.class_defs.cards import CARD_RANKS, CardShoe, count_ranks
+from src.class_defs.engine import BlackJackEngine
+
+
+def hit_soft(player, dealer):
+    return 'hit' if player.hand_value.best < 15 else 'stand'
+
+
+class MyTestCase(unittest.TestCase):
+    def test_systems(self):
+        self.assertTrue(HI_LO.balanced)
+        self.assertFalse(KO.balanced)
+        self.assertEqual([system.balanced for system in COUNT_SYSTEMS.values()], [True, False, True, True])
+        self.assertEqual(KO.initial_count(6), -20)
+        view = ShoeView(CardShoe(n_decks=6), system=KO)
+        self.assertEqual((view.running_count(), view.running_count(HI_LO)), (-20, 0))
+        self.assertEqual(view.composition, (24,) * 9 + (96,))
+
+    def test_counts_follow_the_piles(self):
+        # one deck dealt to the end, so the discards are recycled mid-round through deal_cards
+        names = ['a', 'b', 'c', 'd', 'e']
+        engine = BlackJackEngine(names, {name: hit_soft for name in names}, rng=random.Random(4), penetration=1.0)
+        custom = CountSystem('custom', (-2, 1, 1, 2, 2, 1, 1, 0, -1, -1))
+        view = ShoeView(engine.draw_pile)
+        for _ in range(200):
+            engine.play_hand()
+            shoe, discard = engine.draw_pile, engine.discard_pile
+            self.assertEqual(shoe.rank_counts, count_ranks(shoe.buffer[shoe.cursor:]))
+            self.assertEqual(discard.rank_counts, count_ranks(discard.buffer[discard.cursor:]))
+            dealt = shoe.buffer[:shoe.cursor]  # shuffling compacts the buffer, so these are the cards seen since
+            for system in (HI_LO, custom):
+                self.assertEqual(view.running_count(system), sum([system.tags[CARD_RANKS[i]] for i in dealt]))
+            self.assertEqual(view.n_cards, shoe.n_items)
+
+    def test_hole_card_stays_unseen(self):
+        engine = BlackJackEngine(['a'], rng=random.Random(1), n_decks=2)
+        engine._init_hand()
+        view = engine.shoe_view
+        hole = engine.dealer._player_hand.hand[1]
+        self.assertEqual(view.n_cards, engine.draw_pile.n_items + 1)
+        self.assertEqual(view.composition[hole.points - 1], engine.draw_pile.rank_counts[hole.points - 1] + 1)
+        self.assertIs(engine.pending_decisions()[0].shoe.system, HI_LO)
+        engine.dealer.reveal_hand()
+        self.assertEqual(view.n_cards, engine.draw_pile.n_items)
+
+    def test_snapshot_restores_counts(self):
+        engine = BlackJackEngine(['a'], rng=random.Random(2))
+        engine.play_hand()
+        snapshot = engine.snapshot()
+        view = engine.shoe_view
+        counts = (view.composition, view.running_count(), view.true_count())
+        for _ in range(10):
+            engine.play_hand()
+        engine.restore(snapshot)
+        self.assertEqual((view.composition, view.running_count(), view.true_count()), counts)
+
+
+if __name__ == '__main__':
+    unittest.main()
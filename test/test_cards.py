@@ -0,0 +1,163 @@
+import unittest
+import copy
+import pickle
+import random
+from src.class_defs.cards import Card, Suit, CardHand, CardPile, CardShoe, CompactPile, CompactHand
+from src.class_defs.engine import BlackJackEngine
+
+
+class MyTestCase(unittest.TestCase):
+    # =========== Constructors ===========
+    def test_card_id_round_trip(self):
+        deck = CardPile.from_standard_deck()
+        ids = [card.id for card in deck.stack]
+        self.assertEqual(sorted(ids), list(range(52)))
+        for card in deck.stack:
+            self.assertIs(Card.from_id(card.id), card)
+        self.assertEqual(Card('A', Suit.SPADES).id, 51)
+
+    def test_cards_are_interned(self):
+        self.assertIs(Card('Q', Suit.HEARTS), Card('Q', Suit.HEARTS))
+        self.assertIs(copy.deepcopy(Card('Q', Suit.HEARTS)), Card('Q', Suit.HEARTS))
+        self.assertIs(pickle.loads(pickle.dumps(Card('3', Suit.CLUBS))), Card('3', Suit.CLUBS))
+        self.assertRaises(AttributeError, setattr, Card('Q', Suit.HEARTS), 'value', 'K')
+        self.assertEqual(Card('K', Suit.CLUBS).points, 10)
+
+    def test_hand_visibility(self):
+        hand = CardHand()
+        hand.add_card(Card('5', Suit.SPADES), visible=True)
+        hand.add_card(Card('9', Suit.HEARTS))
+        self.assertTrue(hand.to_string().endswith('[??]'))
+        hand.reveal()
+        self.assertEqual(hand.to_string(), Card('5', Suit.SPADES).name + Card('9', Suit.HEARTS).name)
+
+    def test_hand_index_remove(self):
+        two, king = Card('2', Suit.CLUBS), Card('K', Suit.HEARTS)
+        hand = CardHand([two, king, two, Card('A', Suit.SPADES)])  # duplicate cards as from a multi-deck shoe
+        self.assertIs(hand.remove_card(two.name), two)
+        self.assertIs(hand.remove(two), two)
+        self.assertRaises(IndexError, hand.remove, two)
+        self.assertRaises(IndexError, hand.remove_card, 'not a card')
+        self.assertEqual(sorted([card.id for card in hand.hand]), sorted([king.id, Card('A', Suit.SPADES).id]))
+        self.assertEqual(hand.value.best, 21)
+        for card in list(hand.hand):
+            self.assertIs(hand.hand[hand.get_card_index(card.name)], card)
+
+    def test_hand_bulk_moves(self):
+        hand = CardHand([Card('2', Suit.CLUBS), Card('K', Suit.HEARTS)], visible=True)
+        other = CardHand()
+        hand.transfer_all(other)
+        self.assertEqual((len(hand.hand), hand.hard_total), (0, 0))
+        self.assertEqual((len(other.hand), other.hard_total, other.visible), (2, 12, [True, True]))
+        other.transfer_all(CardHand([Card('5', Suit.CLUBS)]))
+        pile = CardPile()
+        other.add_card(Card('3', Suit.CLUBS))
+        other.clear_into(pile)
+        self.assertEqual(pile.n_items, 1)
+        self.assertEqual(other.to_string(), '<empty hand>')
+        compact = CompactPile([1, 2, 3])
+        compact.draw_id()
+        CardHand([Card.from_id(7), Card.from_id(8)]).clear_into(compact)
+        self.assertEqual(compact.card_ids, [2, 3, 7, 8])  # discards go on the bottom, without copying the pile
+        compact.add_cards([Card.from_id(9), Card.from_id(10)])
+        self.assertEqual(compact.card_ids, [10, 9, 2, 3, 7, 8])
+        self.assertEqual(sum(compact.rank_counts), 6)
+
+    def test_compact_deck(self):
+        pile = CompactPile.from_standard_deck(n_decks=8)
+        self.assertEqual(pile.n_items, 416)
+        self.assertEqual(pile.buffer.itemsize, 1)
+
+    # =========== Pile Operations ===========
+    def test_compact_draw_and_add(self):
+        pile = CompactPile([0, 1, 2])
+        self.assertEqual(pile.draw_id(), 0)
+        self.assertEqual(pile.draw().id, 1)
+        self.assertEqual(pile.n_items, 1)
+        pile.add(Card.from_id(7))
+        self.assertEqual(pile.card_ids, [7, 2])
+        pile.add_id(9, to_bottom=True)
+        self.assertEqual(pile.card_ids, [7, 2, 9])
+        pile.draw_id(), pile.draw_id(), pile.draw_id()
+        self.assertRaises(IndexError, pile.draw_id)
+
+    def test_compact_shuffle_is_permutation(self):
+        pile = CompactPile.from_standard_deck(n_decks=2)
+        pile.draw_id()
+        pile.shuffle(random.Random(5))
+        self.assertEqual(pile.cursor, 0)
+        self.assertEqual(sorted(pile.card_ids), sorted(list(range(1, 52)) + list(range(52))))
+        other = CompactPile.from_standard_deck(n_decks=2)
+        other.draw_id()
+        other.shuffle(random.Random(5))
+        self.assertEqual(pile.card_ids, other.card_ids)
+
+    def test_compact_hand(self):
+        pile = CompactPile([3, 4, 5])
+        hand = CompactHand()
+        hand.draw(pile, visible=True)
+        hand.draw(pile)
+        self.assertEqual(hand.visible.tolist(), [1, 0])
+        self.assertEqual(hand.remove_id(3), 3)
+        hand.clear_into(pile)
+        self.assertEqual(pile.card_ids, [5, 4])
+        self.assertEqual(hand.to_string(), '<empty hand>')
+
+    def test_shoe_cut_card(self):
+        shoe = CardShoe(n_decks=6, penetration=0.75)
+        shoe.shuffle(random.Random(1))
+        self.assertEqual((shoe.n_items, shoe.cut_card), (312, 234))
+        discard = CompactPile()
+        for _ in range(233):
+            discard.add_id(shoe.draw_id())
+        self.assertFalse(shoe.needs_reshuffle)
+        discard.add_id(shoe.draw_id())
+        self.assertTrue(shoe.needs_reshuffle)
+        shoe.reshuffle(discard, random.Random(2))
+        self.assertEqual((shoe.n_items, discard.n_items, shoe.cursor), (312, 0, 0))
+        self.assertEqual(sorted(shoe.card_ids), sorted(list(range(52)) * 6))
+        self.assertRaises(ValueError, CardShoe, 0)
+        self.assertRaises(ValueError, CardShoe, 1, 1.5)
+
+    def test_shoe_recycle_swap(self):
+        shoe = CardShoe(n_decks=1)
+        discard = CompactPile()
+        while shoe.n_items > 0:
+            discard.add_id(shoe.draw_id(), to_bottom=True)
+        shoe.recycle(discard)
+        self.assertEqual(shoe.card_ids, list(range(52)))
+        self.assertEqual(discard.n_items, 0)
+
+    def test_snapshots_are_copy_on_write(self):
+        shoe = CardShoe(n_decks=1)
+        discard = CompactPile([7])
+        hand = CardHand()
+        for _ in range(3):
+            hand.add_card(shoe.draw(), visible=True)
+        shoe_state, discard_state, hand_state = shoe.snapshot(), discard.snapshot(), hand.snapshot()
+        self.assertIs(shoe_state.buffer, shoe.buffer)  # shared, not copied
+        hand.clear_into(discard)
+        shoe.reshuffle(discard, random.Random(1))
+        hand.add_card(shoe.draw())
+        self.assertEqual(shoe_state.buffer.tolist(), list(range(52)))
+        self.assertEqual(discard_state.buffer.tolist(), [7])
+        shoe.restore(shoe_state)
+        discard.restore(discard_state)
+        hand.restore(hand_state)
+        self.assertEqual((shoe.n_items, shoe.cut_card, discard.card_ids), (49, 39, [7]))
+        self.assertEqual((hand.hard_total, hand.visible), (9, [True] * 3))
+        hand.remove_card(Card('3', Suit.HEARTS).name)
+        self.assertEqual(hand.hard_total, 6)
+        shoe.add_id(shoe.draw_id())
+        self.assertIsNot(shoe.buffer, shoe_state.buffer)
+
+    def test_engine_with_multi_deck_shoe(self):
+        engine = BlackJackEngine(['npc1', 'npc2'], rng=random.Random(3), n_decks=8, penetration=0.8)
+        for _ in range(300):
+            engine.play_hand()
+            n_in_hands = sum([len(p.hand) for p in engine.players.values()]) + len(engine.dealer.hand)
+            self.assertEqual(n_in_hands + engine.draw_pile.n_items + engine.discard_pile.n_items, 416)
+
+
+if __name__ == '__main__':
+    unittest.main()
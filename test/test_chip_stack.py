@@ -1,8 +1,10 @@
+import itertools
+import time
 import unittest
 import sys
 
 sys.path.insert(1, '../src/class_defs')
-from src.class_defs.chip_stack import ChipStack
+from src.class_defs.chip_stack import DENOM_VALUES, ChipStack, exact_payment
 
 
 class MyTestCase(unittest.TestCase):
@@ -181,8 +183,83 @@ class MyTestCase(unittest.TestCase):
         self.assertEqual(cs.stack['$100'], 0)
 
 
+    def test_vector_operations(self):
+        cs = ChipStack.from_counts([1, 1, 1, 0, 1, 1, 1])
+        self.assertEqual(cs.stack_value, 191)
+        cs.add_vector([0, 0, 0, 2, 0, 0, 0])
+        self.assertEqual((cs.stack['$20'], cs.stack_value), (2, 231))
+        # a failed removal leaves the stack untouched
+        self.assertRaises(ValueError, cs.remove_vector, [1, 2, 0, 0, 0, 0, 0])
+        self.assertEqual(cs.counts, [1, 1, 1, 2, 1, 1, 1])
+        other = ChipStack()
+        cs.transfer_vector(other, [1, 0, 0, 1, 0, 0, 0])
+        self.assertEqual((cs.stack_value, other.stack_value), (210, 21))
+        cs.transfer_all(other)
+        self.assertEqual((cs.stack_value, other.stack_value), (0, 231))
+        other.transfer_all(other)
+        self.assertEqual(other.stack_value, 231)
+
+    def test_stack_view(self):
+        cs = ChipStack.from_standard_stack()
+        cs.stack['$100'] = 3
+        self.assertEqual((cs.counts[6], cs.stack_value), (3, 500))
+        self.assertEqual(list(cs.stack.keys()), ['$1', '$5', '$10', '$20', '$25', '$50', '$100'])
+        self.assertIsInstance(cs.stack.copy(), dict)
+        self.assertRaises(KeyError, cs.stack.__getitem__, '$2')
+        cs.stack = {'$5': 2}
+        self.assertEqual((cs.counts, cs.stack_value), ([0, 2, 0, 0, 0, 0, 0], 10))
+
     def test_transfer_amount_of_chips(self):
-        pass
+        # an exact combination is moved without touching any other chips
+        cs = ChipStack({'$25': 1, '$20': 2, '$1': 3})
+        pot = ChipStack()
+        cs.transfer_amount_of_chips(pot, 40)
+        self.assertEqual(pot.stack.copy(), {'$1': 0, '$5': 0, '$10': 0, '$20': 2, '$25': 0, '$50': 0, '$100': 0})
+        self.assertEqual(cs.counts, [3, 0, 0, 0, 1, 0, 0])
+        # without an exact combination the smallest covering chip is broken and change comes back
+        cs = ChipStack({'$1': 2, '$100': 1})
+        cs.transfer_amount_of_chips(pot, 30)
+        self.assertEqual(cs.stack_value, 72)
+        self.assertEqual(pot.stack_value, 70)
+        self.assertEqual(cs.counts, [2, 0, 0, 1, 0, 1, 0])
+        # the dealer's large stack doesn't blow up intermediate counts
+        dealer = ChipStack.from_dealer_stack()
+        dealer.transfer_amount_of_chips(pot, 7)
+        self.assertEqual(dealer.stack_value, 210993)
+        self.assertEqual(dealer.counts, [998, 999, 1000, 1000, 1000, 1000, 1000])
+        self.assertRaises(ValueError, cs.transfer_amount_of_chips, pot, 1000)
+
+    def test_transfer_amount_of_chips_preserves_value(self):
+        for amount in range(1, 300):
+            cs = ChipStack.from_standard_stack()
+            pot = ChipStack({'$5': 1})
+            cs.transfer_amount_of_chips(pot, amount)
+            self.assertEqual((cs.stack_value, pot.stack_value), (300 - amount, 5 + amount))
+            self.assertTrue(all([qty >= 0 for qty in cs.counts]))
+
+    def test_exact_payment(self):
+        # agrees with a brute force search over small inventories, whether or not a payment exists
+        for available in [(2, 1, 0, 1, 1, 0, 0), (0, 0, 3, 0, 2, 1, 0), (4, 0, 1, 2, 0, 0, 1)]:
+            for amount in range(0, 160):
+                payments = [take for take in itertools.product(*[range(qty + 1) for qty in available])
+                            if sum([qty * value for qty, value in zip(take, DENOM_VALUES)]) == amount]
+                payment = exact_payment(available, amount)
+                self.assertEqual(payment is not None, len(payments) > 0)
+                if payment is not None:
+                    self.assertIn(tuple(payment), payments)
+
+    def test_transfer_amount_of_chips_without_exact_payment_is_fast(self):
+        start = time.perf_counter()
+        for amount in (497, 999, 4999, 99999, 9995):
+            no_ones = ChipStack({'$5': 1000, '$10': 1000, '$25': 1000, '$50': 1000, '$100': 1000})
+            pot = ChipStack()
+            no_ones.transfer_amount_of_chips(pot, amount)
+            self.assertEqual(pot.stack_value + no_ones.stack_value, 190000)
+            self.assertEqual(pot.stack_value, amount)
+        # odd multiples of $5 from chips that only make multiples of $10
+        even = ChipStack({'$10': 1000, '$20': 1000, '$50': 1000, '$100': 1000})
+        even.transfer_amount_of_chips(ChipStack(), 99995)
+        self.assertLess(time.perf_counter() - start, 1.0)
 
     def test_sort_stack(self):
         pass
@@ -0,0 +1,53 @@
+import unittest
+from src.class_defs.comparison import compare_strategies, run_comparison_chunk
+from src.class_defs.simulation import derive_seed
+from src.class_defs.strategies import BasicStrategy, DealerPolicyStrategy
+
+
+def always_hit_to_15(player, dealer):
+    return 'hit' if player.hand_value.best < 15 else 'stand'
+
+
+def always_hit(player, dealer):
+    return 'hit'
+
+
+class MyTestCase(unittest.TestCase):
+    def test_identical_contenders_cancel(self):
+        result = run_comparison_chunk(derive_seed(1, 0), 500, {'a': BasicStrategy(), 'b': BasicStrategy()},
+                                      n_seats=3, n_decks=1)
+        self.assertEqual(result.results['a'], result.results['b'])
+        self.assertEqual((result.differences['b'].mean, result.differences['b'].variance), (0.0, 0.0))
+        self.assertEqual(result.n_seats(), 3)
+
+    def test_paired_difference(self):
+        result = compare_strategies({'basic': BasicStrategy(), 'mimic': DealerPolicyStrategy()}, 3000, seed=2,
+                                    n_seats=2, chunk_size=1000)
+        self.assertEqual(result.results['mimic'].n_rounds, 3000)
+        low, high = result.difference_interval('mimic')
+        self.assertLess(low, result.ev_difference('mimic'))
+        self.assertLess(result.ev_difference('mimic'), high)
+        self.assertAlmostEqual(result.ev_difference('mimic'),
+                               result.results['mimic'].expected_value - result.results['basic'].expected_value)
+        self.assertGreater(result.variance_reduction('mimic'), 1.0)
+        self.assertIn('mimic', result.summary())
+
+    def test_worker_count_does_not_change_result(self):
+        contenders = {'basic': BasicStrategy(), 'hit15': always_hit_to_15}
+        kwargs = dict(n_rounds=400, seed=3, n_seats=2, n_decks=2, chunk_size=100)
+        self.assertEqual(compare_strategies(contenders, n_workers=1, **kwargs),
+                         compare_strategies(contenders, n_workers=2, **kwargs))
+
+    def test_losing_contender_plays_every_round(self):
+        result = run_comparison_chunk(derive_seed(4, 0), 3000, {'basic': BasicStrategy(), 'hit': always_hit},
+                                      n_seats=2)
+        self.assertEqual(result.results['hit'].n_hands, result.results['basic'].n_hands)
+        self.assertEqual(result.results['hit'].n_rounds, 3000)
+        self.assertLess(result.ev_difference('hit'), -0.3)
+
+    def test_needs_two_contenders(self):
+        self.assertRaises(ValueError, compare_strategies, {'basic': BasicStrategy()}, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
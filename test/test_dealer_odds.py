@@ -0,0 +1,63 @@
+import unittest
+from src.class_defs.cards import CardShoe
+from src.class_defs.dealer_odds import (DealerOutcomeCalculator, BUST, composition_from_ids,
+                                        full_shoe_composition)
+from src.class_defs.dealer_policy import S17
+from src.class_defs.hand_values import get_hand_value
+
+
+def brute_force(hard, has_ace, composition):
+    """Plain recursion with no cache, as a reference"""
+    hand_value = get_hand_value(hard, has_ace)
+    if S17.stands(hard, has_ace):
+        result = [0.0] * 6
+        result[BUST if hand_value.best > 21 else hand_value.best - 17] = 1.0
+        return result
+    total = sum(composition)
+    result = [0.0] * 6
+    for rank, count in enumerate(composition):
+        if count:
+            remaining = list(composition)
+            remaining[rank] -= 1
+            sub = brute_force(hard + rank + 1, has_ace or int(rank == 0), remaining)
+            result = [r + count / total * p for r, p in zip(result, sub)]
+    return result
+
+
+class MyTestCase(unittest.TestCase):
+    def test_compositions(self):
+        self.assertEqual(full_shoe_composition(2), [8] * 9 + [32])
+        self.assertEqual(composition_from_ids(CardShoe(n_decks=2).card_ids), full_shoe_composition(2))
+
+    def test_matches_brute_force(self):
+        calculator = DealerOutcomeCalculator()
+        composition = [2, 1, 1, 2, 1, 1, 2, 1, 1, 4]
+        for upcard in range(1, 11):
+            exact = calculator.distribution(upcard, composition)
+            reference = brute_force(upcard, int(upcard == 1), composition)
+            for p, q in zip(exact, reference):
+                self.assertAlmostEqual(p, q, places=12)
+            self.assertAlmostEqual(sum(exact), 1.0, places=12)
+
+    def test_known_six_deck_values(self):
+        calculator = DealerOutcomeCalculator()
+        composition = full_shoe_composition(6)
+        composition[5] -= 1
+        self.assertAlmostEqual(calculator.bust_probability(6, composition), 0.4228, places=4)
+        self.assertGreater(calculator.misses, 0)
+        calculator.bust_probability(6, composition)
+        self.assertGreater(calculator.hits, 0)
+
+    def test_lru_eviction(self):
+        calculator = DealerOutcomeCalculator(maxsize=10)
+        calculator.distribution(2, full_shoe_composition(1))
+        self.assertEqual(calculator.cache_size, 10)
+        calculator.clear_cache()
+        self.assertEqual((calculator.cache_size, calculator.hits, calculator.misses), (0, 0, 0))
+        self.assertRaises(ValueError, calculator.distribution, 2, [0] * 10)
+        # a 2 showing with only a 3 and a 4 left can't reach 17, and that isn't filed under any final total
+        self.assertRaises(ValueError, calculator.distribution, 2, [0, 0, 1, 1, 0, 0, 0, 0, 0, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import random
+from src.class_defs.cards import Card, CardHand, Suit
+from src.class_defs.dealer_odds import DealerOutcomeCalculator, full_shoe_composition
+from src.class_defs.dealer_policy import DEALER_POLICIES, H17, S17
+from src.class_defs.engine import BlackJackEngine
+from src.class_defs.hand_values import MAX_TABLE_HARD_TOTAL, get_hand_value
+from src.class_defs.strategies import DealerPolicyStrategy
+from src.class_defs.strategy_solver import StrategySolver
+
+SMALL_SHOE = [2, 2, 2, 2, 2, 2, 2, 2, 2, 8]
+
+
+class MyTestCase(unittest.TestCase):
+    # =========== Decisions ===========
+    def test_s17_stands_on_every_17(self):
+        for hard in range(MAX_TABLE_HARD_TOTAL + 1):
+            for ace in (0, 1):
+                self.assertEqual(S17.stands(hard, ace), get_hand_value(hard, ace).best >= 17)
+
+    def test_h17_only_hits_soft_17(self):
+        differences = [(hard, ace) for hard in range(MAX_TABLE_HARD_TOTAL + 1) for ace in (0, 1)
+                       if S17.stands(hard, ace) != H17.stands(hard, ace)]
+        self.assertEqual(differences, [(7, 1)])
+        self.assertTrue(H17.stands(17, 0))
+        self.assertTrue(H17.stands(40, 2))
+        self.assertIs(DEALER_POLICIES['H17'], H17)
+
+    def test_engine_plays_table_policy(self):
+        for policy, n_cards in ((S17, 2), (H17, 3)):
+            engine = BlackJackEngine([], rng=random.Random(0), dealer_policy=policy)
+            engine.dealer._player_hand = CardHand([Card('A', Suit.CLUBS), Card('6', Suit.HEARTS)])
+            engine._finish_hand()
+            self.assertEqual(len(engine.dealer.hand), n_cards)
+
+    def test_strategy_uses_policy(self):
+        engine = BlackJackEngine(['bot'], rng=random.Random(1))
+        engine.players['bot']._player_hand = CardHand([Card('A', Suit.CLUBS), Card('6', Suit.HEARTS)])
+        engine.dealer._player_hand = CardHand([Card('9', Suit.CLUBS)])
+        engine.acting_players = ['bot']
+        state = engine.pending_decisions()[0]
+        self.assertEqual(DealerPolicyStrategy(H17).decide(state), 'hit')
+        self.assertEqual(DealerPolicyStrategy().decide(state), 'stand')
+
+    # =========== Analytics ===========
+    def test_analytics_follow_policy(self):
+        shoe = full_shoe_composition(6)
+        shoe[5] -= 1  # a 6 upcard
+        s17 = DealerOutcomeCalculator(policy=S17).distribution(6, shoe)
+        h17 = DealerOutcomeCalculator(policy=H17).distribution(6, shoe)
+        self.assertAlmostEqual(sum(h17), 1.0)
+        self.assertGreater(h17[-1], s17[-1])  # hitting soft 17 busts more often
+        solver = StrategySolver(policy=H17)
+        self.assertIs(solver.dealer_calculator.policy, H17)
+        table = solver.build_table(SMALL_SHOE)
+        self.assertEqual(table.dealer_rule, 'H17')
+        self.assertIs(table.dealer_policy, H17)
+        self.assertNotEqual(table, StrategySolver().build_table(SMALL_SHOE))
+
+
+if __name__ == '__main__':
+    unittest.main()
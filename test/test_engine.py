@@ -0,0 +1,98 @@
+import random
+import unittest
+from src.class_defs.cards import Card, CardHand, Suit
+from src.class_defs.chip_stack import ChipStack
+from src.class_defs.engine import BlackJackEngine, HandOutcome
+
+
+def hit_once(player, dealer):
+    return 'hit' if len(player.hand) < 3 else 'stand'
+
+
+class MyTestCase(unittest.TestCase):
+    # =========== Constructors ===========
+    def test_init_seats(self):
+        engine = BlackJackEngine(['npc1', 'npc2'])
+        self.assertEqual(list(engine.players.keys()), ['npc1', 'npc2'])
+        self.assertEqual(engine.draw_pile.n_items, 52)
+
+    # =========== Control Flow Actions ===========
+    def test_play_hand_outcomes(self):
+        engine = BlackJackEngine(['npc1', 'npc2'], decisions={'npc1': hit_once})
+        for _ in range(50):
+            outcomes = engine.play_hand()
+            self.assertEqual(sorted([x.player for x in outcomes]), ['npc1', 'npc2'])
+            for outcome in outcomes:
+                self.assertIsInstance(outcome, HandOutcome)
+                self.assertIn(outcome.result, ['blackjack', 'bust', 'win', 'lose', 'push'])
+            self.assertEqual(engine.dealt_in_players, [])
+
+    def test_cards_are_conserved(self):
+        engine = BlackJackEngine(['npc1', 'npc2', 'npc3'], decisions={'npc1': hit_once, 'npc3': hit_once})
+        for _ in range(100):
+            engine.play_hand()
+            n_in_hands = sum([len(p.hand) for p in engine.players.values()]) + len(engine.dealer.hand)
+            self.assertEqual(n_in_hands + engine.draw_pile.n_items + engine.discard_pile.n_items, 52)
+
+    # =========== Game Actions ===========
+    @staticmethod
+    def seat_hands(engine, hands, bet=10):
+        """This gives each named player (and the dealer) a fixed hand, with :param bet in each player's pot"""
+        for name, values in hands.items():
+            player = engine.dealer if name == 'dealer' else engine.players[name]
+            player._player_hand = CardHand([Card(value, Suit.CLUBS) for value in values], visible=True)
+            if name != 'dealer':
+                player.chips.transfer_amount_of_chips(player.pot, bet)
+        engine.dealt_in_players = [name for name in hands if name != 'dealer']
+
+    def test_settlement_in_one_pass(self):
+        engine = BlackJackEngine(['win', 'lose', 'push', 'bust', 'natural'])
+        self.seat_hands(engine, {'dealer': ['10', '8'], 'win': ['K', '10'], 'lose': ['10', '7'],
+                                 'push': ['9', '9'], 'bust': ['K', 'Q', '5'], 'natural': ['A', 'K']})
+        bank_before = engine.dealer.chips.stack_value
+        engine.check_for_payouts(end_of_hand=True)
+        results = {outcome.player: (outcome.result, outcome.payout_rate) for outcome in engine.outcomes}
+        self.assertEqual(results, {'win': ('win', 1.0), 'lose': ('lose', -1.0), 'push': ('push', 0.0),
+                                   'bust': ('bust', -1.0), 'natural': ('blackjack', 1.5)})
+        self.assertEqual(engine.dealt_in_players, [])
+        self.assertEqual(engine.dealer.chips.stack_value - bank_before, 10 + 10 - 10 - 15)
+        deltas = {name: player.chips.stack_value - 300 for name, player in engine.players.items()}
+        self.assertEqual(deltas, {'win': 10, 'lose': -10, 'push': 0, 'bust': -10, 'natural': 15})
+        for player in engine.players.values():
+            self.assertEqual(player.pot.stack_value, 0)
+
+    def test_settlement_when_bank_is_short(self):
+        engine = BlackJackEngine(['win1', 'win2'])
+        engine.dealer.chips = ChipStack({'$100': 1})
+        self.seat_hands(engine, {'dealer': ['10', '7'], 'win1': ['10', '9'], 'win2': ['10', '10']})
+        engine.check_for_payouts(end_of_hand=True)
+        self.assertEqual(engine.dealer.chips.stack_value, 80)
+        self.assertEqual([p.chips.stack_value for p in engine.players.values()], [310, 310])
+
+
+    # =========== Snapshots ===========
+    def test_snapshot_restore_replays_round(self):
+        engine = BlackJackEngine(['npc1', 'npc2'], decisions={'npc1': hit_once}, rng=random.Random(3))
+        for _ in range(20):
+            engine.play_hand(buy_in=5)
+            engine._init_hand(buy_in=5)
+            snapshot = engine.snapshot(include_rng=True)
+            shoe_before = snapshot.draw_pile.buffer.tolist()
+            first = engine.play_out()
+            chips = [player.chips.stack_value for player in engine.players.values()]
+            engine.play_hand()  # moves the piles on, reshuffling now and then
+            engine.restore(snapshot)
+            self.assertEqual(snapshot.draw_pile.buffer.tolist(), shoe_before)  # never written through
+            self.assertEqual(engine.play_out(), first)
+            self.assertEqual([player.chips.stack_value for player in engine.players.values()], chips)
+
+    def test_restore_needs_same_seats(self):
+        engine = BlackJackEngine(['npc1', 'npc2'])
+        snapshot = engine.snapshot()
+        engine.remove_player('npc2')
+        with self.assertRaises(KeyError):
+            engine.restore(snapshot)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import os
+import random
+import tempfile
+from src.class_defs.engine import BlackJackEngine
+from src.class_defs.hand_history import (HEADER, PAYOUT, RECORD, HandHistoryReader, HandHistoryWriter, SHUFFLE,
+                                         best_value)
+from src.class_defs.strategies import BasicStrategy
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'hands.bjhl')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def record_rounds(self, n_rounds, buffer_records=4096):
+        strategy = BasicStrategy()
+        outcomes = []
+        with HandHistoryWriter(self.path, buffer_records) as writer:
+            engine = BlackJackEngine(['alice', 'bob'], decisions={'alice': strategy, 'bob': strategy},
+                                     rng=random.Random(11), n_decks=2, history=writer)
+            for _ in range(n_rounds):
+                outcomes.append(engine.play_hand())
+        return outcomes
+
+    # =========== Writing ===========
+    def test_fixed_width_records(self):
+        self.record_rounds(50, buffer_records=7)
+        with HandHistoryReader(self.path) as reader:
+            self.assertEqual(os.path.getsize(self.path), HEADER.size + reader.n_records * RECORD.size)
+            self.assertEqual(reader.record(0).event, SHUFFLE)
+            self.assertEqual(reader.record(0).value, 104)
+            self.assertRaises(IndexError, reader.record, reader.n_records)
+
+    def test_bad_header(self):
+        with open(self.path, 'wb') as file:
+            file.write(b'not a log at all')
+        self.assertRaises(ValueError, HandHistoryReader, self.path)
+
+    # =========== Replay ===========
+    def test_replay_matches_engine(self):
+        outcomes = self.record_rounds(200)
+        with HandHistoryReader(self.path) as reader:
+            rounds = list(reader.rounds())
+            self.assertEqual(len(rounds), 200)
+            for logged, round_outcomes in zip(rounds, outcomes):
+                self.assertEqual([(p.seat, p.hand, p.result, p.payout_rate) for p in logged.payouts],
+                                 [(o.player, o.hand_index, o.result, o.payout_rate) for o in round_outcomes])
+                self.assertEqual(logged.dealer_value, best_value(logged.cards['dealer'][0]))
+                for outcome in round_outcomes:
+                    self.assertEqual(best_value(logged.cards[outcome.player][outcome.hand_index]),
+                                     outcome.player_value)
+            counts, _, payout = reader.summarize()
+            self.assertEqual(sum(counts.values()), 400)
+            self.assertEqual(payout, sum([o.payout_rate for r in outcomes for o in r]))
+            self.assertEqual(reader.audit(), [])
+
+    def test_audit_flags_tampered_round(self):
+        self.record_rounds(20)
+        with HandHistoryReader(self.path) as reader:
+            i = [r.event for r in reader].index(PAYOUT)
+            record = reader.record(i)
+        # rewrite the first payout as a bust, which its cards can't support unless the hand really busted
+        result = 2 if record.code == 1 else 1
+        with open(self.path, 'r+b') as file:
+            file.seek(HEADER.size + i * RECORD.size)
+            file.write(RECORD.pack(*record._replace(code=result)))
+        with HandHistoryReader(self.path) as reader:
+            self.assertIn(record.round, reader.audit())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from src.class_defs.cards import Card, CardHand, CompactHand, Suit
+from src.class_defs.dealer_policy import S17
+from src.class_defs.hand_values import HAND_VALUES, compute_hand_value, get_hand_value
+from src.class_defs.engine import BlackJackEngine
+from src.class_defs.players import Player
+
+
+def make_player(values):
+    return Player('p', hand=CardHand([Card(v, Suit.CLUBS) for v in values], visible=True))
+
+
+class MyTestCase(unittest.TestCase):
+    def test_table_matches_compute(self):
+        for (hard, aces), hand_value in HAND_VALUES.items():
+            self.assertEqual(hand_value, compute_hand_value(hard, aces))
+        self.assertEqual(get_hand_value(40, 0), compute_hand_value(40, 0))
+
+    def test_soft_and_hard_values(self):
+        self.assertEqual(BlackJackEngine.get_hand_value(make_player(['9', '7'])), (16,))
+        self.assertEqual(BlackJackEngine.get_hand_value(make_player(['A', '6'])), (7, 17))
+        self.assertEqual(BlackJackEngine.get_best_hand_value(make_player(['A', '6'])), 17)
+        self.assertEqual(BlackJackEngine.get_best_hand_value(make_player(['A', 'A', '9'])), 21)
+        self.assertEqual(BlackJackEngine.get_best_hand_value(make_player(['A', 'A', 'A', 'A', 'K'])), 14)
+        self.assertFalse(make_player(['A', '6', 'K']).hand_value.soft)
+
+    def test_bust_and_blackjack(self):
+        self.assertTrue(BlackJackEngine.is_bust(make_player(['K', 'Q', '5'])))
+        self.assertFalse(BlackJackEngine.is_bust(make_player(['A', 'K', 'Q'])))
+        self.assertTrue(BlackJackEngine.is_blackjack(make_player(['A', 'K']))[0])
+        self.assertFalse(BlackJackEngine.is_blackjack(make_player(['A', '9']))[0])
+
+    def test_dealer_stands(self):
+        def stands(values):
+            hand = make_player(values)._player_hand
+            return S17.stands(hand.hard_total, hand.n_aces)
+        self.assertTrue(stands(['A', '6']))
+        self.assertFalse(stands(['10', '6']))
+        self.assertFalse(stands(['A', '5']))
+        self.assertTrue(stands(['K', '6', '9']))
+
+    def test_running_total_follows_add_and_remove(self):
+        hand = CardHand()
+        ace = Card('A', Suit.HEARTS)
+        hand.add_card(Card('5', Suit.CLUBS))
+        hand.add_card(ace)
+        self.assertEqual(hand.value.best, 16)
+        hand.remove_card(ace.name)
+        self.assertEqual((hand.hard_total, hand.n_aces), (5, 0))
+        compact = CompactHand([12, 3])  # ace and 5 of hearts
+        self.assertEqual(compact.value.best, 16)
+        compact.remove_id(12)
+        self.assertEqual(compact.value.values, (5,))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import io
+import json
+import random
+from src.class_defs import instrumentation
+from src.class_defs.cards import CardHand, CompactPile
+from src.class_defs.chip_stack import ChipStack
+from src.class_defs.engine import BlackJackEngine, play_hands
+from src.class_defs.instrumentation import Histogram, Metrics, SnapshotDumper, instrumented
+
+
+class MyTestCase(unittest.TestCase):
+    def tearDown(self):
+        instrumentation.disable()
+
+    # =========== Enabling & Disabling ===========
+    def test_disabled_leaves_classes_untouched(self):
+        originals = (BlackJackEngine.__dict__['_init_hand'], CardHand.__dict__['value'],
+                     CompactPile.__dict__['draw_id'])
+        with instrumented(Metrics()):
+            self.assertIsNot(BlackJackEngine.__dict__['_init_hand'], originals[0])
+            self.assertTrue(instrumentation.is_enabled())
+        self.assertFalse(instrumentation.is_enabled())
+        self.assertEqual((BlackJackEngine.__dict__['_init_hand'], CardHand.__dict__['value'],
+                          CompactPile.__dict__['draw_id']), originals)
+
+    def test_nested_blocks_keep_instrumentation_on(self):
+        metrics = Metrics()
+        engine = BlackJackEngine(['a'], rng=random.Random(6), n_decks=1)
+        with instrumented(metrics):
+            with instrumented():
+                engine.play_hand()
+            self.assertTrue(instrumentation.is_enabled())
+            engine.play_hand()
+        self.assertFalse(instrumentation.is_enabled())
+        self.assertEqual(metrics.histograms['phase.init_hand'].count, 2)
+
+    def test_rounds_are_counted_and_timed(self):
+        metrics = Metrics()
+        engine = BlackJackEngine(['a', 'b'], rng=random.Random(5), n_decks=1)
+        with instrumented(metrics):
+            for _ in range(100):
+                engine.play_hand()
+            ChipStack.from_dealer_stack().exchange_chips('$100', '$20', 1)
+        engine.play_hand()  # not counted once disabled
+        self.assertEqual(metrics.histograms['phase.init_hand'].count, 100)
+        self.assertEqual(metrics.histograms['phase.finish_hand'].count, 100)
+        self.assertEqual(metrics.histograms['check_for_payouts'].count, 200)
+        self.assertGreaterEqual(metrics.counters['draws'], 600)
+        self.assertGreater(metrics.counters['reshuffles'], 0)
+        self.assertEqual(metrics.counters['chip_exchanges'], 1)
+        self.assertGreater(metrics.counters['hand_value_calls'], 0)
+
+    def test_multi_table_loop_is_timed(self):
+        metrics = Metrics()
+        engines = [BlackJackEngine(['a'], rng=random.Random(i), n_decks=1) for i in range(3)]
+        with instrumented(metrics):
+            for _ in range(20):
+                play_hands(engines)
+            engines[0].play_hand()
+        self.assertEqual(metrics.histograms['phase.loop_hand'].count, 21)  # once per step of all the tables
+        self.assertEqual(metrics.histograms['phase.init_hand'].count, 61)
+        self.assertGreater(metrics.histograms['phase.loop_hand'].total, 0.0)
+
+    # =========== Histograms & Snapshots ===========
+    def test_histogram(self):
+        histogram = Histogram()
+        for seconds in (1e-6, 3e-6, 3e-6, 2.0):
+            histogram.observe(seconds)
+        self.assertEqual(histogram.count, 4)
+        self.assertEqual(histogram.percentile(0.5), 4e-6)
+        self.assertEqual(histogram.percentile(1.0), 2.0)
+        self.assertEqual(histogram.buckets[-1], 1)
+
+    def test_snapshot_dump(self):
+        metrics = Metrics()
+        metrics.count('draws', 3)
+        metrics.observe('phase.init_hand', 1e-5)
+        stream = io.StringIO()
+        dumper = SnapshotDumper(stream, interval=60.0, metrics=metrics)
+        dumper.start()
+        dumper.stop()
+        snapshot = json.loads(stream.getvalue().splitlines()[-1])
+        self.assertEqual(snapshot['counters'], {'draws': 3})
+        self.assertEqual(snapshot['histograms']['phase.init_hand']['count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
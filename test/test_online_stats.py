@@ -0,0 +1,47 @@
+import unittest
+import random
+import statistics
+from src.class_defs.online_stats import RunningStats, ValueCounts, z_score
+
+
+class MyTestCase(unittest.TestCase):
+    def test_welford_matches_two_pass(self):
+        rng = random.Random(3)
+        values = [rng.choice([-1.0, 0.0, 1.0, 1.5]) + 1e8 for _ in range(2000)]
+        stats = RunningStats.from_values(values)
+        self.assertEqual(stats.n, 2000)
+        self.assertAlmostEqual(stats.mean, statistics.fmean(values), places=6)
+        self.assertAlmostEqual(stats.variance, statistics.variance(values), places=6)
+
+    def test_merge_matches_single_stream(self):
+        rng = random.Random(4)
+        values = [rng.random() for _ in range(999)]
+        merged = RunningStats()
+        for start in range(0, 999, 250):
+            merged.merge(RunningStats.from_values(values[start:start + 250]))
+        merged.merge(RunningStats())
+        single = RunningStats.from_values(values)
+        self.assertEqual(merged.n, single.n)
+        self.assertAlmostEqual(merged.mean, single.mean, places=12)
+        self.assertAlmostEqual(merged.variance, single.variance, places=12)
+
+    def test_confidence_interval(self):
+        self.assertAlmostEqual(z_score(0.95), 1.959964, places=5)
+        stats = RunningStats.from_values([0.0, 2.0] * 50)
+        low, high = stats.confidence_interval(0.95)
+        self.assertAlmostEqual((low + high) / 2, 1.0)
+        self.assertAlmostEqual(high - 1.0, z_score(0.95) * stats.standard_error)
+        self.assertEqual(RunningStats().confidence_interval()[1], float('inf'))
+
+    def test_value_counts(self):
+        counts = ValueCounts()
+        counts.add(-10)
+        counts.add(15, 2)
+        other = ValueCounts()
+        other.add(-10)
+        counts.merge(other)
+        self.assertEqual((counts[-10], counts[15], counts[0], counts.total), (2, 2, 0, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+from array import array
+import os
+import random
+import tempfile
+import unittest
+from src.class_defs.cards import CARD_VALUES, Card, CardHand, PileState, Suit, count_ranks
+from src.class_defs.engine import BlackJackEngine
+from src.class_defs.hand_history import HandHistoryReader, HandHistoryWriter
+from src.class_defs.rules import (CAN_DOUBLE, CAN_HIT, CAN_SPLIT, CAN_STAND, CAN_SURRENDER, DEFAULT_RULES, SPLIT_ACE,
+                                  SPLIT_HAND, TableConfig, TableRules, action_names, compile_rules)
+from src.class_defs.strategies import Strategy
+
+
+def make_hand(values):
+    return CardHand([Card(value, Suit.CLUBS) for value in values])
+
+
+def rig(engine, values):
+    """Stacks the top of a fresh single-deck shoe with cards of :param values, in dealing order"""
+    ids = list(range(52))
+    top = []
+    for value in values:
+        card_id = next(i for i in ids if CARD_VALUES[i % len(CARD_VALUES)] == value)
+        ids.remove(card_id)
+        top.append(card_id)
+    buffer = array('b', top + ids)
+    counts = tuple(count_ranks(buffer))
+    engine.draw_pile.restore(PileState(buffer, 0, counts, 40, counts))
+
+
+class Scripted(Strategy):
+    """Plays a fixed list of actions then stands, noting the legal actions it was offered each time"""
+    def __init__(self, actions=(), insure=False):
+        self.actions = list(actions)
+        self.insure = insure
+        self.offered = []
+
+    def decide(self, state):
+        self.offered.append(state.legal)
+        return self.actions.pop(0) if self.actions else 'stand'
+
+    def take_insurance(self, state):
+        return self.insure
+
+
+class Aggressive(Strategy):
+    """Splits and doubles whenever it may, otherwise hits below 12, so every rule gets played"""
+    def decide(self, state):
+        for action in ('split', 'double'):
+            if action in action_names(state.legal):
+                return action
+        return 'hit' if state.total < 12 and state.legal & CAN_HIT else 'stand'
+
+    def take_insurance(self, state):
+        return True
+
+
+class RandomLegal(Strategy):
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+
+    def decide(self, state):
+        return self.rng.choice(action_names(state.legal))
+
+    def take_insurance(self, state):
+        return self.rng.random() < 0.5
+
+
+class MyTestCase(unittest.TestCase):
+    # =========== Compiled Rules ===========
+    def test_legal_actions(self):
+        rules = DEFAULT_RULES
+        self.assertEqual(rules.legal_actions(make_hand(['8', '8'])), CAN_HIT | CAN_STAND | CAN_DOUBLE | CAN_SPLIT)
+        self.assertEqual(rules.legal_actions(make_hand(['8', '8']), n_hands=4), CAN_HIT | CAN_STAND | CAN_DOUBLE)
+        self.assertEqual(rules.legal_actions(make_hand(['10', '6', '2'])), CAN_HIT | CAN_STAND)
+        self.assertEqual(rules.legal_actions(make_hand(['A', 'K'])), CAN_STAND)
+        self.assertEqual(rules.legal_actions(make_hand(['K', 'Q', '5'])), 0)
+        self.assertEqual(rules.legal_actions(make_hand(['A', 'A']), SPLIT_HAND | SPLIT_ACE, 2), CAN_STAND)
+        strict = TableRules(TableConfig(double_totals=(10, 11), double_after_split=False, late_surrender=True))
+        self.assertEqual(strict.legal_actions(make_hand(['6', '3'])), CAN_HIT | CAN_STAND | CAN_SURRENDER)
+        self.assertEqual(strict.legal_actions(make_hand(['6', '4'])), CAN_HIT | CAN_STAND | CAN_DOUBLE | CAN_SURRENDER)
+        self.assertEqual(strict.legal_actions(make_hand(['6', '4']), SPLIT_HAND, 2), CAN_HIT | CAN_STAND)
+        liberal = TableRules(TableConfig(resplit_aces=True, hit_split_aces=True))
+        self.assertEqual(action_names(liberal.legal_actions(make_hand(['A', 'A']), SPLIT_HAND | SPLIT_ACE, 2)),
+                         ('hit', 'stand', 'double', 'split'))
+        self.assertIs(compile_rules(TableConfig()), DEFAULT_RULES)
+        self.assertRaises(ValueError, TableRules, TableConfig(max_hands=0))
+
+    # =========== Playing the Rules ===========
+    def test_split_then_double(self):
+        path = os.path.join(tempfile.mkdtemp(), 'hands.bjhl')
+        strategy = Scripted(['split', 'double', 'stand'])
+        with HandHistoryWriter(path) as writer:
+            engine = BlackJackEngine(['p'], {'p': strategy}, rng=random.Random(0), min_bet=10, history=writer)
+            rig(engine, ['8', '8', '10', '7', '3', '10', '10'])
+            outcomes = engine.play_hand()
+        self.assertEqual([(o.hand_index, o.result, o.player_value, o.bet, o.payout_rate) for o in outcomes],
+                         [(0, 'win', 21, 10, 2.0), (1, 'win', 18, 10, 1.0)])
+        self.assertEqual(strategy.offered[1], CAN_HIT | CAN_STAND | CAN_DOUBLE)  # doubling after the split
+        player = engine.players['p']
+        self.assertEqual(player.chips.stack_value, 330)
+        self.assertEqual([pot.stack_value for pot in player.pots], [0, 0])
+        with HandHistoryReader(path) as reader:
+            logged = next(reader.rounds())
+            self.assertEqual([len(hand) for hand in logged.cards['p']], [3, 2])
+            self.assertEqual(reader.audit(), [])
+            self.assertEqual(reader.summarize()[1], 30)
+        engine.play_hand()  # the next round starts again from one hand
+        self.assertEqual(player.n_hands, 1)
+
+    def test_split_aces_get_one_card(self):
+        strategy = Scripted(['split'])
+        engine = BlackJackEngine(['p'], {'p': strategy}, rng=random.Random(0), min_bet=10)
+        rig(engine, ['A', 'A', '9', '7', 'K', '5', '10'])
+        outcomes = engine.play_hand()
+        # A+K after a split is an ordinary 21, and neither ace was offered another card
+        self.assertEqual([(o.result, o.player_value, o.payout_rate) for o in outcomes],
+                         [('win', 21, 1.0), ('win', 16, 1.0)])
+        self.assertEqual(strategy.actions, [])
+        self.assertEqual(len(strategy.offered), 1)
+
+    def test_surrender(self):
+        strategy = Scripted(['surrender'])
+        engine = BlackJackEngine(['p'], {'p': strategy}, rng=random.Random(0), min_bet=5,
+                                 config=TableConfig(late_surrender=True))
+        rig(engine, ['10', '6', '10', '7'])
+        outcome, = engine.play_hand()
+        self.assertEqual((outcome.result, outcome.payout_rate), ('surrender', -0.5))
+        self.assertEqual(engine.players['p'].chips.stack_value, 297)  # half of 5, rounded to the house
+
+    def test_dealer_peek_and_insurance(self):
+        strategy = Scripted(insure=True)
+        engine = BlackJackEngine(['p', 'q'], {'p': strategy}, rng=random.Random(0), min_bet=10)
+        rig(engine, ['10', '9', 'A', 'Q', 'A', 'K'])
+        outcomes = engine.play_hand()
+        self.assertEqual(strategy.offered, [])  # the round ended on the peek
+        self.assertEqual([(o.player, o.result, o.payout_rate, o.insurance) for o in outcomes],
+                         [('p', 'lose', -1.0, 10), ('q', 'push', 0.0, 0)])
+        self.assertEqual([player.chips.stack_value for player in engine.players.values()], [300, 300])
+        # without the peek the dealer's natural still beats every other hand, doubled ones in full
+        engine = BlackJackEngine(['p'], {'p': Scripted(['double'])}, rng=random.Random(0), min_bet=10,
+                                 config=TableConfig(dealer_peeks=False, insurance=False))
+        rig(engine, ['6', '5', '10', 'A', '10'])
+        outcome, = engine.play_hand()
+        self.assertEqual((outcome.result, outcome.player_value, outcome.payout_rate), ('lose', 21, -2.0))
+
+    def test_blackjack_payout(self):
+        engine = BlackJackEngine(['p'], rng=random.Random(0), min_bet=10, config=TableConfig(blackjack_payout=1.2))
+        rig(engine, ['A', 'J', '10', '7'])
+        outcome, = engine.play_hand()
+        self.assertEqual((outcome.result, outcome.payout_rate), ('blackjack', 1.2))
+        self.assertEqual(engine.players['p'].chips.stack_value, 312)
+        self.assertEqual(engine.is_blackjack(engine.players['p'], engine.rules.blackjack_payout), (True, 1.2))
+
+    def test_snapshot_restores_split_hands(self):
+        engine = BlackJackEngine(['a', 'b'], {'a': Aggressive(), 'b': Aggressive()}, rng=random.Random(4),
+                                 n_decks=2, min_bet=5)
+        n_split = 0
+        for _ in range(150):
+            engine._init_hand()
+            snapshot = engine.snapshot(include_rng=True)
+            first = engine.play_out()
+            chips = [player.chips.stack_value for player in engine.players.values()]
+            engine.restore(snapshot)
+            self.assertEqual(engine.play_out(), first)
+            self.assertEqual([player.chips.stack_value for player in engine.players.values()], chips)
+            n_split += len([outcome for outcome in first if outcome.hand_index > 0])
+        self.assertGreater(n_split, 0)
+
+    def test_random_play_conserves_chips_and_cards(self):
+        path = os.path.join(tempfile.mkdtemp(), 'hands.bjhl')
+        names = ['a', 'b', 'c']
+        config = TableConfig(resplit_aces=True, hit_split_aces=True, late_surrender=True, dealer_peeks=False)
+        with HandHistoryWriter(path) as writer:
+            engine = BlackJackEngine(names, {name: RandomLegal(i) for i, name in enumerate(names)},
+                                     rng=random.Random(5), n_decks=2, history=writer, config=config)
+            total = sum([player.chips.stack_value for player in engine.players.values()])
+            total += engine.dealer.chips.stack_value
+            results = set()
+            for _ in range(300):
+                for outcome in engine.play_hand():
+                    results.add(outcome.result)
+                held = sum([player.chips.stack_value for player in engine.players.values()])
+                self.assertEqual(held + engine.dealer.chips.stack_value, total)
+                n_in_hands = sum([len(hand.hand) for p in engine.players.values() for hand in p.hands])
+                n_in_hands += len(engine.dealer.hand)
+                self.assertEqual(n_in_hands + engine.draw_pile.n_items + engine.discard_pile.n_items, 104)
+        self.assertEqual(results, {'blackjack', 'bust', 'win', 'lose', 'push', 'surrender'})
+        with HandHistoryReader(path) as reader:
+            self.assertEqual(reader.audit(), [])
+            self.assertEqual(reader.summarize()[1], held - 900)
+
+    def test_illegal_action(self):
+        engine = BlackJackEngine(['p'], {'p': Scripted(['surrender'])}, rng=random.Random(0))
+        rig(engine, ['10', '6', '10', '7'])
+        with self.assertRaises(ValueError):
+            engine.play_hand()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+import asyncio
+import json
+from unittest import mock
+from src.class_defs.server import GameServer, encode, run_client, simulate_clients
+
+
+async def silent_client(host, port, n_rounds):
+    """Joins and never answers a decision, so every decision times out"""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(encode({'type': 'join', 'name': 'afk'}))
+    messages = []
+    while len([m for m in messages if m['type'] == 'outcome']) < n_rounds:
+        messages.append(json.loads(await reader.readline()))
+    writer.write(encode({'type': 'leave'}))
+    await writer.drain()
+    writer.close()
+    return messages
+
+
+class MyTestCase(unittest.TestCase):
+    # =========== Server Operations ===========
+    def test_clients_play_rounds(self):
+        async def scenario():
+            server = GameServer(seats_per_table=3, decision_timeout=2.0, seed=1)
+            host, port = await server.start()
+            total = await simulate_clients(host, port, n_clients=6, n_rounds=4)
+            n_tables = len(server.tables)
+            await server.close()
+            return total, n_tables
+        total, n_tables = asyncio.run(scenario())
+        self.assertEqual(total, 24)
+        self.assertGreaterEqual(n_tables, 2)
+
+    def test_one_table_per_seat(self):
+        async def scenario():
+            server = GameServer(seats_per_table=1, decision_timeout=2.0, seed=2)
+            host, port = await server.start()
+            rounds = await asyncio.gather(*[run_client(host, port, 'p', 3) for _ in range(5)])
+            n_tables = len(server.tables)
+            await server.close()
+            return rounds, n_tables
+        rounds, n_tables = asyncio.run(scenario())
+        self.assertEqual(rounds, [3] * 5)
+        self.assertEqual(n_tables, 5)
+
+    def test_timeout_applies_default_action(self):
+        async def scenario():
+            server = GameServer(decision_timeout=0.05, default_action='stand', seed=3)
+            host, port = await server.start()
+            messages = await silent_client(host, port, n_rounds=5)
+            await server.close()
+            return messages
+        messages = asyncio.run(scenario())
+        self.assertEqual(messages[0]['type'], 'joined')
+        for message in messages:
+            if message['type'] == 'decision':
+                self.assertLessEqual(message['total'], 21)
+        # standing on every decision means no hand ever busts
+        self.assertNotIn('bust', [m['result'] for m in messages if m['type'] == 'outcome'])
+
+    def test_concurrent_joins_respect_seat_limit(self):
+        async def join(host, port):
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(encode({'type': 'join', 'name': 'p'}))
+            joined = json.loads(await reader.readline())
+            return joined, writer
+
+        drain = asyncio.StreamWriter.drain
+
+        async def paused_drain(writer):
+            await asyncio.sleep(0.01)  # as if the transport were paused, so every send yields
+            await drain(writer)
+
+        async def scenario():
+            server = GameServer(seats_per_table=3, decision_timeout=2.0, seed=5)
+            host, port = await server.start()
+            with mock.patch.object(asyncio.StreamWriter, 'drain', paused_drain):
+                joins = await asyncio.gather(*[join(host, port) for _ in range(40)])
+            seat_counts = [len(table.seats) for table in server.tables]
+            for _, writer in joins:
+                writer.close()
+            await server.close()
+            return [joined['table'] for joined, _ in joins], seat_counts
+        tables, seat_counts = asyncio.run(scenario())
+        self.assertLessEqual(max(seat_counts), 3)
+        self.assertLessEqual(max([tables.count(table) for table in set(tables)]), 3)
+        self.assertEqual(len(set(tables)), 14)
+
+    def test_broke_seat_is_unseated(self):
+        async def scenario():
+            # a fresh stack of 300 can't cover this table's minimum, so the seat is never dealt in
+            server = GameServer(decision_timeout=0.05, seed=4, min_bet=400, max_bet=500)
+            host, port = await server.start()
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(encode({'type': 'join', 'name': 'broke'}))
+            messages = []
+            while True:
+                line = await asyncio.wait_for(reader.readline(), 2.0)
+                if not line:
+                    break
+                messages.append(json.loads(line))
+            writer.close()
+            rounds = await asyncio.wait_for(run_client(host, port, 'p', 3), 2.0)
+            await asyncio.sleep(0.01)
+            n_active = server.n_active_tables
+            rounds_played = server.rounds_played
+            await server.close()
+            return messages, rounds, n_active, rounds_played
+        messages, rounds, n_active, rounds_played = asyncio.run(scenario())
+        self.assertEqual([message['type'] for message in messages], ['joined', 'unseated'])
+        self.assertIn('400', messages[1]['reason'])
+        self.assertEqual((rounds, n_active, rounds_played), (0, 0, 0))
+
+    def test_invalid_default_action(self):
+        self.assertRaises(ValueError, GameServer, default_action='split')
+        self.assertRaises(ValueError, GameServer, min_bet=10, max_bet=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
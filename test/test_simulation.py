@@ -0,0 +1,55 @@
+import unittest
+from src.class_defs.simulation import SimulationResult, derive_seed, run_chunk, run_simulation
+
+
+def hit_once(player, dealer):
+    return 'hit' if len(player.hand) < 3 else 'stand'
+
+
+class MyTestCase(unittest.TestCase):
+    def test_derive_seed(self):
+        self.assertEqual(derive_seed(7, 3), derive_seed(7, 3))
+        self.assertNotEqual(derive_seed(7, 3), derive_seed(7, 4))
+        self.assertNotEqual(derive_seed(7, 3), derive_seed(8, 3))
+
+    def test_chunk_is_reproducible(self):
+        first = run_chunk(derive_seed(1, 0), 200, ['a', 'b'], {'a': hit_once})
+        second = run_chunk(derive_seed(1, 0), 200, ['a', 'b'], {'a': hit_once})
+        self.assertEqual(first, second)
+        self.assertEqual(first.n_rounds, 200)
+        self.assertEqual(first.n_hands, 400)
+
+    def test_worker_count_does_not_change_result(self):
+        kwargs = dict(seed=11, player_names=['a', 'b'], decisions={'a': hit_once}, chunk_size=150)
+        single = run_simulation(600, n_workers=1, **kwargs)
+        pooled = run_simulation(600, n_workers=3, **kwargs)
+        self.assertEqual(single, pooled)
+        self.assertEqual(single.n_rounds, 600)
+        self.assertNotEqual(single, run_simulation(600, n_workers=1, **dict(kwargs, seed=12)))
+
+    def test_merge(self):
+        total = SimulationResult()
+        total.merge(run_chunk(derive_seed(2, 0), 50, ['a'], {}))
+        total.merge(run_chunk(derive_seed(2, 1), 50, ['a'], {}))
+        self.assertEqual(total.n_hands, 100)
+        self.assertEqual(sum(total.result_counts.values()), 100)
+        self.assertEqual(total.situations.total, 100)
+        counts = total.result_counts  # every seat bets the $1 table minimum, and winnings are rounded down
+        self.assertEqual(total.chip_changes[0], counts['push'])
+        self.assertEqual(total.chip_changes[-1], counts['lose'] + counts['bust'])
+        self.assertEqual(total.chip_changes[1], counts['win'] + counts['blackjack'])
+        self.assertEqual(sum([total.situations[(up, 'push')] for up in range(1, 11)]), total.result_counts['push'])
+
+    def test_sequential_stopping(self):
+        kwargs = dict(seed=5, player_names=['a', 'b'], chunk_size=100, target_half_width=0.1)
+        single = run_simulation(100000, n_workers=1, **kwargs)
+        self.assertLess(single.n_rounds, 100000)
+        self.assertEqual(single.n_rounds % 100, 0)
+        self.assertLessEqual(single.half_width(), 0.1)
+        self.assertEqual(single, run_simulation(100000, n_workers=2, **kwargs))
+        capped = run_simulation(300, n_workers=1, **dict(kwargs, target_half_width=1e-6))
+        self.assertEqual(capped.n_rounds, 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
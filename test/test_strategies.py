@@ -0,0 +1,106 @@
+import gc
+import unittest
+import random
+import weakref
+from unittest import mock
+from src.class_defs.engine import DEFAULT_STRATEGY, BlackJackEngine, play_hands
+from src.class_defs.strategies import (BasicStrategy, CallbackStrategy, DealerPolicyStrategy, DecisionState,
+                                       Strategy, TableStrategy)
+
+
+class CountingStrategy(Strategy):
+    """Hits below 15 and records the size of every batch it is asked for"""
+    def __init__(self):
+        self.batch_sizes = []
+
+    def decide_batch(self, states):
+        self.batch_sizes.append(len(states))
+        return ['hit' if state.total < 15 else 'stand' for state in states]
+
+
+class MyTestCase(unittest.TestCase):
+    def test_basic_strategy_chart(self):
+        basic = BasicStrategy()
+        self.assertEqual(basic.table.action(12, False, 4), 'stand')
+        self.assertEqual(basic.table.action(12, False, 3), 'hit')
+        self.assertEqual(basic.table.action(16, False, 10), 'hit')
+        self.assertEqual(basic.table.action(16, False, 6), 'stand')
+        self.assertEqual(basic.table.action(18, True, 9), 'hit')
+        self.assertEqual(basic.table.action(18, True, 7), 'stand')
+
+    def test_batch_matches_single(self):
+        engine = BlackJackEngine(['a', 'b', 'c'], rng=random.Random(9))
+        engine._init_hand()
+        states = engine.pending_decisions()
+        for strategy in [BasicStrategy(), DealerPolicyStrategy()]:
+            self.assertEqual(strategy.decide_batch(states), [strategy.decide(state) for state in states])
+
+    def test_one_batch_per_step_across_tables(self):
+        strategy = CountingStrategy()
+        engines = [BlackJackEngine(['a', 'b'], decisions={'a': strategy, 'b': strategy}, rng=random.Random(i))
+                   for i in range(4)]
+        for _ in range(20):
+            outcomes = play_hands(engines)
+            self.assertEqual([len(table) for table in outcomes], [2, 2, 2, 2])
+        # seats from several tables were answered in the same call
+        self.assertGreater(max(strategy.batch_sizes), 2)
+        self.assertLessEqual(max(strategy.batch_sizes), 8)
+
+    def test_shared_callback_is_batched(self):
+        def hit_to_15(player, dealer):
+            return 'hit' if player.hand_value.best < 15 else 'stand'
+
+        batch_sizes = []
+        decide_batch = CallbackStrategy.decide_batch
+
+        def counting(strategy, states):
+            batch_sizes.append(len(states))
+            return decide_batch(strategy, states)
+
+        engines = [BlackJackEngine(['a', 'b'], decisions={'a': hit_to_15, 'b': hit_to_15}, rng=random.Random(i))
+                   for i in range(3)]
+        engines[0].add_player('c', hit_to_15)
+        with mock.patch.object(CallbackStrategy, 'decide_batch', counting):
+            for _ in range(10):
+                play_hands(engines)
+        # seats sharing the callback across tables were answered in one call per step
+        self.assertGreater(max(batch_sizes), 2)
+        self.assertIs(BlackJackEngine(['d']).get_strategy('d'), DEFAULT_STRATEGY)
+
+    def test_dropped_callback_is_collected(self):
+        engine = BlackJackEngine(['a'], decisions={'a': lambda player, dealer: 'hit'}, rng=random.Random(3))
+        engine.play_hand()
+        play_hands([engine])
+        callback = weakref.ref(engine.decisions['a'])
+        collected = weakref.ref(engine)
+        del engine
+        gc.collect()
+        self.assertIsNone(callback())
+        self.assertIsNone(collected())
+
+    def test_callback_strategies(self):
+        calls = []
+
+        def batched(states):
+            calls.append(len(states))
+            return ['stand'] * len(states)
+
+        engine = BlackJackEngine(['a', 'b', 'c'], rng=random.Random(2),
+                                 decisions={'a': CallbackStrategy(batched, batched=True),
+                                            'b': lambda player, dealer: 'stand',
+                                            'c': TableStrategy(BasicStrategy().table)})
+        engine.play_hand()
+        self.assertLessEqual(len(calls), 1)
+        self.assertRaises(ValueError, engine.apply_action, 'a', 'split')
+
+    def test_decision_state(self):
+        engine = BlackJackEngine(['a'], rng=random.Random(5))
+        engine._init_hand()
+        player = engine.players['a']
+        state = DecisionState.from_players(player, engine.dealer)
+        self.assertEqual((state.total, state.n_cards), (player.hand_value.best, 2))
+        self.assertEqual(state.upcard_points, engine.dealer.hand[0].points)
+
+
+if __name__ == '__main__':
+    unittest.main()
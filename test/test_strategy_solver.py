@@ -0,0 +1,47 @@
+import unittest
+import os
+import random
+import tempfile
+from src.class_defs.dealer_odds import full_shoe_composition
+from src.class_defs.strategy_solver import StrategySolver, DecisionTable
+from src.class_defs.engine import BlackJackEngine
+
+SMALL_SHOE = [2, 2, 2, 2, 2, 2, 2, 2, 2, 8]
+
+
+class MyTestCase(unittest.TestCase):
+    def test_stand_ev_bounds(self):
+        solver = StrategySolver()
+        composition = full_shoe_composition(1)
+        self.assertEqual(solver.stand_ev(22, 10, composition), -1.0)
+        # standing on 16 only wins when the dealer busts
+        bust = solver.dealer_calculator.bust_probability(10, composition)
+        self.assertAlmostEqual(solver.stand_ev(16, 10, composition), 2 * bust - 1)
+        self.assertGreater(solver.stand_ev(21, 10, composition), solver.stand_ev(20, 10, composition))
+
+    def test_obvious_decisions(self):
+        table = StrategySolver().build_table(SMALL_SHOE)
+        self.assertEqual(table.action(20, False, 10), 'stand')
+        self.assertEqual(table.action(21, True, 10), 'stand')
+        self.assertEqual(table.action(8, False, 6), 'hit')
+        self.assertEqual(table.action(25, False, 6), 'stand')
+        stand, hit = StrategySolver().action_evs(11, False, 6, SMALL_SHOE)
+        self.assertGreater(hit, stand)
+
+    def test_save_and_load(self):
+        table = StrategySolver().build_table(SMALL_SHOE)
+        path = os.path.join(tempfile.mkdtemp(), 'table.json')
+        table.save(path)
+        loaded = DecisionTable.load(path)
+        self.assertEqual(loaded, table)
+        self.assertEqual(loaded.evs, table.evs)
+
+    def test_table_as_engine_decision(self):
+        table = StrategySolver().build_table(SMALL_SHOE)
+        engine = BlackJackEngine(['bot'], decisions={'bot': table}, rng=random.Random(4))
+        for _ in range(50):
+            self.assertEqual(len(engine.play_hand()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()